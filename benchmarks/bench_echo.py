@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Micro-benchmark of the per-character echo path used by human_type.
+
+Compares the original path (a regex substitution and a flushed print() per
+character) with the current one (echo_chunks() computed once per payload and
+TerminalWriter writing to the stdout file descriptor). Output goes to /dev/null
+so that only the Python and syscall overhead is measured.
+
+    python benchmarks/bench_echo.py [--chars N]
+"""
+
+import argparse
+import contextlib
+import re
+import sys
+import time
+
+from asciinwriter.output import echo_chunks
+from asciinwriter.output import TerminalWriter
+
+
+def echo_before(text):
+    for c in text:
+        c = re.sub(r"([^\r])\n", r"\1\r\n", c)
+        print(c, end="", flush=True)
+
+
+def echo_after(text):
+    out = TerminalWriter()
+    out.flush()
+    for shown in echo_chunks(text):
+        out.write(shown)
+
+
+def measure(func, text, repeat=5):
+    """Return the best per-character time, in nanoseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(text) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=100_000)
+    args = parser.parse_args()
+
+    line = "for i in range(10):  # a typical line of a code listing\n"
+    text = (line * (args.chars // len(line) + 1))[: args.chars]
+
+    with open("/dev/null", "w") as devnull, contextlib.redirect_stdout(devnull):
+        before = measure(echo_before, text)
+        after = measure(echo_after, text)
+
+    print(f"before: {before:8.0f} ns/char")
+    print(f"after:  {after:8.0f} ns/char  ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Benchmark suite for the asciinwriter runner hot paths.
+
+Runs offline and saves its results as JSON, so that runs of different
+versions can be compared:
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from asciinwriter import __version__
+from asciinwriter.runner import AsciinwriterRunner
+from asciinwriter.scene import compile_lines
+
+SCENES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenes")
+
+# Whether a larger value of each unit is better, for --compare
+HIGHER_IS_BETTER = {"lines/s": True, "MB/s": True}
+
+# Budgets for the wall time of CLI calls that pipelines make thousands of times
+BUDGETS = {"startup_version": 50, "startup_check": 100}
+
+
+class NullChild:
+    """Stands in for a pexpect child, so that only the runner's own cost is measured."""
+
+    def send(self, data):
+        pass
+
+    def expect_exact(self, pattern, *args, **kwargs):
+        return 0
+
+    expect = expect_list = expect_exact
+
+
+def zero_delay_runner(**kwargs):
+    return AsciinwriterRunner(
+        typing_delay_range=(0, 0), jitter_factor=0, post_typing_delay=0, **kwargs
+    )
+
+
+def best_of(func, repeat):
+    """Return the best wall time of repeat calls to func."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_human_type(args):
+    runner = zero_delay_runner()
+    runner.sleep = lambda seconds: None
+    text = ("echo 'a typical line typed into the shell'; " * 100)[: args.chars]
+    seconds = best_of(lambda: runner.human_type(NullChild(), text), args.repeat)
+    return seconds / len(text) * 1e9, "ns/char"
+
+
+def bench_process_line(args):
+    runner = zero_delay_runner()
+    runner.sleep = lambda seconds: None
+    lines = ["SEND(x)", "ENTER()", "EXPECT(x)", "DELAY(0)", r"EXPECT_RE(\d)"]
+    lines = (lines * (args.commands // len(lines) + 1))[: args.commands]
+    child = NullChild()
+
+    def dispatch():
+        for line in lines:
+            runner.process_line(child, line)
+
+    return best_of(dispatch, args.repeat) / len(lines) * 1e9, "ns/command"
+
+
+def bench_parse(args):
+    block = [
+        "# a comment",
+        "SEND(ls -la /tmp)",
+        "ENTER()",
+        "EXPECT(total)",
+        "DELAY(0.5)",
+        "",
+    ]
+    lines = (block * (args.scene_lines // len(block) + 1))[: args.scene_lines]
+    seconds = best_of(lambda: compile_lines(lines), args.repeat)
+    return len(lines) / seconds, "lines/s"
+
+
+def bench_spawn(args, bootstrap, backend="pexpect"):
+    latencies = []
+    for _ in range(args.spawns):
+        runner = zero_delay_runner(
+            bootstrap=bootstrap, shell_prompt=r"[#$] ", backend=backend
+        )
+        runner.run([])
+        latencies.append(runner.spawn_latency)
+    return statistics.median(latencies) * 1e3, "ms"
+
+
+def bench_output(backend):
+    """Throughput of reading a lot of output from the shell, until its prompt."""
+
+    def output(args):
+        runner = zero_delay_runner(bootstrap=True, backend=backend)
+        child = runner.spawn_shell(cast=True)
+        runner.expect_prompt(child)
+        command = f"head -c {args.output_bytes} /dev/zero | tr '\\0' x; echo\r"
+
+        def read_all():
+            child.send(command)
+            runner.expect_prompt(child, timeout=60)
+
+        try:
+            seconds = best_of(read_all, args.repeat)
+        finally:
+            child.close()
+        return args.output_bytes / seconds / 1e6, "MB/s"
+
+    return output
+
+
+def bench_roundtrip(backend):
+    """Time from sending a line to the shell to reading its next prompt."""
+
+    def roundtrip(args):
+        runner = zero_delay_runner(bootstrap=True, backend=backend)
+        child = runner.spawn_shell(cast=True)
+        runner.expect_prompt(child)
+        timings = []
+        try:
+            for _ in range(args.roundtrips):
+                start = time.perf_counter()
+                child.send(":\r")
+                runner.expect_prompt(child)
+                timings.append(time.perf_counter() - start)
+        finally:
+            child.close()
+        return statistics.median(timings) * 1e3, "ms"
+
+    return roundtrip
+
+
+def bench_startup(*cli_args):
+    def startup(args):
+        command = [sys.executable, "-m", "asciinwriter", *cli_args]
+        timings = []
+        for _ in range(args.startups):
+            start = time.perf_counter()
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1e3, "ms"
+
+    return startup
+
+
+def bench_render(scene, **kwargs):
+    def render(args):
+        runner = AsciinwriterRunner(bootstrap=True, seed=0, timeout=60, **kwargs)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "bench.cast")
+            seconds = best_of(
+                lambda: runner.process_file(scene, output_file=output), args.renders
+            )
+        return seconds * 1e3, "ms"
+
+    return render
+
+
+def benchmarks():
+    suite = {
+        "human_type_per_char": bench_human_type,
+        "process_line_per_command": bench_process_line,
+        "parse_throughput": bench_parse,
+        "spawn_to_prompt_bootstrap": lambda args: bench_spawn(args, True),
+        "spawn_to_prompt_full_rc": lambda args: bench_spawn(args, False),
+        "spawn_to_prompt_bootstrap_pty": lambda args: bench_spawn(args, True, "pty"),
+        "output_throughput_pexpect": bench_output("pexpect"),
+        "output_throughput_pty": bench_output("pty"),
+        "roundtrip_pexpect": bench_roundtrip("pexpect"),
+        "roundtrip_pty": bench_roundtrip("pty"),
+        "startup_version": bench_startup("--version"),
+        "startup_check": bench_startup(
+            "--check", "--no-ir-cache", os.path.join(SCENES_DIR, "hello.scene")
+        ),
+    }
+    for scene in sorted(glob.glob(os.path.join(SCENES_DIR, "*.scene"))):
+        name = os.path.splitext(os.path.basename(scene))[0]
+        suite[f"render_{name}"] = bench_render(scene)
+        suite[f"render_{name}_send_upfront"] = bench_render(scene, send_upfront=True)
+        suite[f"render_{name}_pty"] = bench_render(scene, backend="pty")
+    return suite
+
+
+def compare(results, baseline):
+    """Print each result next to the same result from a baseline file."""
+    old = baseline["results"]
+    print(f"\ncompared with {baseline['asciinwriter']} ({baseline['timestamp']}):")
+    for name, result in results.items():
+        if name not in old:
+            continue
+        ratio = result["value"] / old[name]["value"]
+        if not HIGHER_IS_BETTER.get(result["unit"]):
+            ratio = 1 / ratio
+        print(f"  {name:32} {ratio:6.2f}x {'faster' if ratio >= 1 else 'slower'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="Save results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    parser.add_argument("-k", dest="select", help="Only run benchmarks containing this")
+    parser.add_argument(
+        "--quick", action="store_true", help="Small sizes, for smoke tests"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scale = 10 if args.quick else 1
+    args.chars = 100_000 // scale
+    args.commands = 100_000 // scale
+    args.scene_lines = 100_000 // scale
+    args.spawns = 1 if args.quick else 5
+    args.renders = 1 if args.quick else 3
+    args.startups = 3 if args.quick else 20
+    args.output_bytes = 50_000_000 // scale
+    args.roundtrips = 20 if args.quick else 200
+
+    results = {}
+    for name, bench in benchmarks().items():
+        if args.select and args.select not in name:
+            continue
+        # keep whatever the runner echoes out of the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            value, unit = bench(args)
+        results[name] = {"value": round(value, 3), "unit": unit}
+        over = (
+            f"  OVER BUDGET ({BUDGETS[name]} {unit})"
+            if value > BUDGETS.get(name, value)
+            else ""
+        )
+        print(f"{name:32} {value:14.3f} {unit}{over}", flush=True)
+
+    report = {
+        "asciinwriter": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,134 +4,619 @@
 # SPDX-FileCopyrightText: 2025 Alexei Znamensky
 # SPDX-License-Identifier: GPL-3.0-or-later
 #
-import argparse
 import os
-import random
-import re
 import sys
 import time
 
-import pexpect
-
 from . import __version__
 
 
-class AsciinwriterRunner:
-    """Handles automation of terminal sessions with configurable parameters."""
+def __getattr__(name):
+    # the runner, and pexpect with it, is only imported when a scene is run
+    if name == "AsciinwriterRunner":
+        from .runner import AsciinwriterRunner
+
+        return AsciinwriterRunner
+    if name == "pexpect":
+        import pexpect
+
+        return pexpect
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    VALID_COMMANDS = ["SEND", "EXPECT", "ENTER", "DELAY"]
 
-    command_re = re.compile(
-        rf'^\s*(?P<cmd>{"|".join(VALID_COMMANDS)})\((?P<param>.*)\)\s*(?:#.*)?$'
+def add_runner_arguments(parser):
+    """Add the options that configure AsciinwriterRunner."""
+    from .cache import DEFAULT_MAX_SIZE
+    from .cache import parse_size
+
+    parser.add_argument(
+        "--cols", type=int, default=80, help="Terminal width for the cast (default: 80)"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=24,
+        help="Terminal height for the cast (default: 24)",
+    )
+    parser.add_argument(
+        "--bootstrap",
+        action="store_true",
+        help="Start bash without rc files and synchronize on a sentinel prompt",
+    )
+    parser.add_argument(
+        "--rcfile",
+        help="Minimal rc file for the bootstrapped shell (implies --bootstrap)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=positive_float,
+        default=600,
+        metavar="SECONDS",
+        help="How long an EXPECT waits, unless given a TIMEOUT() in the scene (default: 600)",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=positive_float,
+        metavar="SECONDS",
+        help="Fail a scene that takes longer than this to run",
+    )
+    parser.add_argument(
+        "--search-window",
+        type=int,
+        default=8192,
+        help="Characters of recent output searched by EXPECT_RE() (default: 8192)",
+    )
+    parser.add_argument(
+        "--max-buffer",
+        type=parse_size,
+        metavar="SIZE",
+        help="Keep memory flat for scenes with a lot of output: only keep this much of it, e.g. 1M",
+    )
+    parser.add_argument(
+        "--send-upfront",
+        action="store_true",
+        help="Send each SEND() to the shell at once and only animate its typing",
     )
+    parser.add_argument(
+        "--backend",
+        choices=("pexpect", "pty"),
+        default="pexpect",
+        help="How the shell is run: with pexpect, or on a pty read directly, "
+        "which costs less per read on scenes with a lot of output (default: pexpect)",
+    )
+    parser.add_argument(
+        "--segment-jobs",
+        type=int,
+        metavar="N",
+        help="Segments of a scene rendered at once with --output (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--coalesce-ms",
+        type=positive_float,
+        metavar="MS",
+        help="With --output, merge output written less than MS milliseconds apart "
+        "into one cast event, e.g. 5; typing keeps one event per key (default: off)",
+    )
+    parser.add_argument(
+        "--keyframes",
+        type=positive_float,
+        metavar="SECONDS",
+        help="With --output, also write a keyframe index of the cast (as NAME.keyframes.gz) "
+        "with a snapshot of the screen every SECONDS, for 'asciinwriter seek'",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for the typing delays, so identical inputs are typed with identical delays",
+    )
+    parser.add_argument(
+        "--session-casts",
+        action="store_true",
+        help="With --output, also write one cast per SESSION() next to the main cast",
+    )
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument(
+        "--record",
+        dest="replay_mode",
+        action="store_const",
+        const="record",
+        help="Also save the shell output next to each scene (as NAME.replay.gz) for --replay",
+    )
+    replay.add_argument(
+        "--replay",
+        dest="replay_mode",
+        action="store_const",
+        const="replay",
+        help="Play back the output saved with --record instead of running a shell",
+    )
+    parser.add_argument(
+        "--no-ir-cache",
+        action="store_true",
+        help="Do not cache compiled scenes on disk",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Reuse casts of unchanged scenes from this render cache directory",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=parse_size,
+        default=DEFAULT_MAX_SIZE,
+        help="Maximum size of the render cache, e.g. 200M or 2G (default: 512M)",
+    )
+    parser.add_argument(
+        "--cache-input",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="File the scenes depend on, included in the render cache key (repeatable)",
+    )
+    parser.add_argument(
+        "--cache-env",
+        action="append",
+        default=[],
+        metavar="VAR",
+        help="Environment variable included in the render cache key (repeatable)",
+    )
+
+
+def runner_kwargs(args):
+    """Build AsciinwriterRunner keyword arguments from parsed options."""
+    from .cache import RenderCache
+    from .scene import default_cache_dir
+
+    return dict(
+        cols=args.cols,
+        rows=args.rows,
+        seed=args.seed,
+        search_window=args.search_window,
+        bootstrap=args.bootstrap,
+        rcfile=args.rcfile,
+        session_casts=args.session_casts,
+        replay_mode=args.replay_mode,
+        timeout=args.timeout,
+        time_budget=args.time_budget,
+        max_buffer=args.max_buffer,
+        send_upfront=args.send_upfront,
+        backend=args.backend,
+        segment_jobs=args.segment_jobs,
+        keyframe_interval=args.keyframes,
+        coalesce_window=args.coalesce_ms / 1000 if args.coalesce_ms else None,
+        ir_cache_dir=None if args.no_ir_cache else default_cache_dir(),
+        render_cache=(
+            RenderCache(
+                args.cache_dir,
+                max_size=args.cache_max_size,
+                inputs=args.cache_input + ([args.rcfile] if args.rcfile else []),
+                env_vars=args.cache_env,
+            )
+            if args.cache_dir
+            else None
+        ),
+    )
+
+
+def print_result(result):
+    """Print one line about a rendered scene, and its error if it failed."""
+    status = "ok" if result.ok else f"FAILED ({result.status})"
+    if result.cached:
+        status += " (cached)"
+    print(f"{result.scene}: {status} in {result.elapsed:.2f}s -> {result.output}")
+    if result.error:
+        print(f"  {result.error}", file=sys.stderr)
+
+
+def render_main(argv):
+    """Render many scene files to cast files in parallel."""
+    import argparse
 
-    def __init__(
-        self,
-        typing_delay_range=(0.03, 0.12),
-        jitter_factor=0.01,
-        jitter_range=6,
-        post_typing_delay=0.2,
-        shell="bash",
-        shell_prompt=r"\$ ",
-        timeout=600,
+    from .batch import check_outputs
+    from .batch import render_batch
+
+    parser = argparse.ArgumentParser(
+        description="Render .scene files to .cast files using a pool of worker processes",
+        prog="asciinwriter render",
+    )
+    parser.add_argument("scenes", nargs="+", help="Scene files to render")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Directory for the .cast files (default: next to each scene)",
+    )
+    add_runner_arguments(parser)
+    args = parser.parse_args(argv)
+    try:
+        check_outputs(args.scenes, args.output_dir)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    failed = 0
+    start = time.monotonic()
+    for result in render_batch(
+        args.scenes,
+        output_dir=args.output_dir,
+        jobs=args.jobs,
+        runner_kwargs=runner_kwargs(args),
     ):
-        self.typing_delay_range = typing_delay_range
-        self.jitter_factor = jitter_factor
-        self.jitter_range = jitter_range
-        self.post_typing_delay = post_typing_delay
-        self.shell = shell
-        self.shell_prompt = shell_prompt
-        self.timeout = timeout
-
-    def typing_delay(self):
-        """Calculate a randomized typing delay with jitter."""
-        base_delay = random.uniform(*self.typing_delay_range)
-        jitter = self.jitter_factor * random.randint(0, self.jitter_range)
-        return base_delay + jitter
-
-    def human_type(self, child, text):
-        """Type text with human-like delays."""
-        for c in text:
-            time.sleep(self.typing_delay())
-            child.send(c)
-            c = re.sub(r"([^\r])\n", r"\1\r\n", c)  # Convert \n to \r\n
-            print(c, end="", flush=True)
-        time.sleep(self.typing_delay() + self.post_typing_delay)
-
-    def process_line(self, child, line):
-        """Process a single script line."""
-        match = self.command_re.match(line)
-        if not match:
-            print(f"Error: Invalid command format: '{line}'", file=sys.stderr)
-            sys.exit(1)
-
-        cmd, param = match.group("cmd"), match.group("param").strip()
-
-        match cmd:
-            case "SEND":
-                self.human_type(child, param)
-            case "EXPECT":
-                child.expect(re.escape(param))
-            case "ENTER":
-                try:
-                    count = int(param) if param else 1
-                    for _ in range(count):
-                        child.send("\r")
-                        print("\r", end="", flush=True)
-                except ValueError:
-                    print(
-                        f"Error: ENTER() requires an integer parameter, got '{param}'",
-                        file=sys.stderr,
-                    )
-                    sys.exit(1)
-            case "DELAY":
-                try:
-                    delay = float(param)
-                    time.sleep(delay)
-                except ValueError:
-                    print(
-                        f"Error: DELAY() requires a numeric parameter, got '{param}'",
-                        file=sys.stderr,
-                    )
-                    sys.exit(1)
-
-    def process_file(self, input_file):
-        """Process the script file line by line."""
-        try:
-            with open(input_file) as f:
-                # Initialize pexpect session
-                child = pexpect.spawn(
-                    self.shell,
-                    encoding="utf-8",
-                    timeout=self.timeout,
+        print_result(result)
+        failed += not result.ok
+
+    elapsed = time.monotonic() - start
+    print(
+        f"Rendered {len(args.scenes) - failed}/{len(args.scenes)} scenes in {elapsed:.2f}s"
+    )
+    if failed:
+        sys.exit(1)
+
+
+def positive_float(value):
+    import argparse
+
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def transform_to_file(paths, output, options):
+    """Transform cast files into output, replacing it only once the new one is complete.
+
+    The output can be one of the inputs, which is only read before it is replaced.
+    """
+    from .cast import transform_casts
+    from .files import atomic_write
+
+    with atomic_write(output) as out:
+        transform_casts(paths, out, **options)
+
+
+def cast_main(argv):
+    """Retime, trim and concatenate cast files."""
+    import argparse
+
+    from .cast import transform_casts
+
+    parser = argparse.ArgumentParser(
+        description="Transform asciicast v2 files line by line: cap idle time, change the speed, "
+        "trim to a time range, and concatenate several casts into one",
+        prog="asciinwriter cast",
+    )
+    parser.add_argument("casts", nargs="+", help="Cast files, concatenated in order")
+    parser.add_argument(
+        "-o", "--output", help="Write the result to this file (default: stdout)"
+    )
+    parser.add_argument(
+        "-i",
+        "--in-place",
+        action="store_true",
+        help="Transform each cast file in place instead of concatenating them",
+    )
+    parser.add_argument(
+        "--idle-limit",
+        type=positive_float,
+        metavar="SECONDS",
+        help="Cap the pauses between events to this many seconds",
+    )
+    parser.add_argument(
+        "--speed",
+        type=positive_float,
+        default=1.0,
+        help="Playback speed factor, e.g. 2 for twice as fast (default: 1)",
+    )
+    parser.add_argument(
+        "--start", type=float, metavar="SECONDS", help="Drop events before this time"
+    )
+    parser.add_argument(
+        "--end", type=float, metavar="SECONDS", help="Drop events after this time"
+    )
+    args = parser.parse_args(argv)
+    if args.in_place and args.output:
+        parser.error("--in-place cannot be used with --output")
+
+    options = dict(
+        idle_limit=args.idle_limit, speed=args.speed, start=args.start, end=args.end
+    )
+    try:
+        if args.in_place:
+            for path in args.casts:
+                transform_to_file([path], path, options)
+        elif args.output:
+            transform_to_file(args.casts, args.output, options)
+        else:
+            transform_casts(args.casts, sys.stdout, **options)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def seek_main(argv):
+    """Print the screen of a cast at a given time, using its keyframe index."""
+    import argparse
+
+    from .keyframes import DEFAULT_INTERVAL
+    from .keyframes import seek
+
+    parser = argparse.ArgumentParser(
+        description="Print the screen of a cast file at a given time. The keyframe index "
+        "next to the cast is used, and written first when it is missing or out of date",
+        prog="asciinwriter seek",
+    )
+    parser.add_argument("cast", help="Cast file")
+    parser.add_argument("time", type=float, help="Time in the cast, in seconds")
+    parser.add_argument(
+        "--interval",
+        type=positive_float,
+        default=DEFAULT_INTERVAL,
+        metavar="SECONDS",
+        help=f"Seconds between keyframes of a new index (default: {DEFAULT_INTERVAL:g})",
+    )
+    args = parser.parse_args(argv)
+    try:
+        screen = seek(args.cast, args.time, args.interval)
+    except (IOError, ValueError) as e:
+        print(f"Error reading file '{args.cast}': {e}", file=sys.stderr)
+        sys.exit(1)
+    print("\n".join(screen.display()).rstrip("\n"))
+
+
+def trace_main(argv):
+    """Print the summary of a trace file written with --trace."""
+    import argparse
+
+    from .trace import load_spans
+    from .trace import summary
+
+    parser = argparse.ArgumentParser(
+        description="Summarize a trace file written with --trace",
+        prog="asciinwriter trace",
+    )
+    parser.add_argument("trace_file", help="Trace file to summarize")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of slowest commands to list (default: 10)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        spans = load_spans(args.trace_file)
+    except (IOError, ValueError) as e:
+        print(f"Error reading file '{args.trace_file}': {e}", file=sys.stderr)
+        sys.exit(1)
+    print(summary(spans, top=args.top))
+
+
+def serve_main(argv):
+    """Run the render daemon."""
+    import argparse
+    import signal
+    import socket
+
+    from .serve import default_socket_path
+    from .serve import serve
+
+    parser = argparse.ArgumentParser(
+        description="Render scenes sent by 'asciinwriter client', with shells spawned ahead of time",
+        prog="asciinwriter serve",
+    )
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="Unix socket to listen on (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pool",
+        type=int,
+        default=2,
+        help="Number of shells kept ready at their first prompt (default: 2)",
+    )
+    add_runner_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.replay_mode:
+        parser.error("--record and --replay cannot be used with serve")
+    if args.pool < 1:
+        parser.error("--pool must be at least 1")
+
+    if os.path.exists(args.socket):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(args.socket)
+            except OSError:
+                os.remove(args.socket)  # left behind by a server that died
+            else:
+                print(
+                    f"Error: A server is already listening on '{args.socket}'.",
+                    file=sys.stderr,
                 )
-                child.logfile_read = sys.stdout
-                child.setecho(False)
-                child.expect(self.shell_prompt)
+                sys.exit(1)
 
-                try:
-                    # Read and process one line at a time
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith("#"):
-                            continue
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Listening on {args.socket}", file=sys.stderr)
+    try:
+        serve(args.socket, runner_kwargs(args), args.pool)
+    except KeyboardInterrupt:
+        pass
 
-                        self.process_line(child, line)
-                finally:
-                    child.sendeof()
 
-        except FileNotFoundError:
-            print(f"Error: File '{input_file}' not found.", file=sys.stderr)
-            sys.exit(1)
-        except IOError as e:
-            print(f"Error reading file '{input_file}': {e}", file=sys.stderr)
-            sys.exit(1)
+def watch_main(argv):
+    """Render scenes again each time they change."""
+    import argparse
+    import signal
+
+    from .batch import check_outputs
+    from .watch import DEFAULT_DEBOUNCE
+    from .watch import find_scenes
+    from .watch import watch
+
+    parser = argparse.ArgumentParser(
+        description="Render .scene files to .cast files, and render each scene again when it is saved",
+        prog="asciinwriter watch",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="Scene files, or directories of scene files"
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Directory for the .cast files (default: next to each scene)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=positive_float,
+        default=DEFAULT_DEBOUNCE,
+        metavar="SECONDS",
+        help=f"Wait until no scene changed for this long before rendering (default: {DEFAULT_DEBOUNCE:g})",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Look for changes by polling instead of with inotify",
+    )
+    add_runner_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.replay_mode:
+        parser.error("--record and --replay cannot be used with watch")
+    for path in args.paths:
+        if not os.path.exists(path):
+            parser.error(f"'{path}' not found")
+    try:
+        check_outputs(find_scenes(args.paths), args.output_dir)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # so that the shell kept ready is closed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Watching {', '.join(args.paths)}", file=sys.stderr)
+    try:
+        for result in watch(
+            args.paths,
+            runner_kwargs(args),
+            output_dir=args.output_dir,
+            debounce=args.debounce,
+            poll=args.poll,
+        ):
+            print_result(result)
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+
+
+def client_main(argv):
+    """Send a scene to the render daemon."""
+    import argparse
+
+    from .serve import default_socket_path
+    from .serve import submit
+
+    parser = argparse.ArgumentParser(
+        description="Render a scene with a running 'asciinwriter serve'",
+        prog="asciinwriter client",
+    )
+    parser.add_argument("scene", help="Scene file to render")
+    parser.add_argument(
+        "-o", "--output", help="Cast file to write (default: next to the scene)"
+    )
+    parser.add_argument("--title", help="Title stored in the cast header")
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="Unix socket of the server (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.scene)[0] + ".cast"
+    try:
+        reply = submit(args.socket, args.scene, output, args.title)
+    except OSError as e:
+        print(
+            f"Error: Cannot reach the server on '{args.socket}': {e}", file=sys.stderr
+        )
+        sys.exit(1)
+    sys.stderr.write(reply.get("messages", ""))
+    if reply.get("error"):
+        print(f"Error: {reply['error']}", file=sys.stderr)
+    sys.exit(reply.get("status", 1))
+
+
+SUBCOMMANDS = {
+    "render": render_main,
+    "cast": cast_main,
+    "seek": seek_main,
+    "trace": trace_main,
+    "serve": serve_main,
+    "watch": watch_main,
+    "client": client_main,
+}
+
+
+def process_traced(runner, trace_file, input_file, output_file, title):
+    """Run the scene while writing a trace, then print the slowest commands."""
+    from .trace import summary
+    from .trace import Tracer
+
+    try:
+        runner.tracer = Tracer(open(trace_file, "w"))
+    except IOError as e:
+        print(f"Error writing file '{trace_file}': {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        runner.process_file(input_file, output_file=output_file, title=title)
+    finally:
+        runner.tracer.close()
+        if runner.tracer.spans:
+            print(summary(runner.tracer.spans), file=sys.stderr)
+
+
+def process_measured(runner, metrics_file, input_file, process):
+    """Call process() while the runner collects metrics, then report them.
+
+    The summary is printed to stderr and, with a metrics_file, the metrics are
+    written there for the node exporter, whether the run succeeded or not.
+    """
+    from .metrics import Metrics
+
+    runner.metrics = Metrics()
+    try:
+        process()
+    except SystemExit as e:
+        runner.metrics.status = 1 if isinstance(e.code, str) else e.code or 0
+        raise
+    finally:
+        runner.metrics.finish()
+        print(runner.metrics.summary(), file=sys.stderr)
+        if metrics_file:
+            try:
+                runner.metrics.write_textfile(metrics_file, {"scene": input_file})
+            except IOError as e:
+                print(f"Error writing file '{metrics_file}': {e}", file=sys.stderr)
+                sys.exit(1)
 
 
 def main():
+    # answered before anything else is imported, as it is run very often
+    if sys.argv[1:] == ["--version"]:
+        print(f"asciinwriter {__version__}")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    import argparse
+    import functools
+
+    from .runner import AsciinwriterRunner
+
     parser = argparse.ArgumentParser(
         description="Script and automate interactive terminal sessions for generating asciinema .cast files",
         prog="asciinwriter",
+        epilog="Use 'asciinwriter render --help' to render many scenes in parallel.",
     )
     parser.add_argument(
         "--version", action="version", version=f"%(prog)s {__version__}"
@@ -141,8 +626,43 @@ def main():
         nargs="?",
         help="Path to the .scene script file (can also be set via SCENE_FILE environment variable)",
     )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Write an asciicast v2 file directly instead of printing to the terminal",
+    )
+    parser.add_argument("--title", help="Title stored in the cast header")
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write one JSON line per scene command with its timings, and print the slowest commands",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Print counters of the run at the end: characters typed, time spent typing, "
+        "in DELAY() and blocked on the shell, output read",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="FILE",
+        help="Also write the metrics of the run to FILE in the Prometheus text format "
+        "(implies --metrics)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only compile and validate the scene, without running it",
+    )
+    add_runner_arguments(parser)
 
     args = parser.parse_args()
+    if args.cache_dir and not args.output:
+        parser.error("--cache-dir requires --output")
+    if args.keyframes and not args.output:
+        parser.error("--keyframes requires --output")
+    if args.coalesce_ms and not args.output:
+        parser.error("--coalesce-ms requires --output")
 
     # Determine input file: command line argument takes precedence over environment variable
     input_file = args.input_file or os.environ.get("SCENE_FILE")
@@ -151,9 +671,23 @@ def main():
             "Input file must be specified either as an argument or via SCENE_FILE environment variable"
         )
 
-    # Create runner with default configuration
-    runner = AsciinwriterRunner()
-    runner.process_file(input_file)
+    # Create runner from the command line configuration
+    runner = AsciinwriterRunner(**runner_kwargs(args))
+    if args.check:
+        runner.load_scene(input_file)
+        return
+    if args.trace:
+        process = functools.partial(
+            process_traced, runner, args.trace, input_file, args.output, args.title
+        )
+    else:
+        process = functools.partial(
+            runner.process_file, input_file, output_file=args.output, title=args.title
+        )
+    if args.metrics or args.metrics_file:
+        process_measured(runner, args.metrics_file, input_file, process)
+    else:
+        process()
 
 
 if __name__ == "__main__":
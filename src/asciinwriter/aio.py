@@ -0,0 +1,220 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Concurrent sessions: several shells driven by one scene with asyncio."""
+
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+
+from .cast import CastWriter
+from .output import echo_chunks
+from .output import output_tail
+from .scene import format_command
+from .scene import SceneError
+from .scene import split_sessions
+
+
+class Tee:
+    """File-like object that writes to several outputs."""
+
+    def __init__(self, *outputs):
+        self.outputs = [out for out in outputs if out is not None]
+
+    def write(self, data):
+        for out in self.outputs:
+            out.write(data)
+
+    def flush(self):
+        for out in self.outputs:
+            out.flush()
+
+
+class Session:
+    """One named shell session and where its output goes."""
+
+    def __init__(self, name, child, out):
+        self.name = name
+        self.child = child
+        self.out = out
+        self.last_match = None
+
+
+class SessionRunner:
+    """Runs a scene with several named sessions concurrently.
+
+    Each session executes its own commands in order, in its own asyncio task,
+    so waiting for output in one session never blocks typing in another.
+    SIGNAL(label) and WAIT(label) order commands across sessions. Every
+    session writes to the runner's output; with session_casts, each session
+    is also written to a cast file of its own.
+    """
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.signals = defaultdict(asyncio.Event)
+        self.files = []
+        self.casts = []
+
+    def session_output(self, name):
+        runner = self.runner
+        main_out = runner.cast or runner.terminal
+        if not (runner.cast and runner.session_casts):
+            return main_out
+        base, ext = os.path.splitext(runner.output_file)
+        f = open(f"{base}.{name}{ext or '.cast'}", "w")
+        self.files.append(f)
+        cast = CastWriter(
+            f,
+            runner.clock,
+            width=runner.cols,
+            height=runner.rows,
+            title=name,
+            env=runner.cast.env,
+            timestamp=runner.cast.timestamp,
+            coalesce_window=runner.cast.coalesce_window,
+        )
+        cast.write_header()
+        self.casts.append(cast)
+        return Tee(main_out, cast)
+
+    async def expect_prompt(self, child):
+        method, pattern = self.runner.prompt_expectation()
+        await getattr(child, method)(pattern, async_=True)
+
+    async def start(self, name):
+        start = time.monotonic()
+        child = self.runner.spawn_shell(cast=bool(self.runner.cast))
+        session = Session(name, child, self.session_output(name))
+        child.logfile_read = session.out
+        child.setecho(False)
+        await self.expect_prompt(child)
+        self.runner.spawn_latency = time.monotonic() - start
+        return session
+
+    async def type_text(self, session, text):
+        runner = self.runner
+        delays = runner.typing_delays(len(text) + 1)
+        session.out.flush()
+        if runner.send_upfront:
+            session.child.send(text)
+        for c, shown, delay in zip(text, echo_chunks(text), delays):
+            await asyncio.sleep(delay)
+            if not runner.send_upfront:
+                session.child.send(c)
+            session.out.write(shown)
+        await asyncio.sleep(delays[-1] + runner.post_typing_delay)
+
+    async def execute(self, session, command):
+        """Execute a single compiled scene command in a session."""
+        child = session.child
+        match command.cmd:
+            case "SEND":
+                await self.type_text(session, command.param)
+            case "EXPECT":
+                await child.expect_exact(command.param, async_=True)
+            case "EXPECT_RE":
+                await child.expect_list(
+                    [self.runner.compiled_pattern(command.param)],
+                    searchwindowsize=self.runner.search_window,
+                    async_=True,
+                )
+            case "EXPECT_ANY":
+                index = await child.expect_exact(command.param, async_=True)
+                session.last_match = index + 1
+            case "ON":
+                index, inner = command.param
+                if index == session.last_match:
+                    await self.execute(session, inner)
+            case "TIMEOUT":
+                seconds, inner = command.param
+                try:
+                    await asyncio.wait_for(self.execute(session, inner), seconds)
+                except asyncio.TimeoutError:
+                    raise SceneError(
+                        f"timed out after {seconds:g}s waiting at {format_command(inner)} "
+                        f"in session '{session.name}'",
+                        command.lineno,
+                    ) from None
+            case "EXPECT_PROMPT":
+                await self.expect_prompt(child)
+            case "ENTER":
+                for _ in range(command.param):
+                    child.send("\r")
+                    session.out.write("\r")
+            case "DELAY":
+                await asyncio.sleep(command.param)
+            case "SIGNAL":
+                self.signals[command.param].set()
+            case "WAIT":
+                await self.wait(session, command)
+
+    async def wait(self, session, command):
+        try:
+            await asyncio.wait_for(
+                self.signals[command.param].wait(), self.runner.timeout
+            )
+        except asyncio.TimeoutError:
+            raise SceneError(
+                f"WAIT({command.param}) timed out in session '{session.name}'",
+                command.lineno,
+            ) from None
+
+    async def run_track(self, session, track):
+        from pexpect import EOF
+        from pexpect import TIMEOUT
+
+        for command in track:
+            try:
+                await self.execute(session, command)
+            except (EOF, TIMEOUT) as e:
+                reason = "the shell exited" if isinstance(e, EOF) else "timed out"
+                raise SceneError(
+                    f"{reason} while waiting at {format_command(command)} in session "
+                    f"'{session.name}'\nLast output:\n{output_tail(session.child.before)}",
+                    command.lineno,
+                ) from None
+
+    async def run(self, commands):
+        tracks = split_sessions(commands)
+        sessions = await asyncio.gather(*(self.start(name) for name in tracks))
+        try:
+            await asyncio.gather(
+                *(self.run_track(session, tracks[session.name]) for session in sessions)
+            )
+        except BaseException:
+            # do not leave commands that hang running after a failure
+            for session in sessions:
+                session.child.close(force=True)
+            raise
+        else:
+            for session in sessions:
+                session.child.sendeof()
+        finally:
+            for cast in self.casts:
+                cast.write_pending()
+            for f in self.files:
+                f.close()
+
+
+def run_sessions(runner, commands):
+    """Run a scene that declares sessions, exiting with an error if it fails."""
+    try:
+        # sessions sleep in real time, so the cast clock follows the real clock
+        with runner.waiting():
+            asyncio.run(run_with_budget(runner, commands))
+    except SceneError as e:
+        e.filename = runner.scene_file
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+async def run_with_budget(runner, commands):
+    try:
+        await asyncio.wait_for(SessionRunner(runner).run(commands), runner.time_budget)
+    except asyncio.TimeoutError:
+        raise SceneError(f"time budget of {runner.time_budget:g}s exceeded") from None
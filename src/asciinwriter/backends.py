@@ -0,0 +1,310 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Ways of running the shell a scene is typed into.
+
+A backend is a function called like pexpect.spawn, with the shell, encoding,
+timeout and optionally args, env, cwd and dimensions, that returns a child
+with pexpect's interface. ReplayChild has the same interface, and stands in
+for the shell when a recording is replayed.
+"""
+
+import errno
+import fcntl
+import os
+import pty
+import select
+import signal
+import struct
+import termios
+import time
+
+import pexpect
+from pexpect import EOF
+from pexpect import TIMEOUT
+from pexpect.spawnbase import SpawnBase
+
+from .shell import SENTINEL_PROMPT
+
+# Seconds a closed shell is given to exit after its terminal hangs up
+HANGUP_GRACE = 0.5
+
+
+def spawn_pexpect(shell, encoding="utf-8", timeout=30, **kwargs):
+    """Spawn the shell with pexpect.spawn."""
+    return pexpect.spawn(shell, encoding=encoding, timeout=timeout, **kwargs)
+
+
+class PtyChild(SpawnBase):
+    """A shell on a pty, read with select and os.read.
+
+    pexpect.spawn checks that the child is alive around every read, and sleeps
+    before every send, after every read and on close. This child does none of
+    that: a read waits on the pty and decodes what it gets, and a shell that
+    is gone shows as an EOF. The expect methods are pexpect's own.
+    """
+
+    def __init__(
+        self,
+        shell,
+        args=(),
+        env=None,
+        cwd=None,
+        dimensions=None,
+        encoding="utf-8",
+        timeout=30,
+    ):
+        super().__init__(timeout=timeout, encoding=encoding)
+        self.delaybeforesend = None
+        self.delayafterread = None
+        self.args = [shell, *args]
+        self.name = " ".join(self.args)
+        self.pid, self.child_fd = pty.fork()
+        if self.pid == 0:
+            self.exec_shell(env, cwd, dimensions)
+        self.closed = False
+        self.terminated = False
+
+    def exec_shell(self, env, cwd, dimensions):
+        """Run the shell in the forked child, with the pty as its terminal."""
+        try:
+            if dimensions:
+                rows, cols = dimensions
+                winsize = struct.pack("HHHH", rows, cols, 0, 0)
+                fcntl.ioctl(pty.STDOUT_FILENO, termios.TIOCSWINSZ, winsize)
+            if cwd:
+                os.chdir(cwd)
+            if env is None:
+                os.execvp(self.args[0], self.args)
+            os.execvpe(self.args[0], self.args, env)
+        except BaseException as e:
+            # the error shows in the output the runner reads
+            os.write(
+                pty.STDERR_FILENO, f"Error: cannot run {self.args[0]}: {e}\r\n".encode()
+            )
+        os._exit(127)
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if timeout == -1:
+            timeout = self.timeout
+        if not select.select([self.child_fd], [], [], timeout)[0]:
+            raise TIMEOUT("Timeout exceeded.")
+        try:
+            data = os.read(self.child_fd, size)
+        except OSError as e:
+            if e.errno != errno.EIO:
+                raise
+            data = b""  # Linux reports the other side closing as EIO
+        if not data:
+            self.flag_eof = True
+            self.isalive()
+            raise EOF("End Of File (EOF). The shell exited.")
+        s = self._decoder.decode(data, final=False)
+        self._log(s, "read")
+        return s
+
+    def send(self, s):
+        s = self._coerce_send_string(s)
+        self._log(s, "send")
+        data = self._encoder.encode(s, final=False)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.child_fd, view) :]
+        return len(data)
+
+    def sendeof(self):
+        eof = termios.tcgetattr(self.child_fd)[6][termios.VEOF]
+        os.write(self.child_fd, eof)
+
+    def setecho(self, state):
+        attr = termios.tcgetattr(self.child_fd)
+        if state:
+            attr[3] |= termios.ECHO
+        else:
+            attr[3] &= ~termios.ECHO
+        termios.tcsetattr(self.child_fd, termios.TCSANOW, attr)
+
+    def isalive(self):
+        if self.terminated:
+            return False
+        try:
+            # after an EOF, the shell is exiting, so wait for it as pexpect does
+            pid, status = os.waitpid(self.pid, 0 if self.flag_eof else os.WNOHANG)
+        except ChildProcessError:
+            pid, status = self.pid, 0
+        if pid == 0:
+            return True
+        self.status = status
+        self.exitstatus = os.waitstatus_to_exitcode(status)
+        if self.exitstatus < 0:
+            self.exitstatus, self.signalstatus = None, -self.exitstatus
+        self.terminated = True
+        return False
+
+    def kill(self, sig):
+        if not self.terminated:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def close(self, force=True):
+        """Close the pty, which hangs up the shell, and reap it.
+
+        A shell still running after HANGUP_GRACE seconds is killed if force is
+        set, and left to exit on its own otherwise.
+        """
+        if self.closed:
+            return
+        os.close(self.child_fd)
+        self.child_fd = -1
+        self.closed = True
+        self.kill(signal.SIGHUP)
+        self.kill(signal.SIGCONT)
+        end = time.monotonic() + HANGUP_GRACE
+        while self.isalive() and time.monotonic() < end:
+            time.sleep(0.001)
+        if force and self.isalive():
+            self.kill(signal.SIGKILL)
+            os.waitpid(self.pid, 0)
+            self.terminated = True
+
+
+class FakeShell(SpawnBase):
+    """A shell kept in memory, for tests that do not need a real one.
+
+    It shows a prompt, the sentinel prompt if PS1 is in env as bootstrapped
+    shells have it, and echoes what it is sent until echo is turned off. A
+    line is answered with a new line, the output outputs gives for it (a dict
+    or a function of the line) and a new prompt; "exit" and end-of-file end
+    the shell. Reads never block: waiting for output that never comes times
+    out at once.
+    """
+
+    def __init__(
+        self,
+        shell="sh",
+        args=(),
+        env=None,
+        cwd=None,
+        dimensions=None,
+        encoding="utf-8",
+        timeout=30,
+        outputs=None,
+    ):
+        super().__init__(timeout=timeout, encoding=encoding)
+        self.prompt = SENTINEL_PROMPT if env and "PS1" in env else "$ "
+        if callable(outputs):
+            self.respond = outputs
+        else:
+            outputs = outputs or {}
+            self.respond = lambda line: outputs.get(line, "")
+        self.echo = True
+        self.line = ""
+        self.pending = self.prompt
+        self.lines = []
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if not self.pending:
+            if self.flag_eof:
+                raise EOF("End Of File (EOF). The shell exited.")
+            raise TIMEOUT("Timeout exceeded.")
+        s, self.pending = self.pending[:size], self.pending[size:]
+        self._log(s, "read")
+        return s
+
+    def send(self, s):
+        s = self._coerce_send_string(s)
+        self._log(s, "send")
+        for c in s:
+            self.type(c)
+        return len(s)
+
+    def type(self, c):
+        if self.flag_eof:
+            return
+        if c in "\r\n":
+            self.pending += "\r\n"
+            self.enter(self.line)
+            self.line = ""
+        elif c == "\x04" and not self.line:
+            self.flag_eof = True
+        else:
+            self.pending += c if self.echo else ""
+            self.line += c
+
+    def enter(self, line):
+        self.lines.append(line)
+        if line.strip() == "exit":
+            self.flag_eof = True
+            return
+        output = self.respond(line) or ""
+        if output and not output.endswith("\n"):
+            output += "\n"
+        self.pending += output.replace("\r\n", "\n").replace("\n", "\r\n")
+        self.pending += self.prompt
+
+    def sendeof(self):
+        self.send("\x04")
+
+    def setecho(self, state):
+        self.echo = state
+
+    def isalive(self):
+        return not self.flag_eof
+
+    def close(self, force=True):
+        self.flag_eof = True
+        self.closed = True
+
+
+class ReplayChild(SpawnBase):
+    """Stands in for a shell, playing back the output of a Recording.
+
+    The expect methods are pexpect's own, so EXPECT commands match the replayed
+    output exactly as they matched the shell. Before each chunk is read, sleep
+    is called with the time the shell took to produce it. Sent input is
+    discarded, and the end of the recording is an EOF.
+    """
+
+    def __init__(self, recording, sleep, timeout=30, encoding="utf-8"):
+        super().__init__(timeout=timeout, encoding=encoding)
+        self.chunks = iter(recording.chunks)
+        self.sleep = sleep
+
+    def read_nonblocking(self, size=1, timeout=None):
+        try:
+            delay, data = next(self.chunks)
+        except StopIteration:
+            self.flag_eof = True
+            raise EOF("End of the recording") from None
+        self.sleep(delay)
+        self._log(data, "read")
+        return data
+
+    def send(self, s):
+        self._log(s, "send")
+        return len(s)
+
+    def setecho(self, state):
+        pass
+
+    def sendeof(self):
+        pass
+
+    def isalive(self):
+        return not self.flag_eof
+
+    def close(self, force=True):
+        self.closed = True
+
+
+# The backends the --backend option can select
+BACKENDS = {
+    "pexpect": spawn_pexpect,
+    "pty": PtyChild,
+}
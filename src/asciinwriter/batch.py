@@ -0,0 +1,144 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+import os
+import time
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+
+@dataclass
+class RenderResult:
+    """Outcome of rendering one scene file."""
+
+    scene: str
+    output: str
+    status: int
+    elapsed: float
+    error: str = None
+    cached: bool = False
+
+    @property
+    def ok(self):
+        return self.status == 0
+
+
+def cast_path(scene, output_dir=None):
+    """Return the .cast path for a scene, next to it or inside output_dir."""
+    base = os.path.splitext(os.path.basename(scene))[0] + ".cast"
+    if output_dir:
+        return os.path.join(output_dir, base)
+    return os.path.join(os.path.dirname(scene), base)
+
+
+def check_outputs(scenes, output_dir=None):
+    """Raise ValueError if two scenes would be rendered to the same cast file."""
+    seen = {}
+    for scene in scenes:
+        output = os.path.normpath(cast_path(scene, output_dir))
+        if output in seen:
+            raise ValueError(
+                f"'{seen[output]}' and '{scene}' would both be rendered to '{output}'"
+            )
+        seen[output] = scene
+
+
+def render_scene(scene, output, runner_kwargs=None, title=None):
+    """Render a single scene to a cast file. Runs inside a worker process."""
+    from .runner import AsciinwriterRunner
+
+    start = time.monotonic()
+    status, error, cached = 0, None, False
+    try:
+        runner = AsciinwriterRunner(**(runner_kwargs or {}))
+        cached = runner.process_file(scene, output_file=output, title=title)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        status, error = 1, f"{type(e).__name__}: {e}"
+    elapsed = time.monotonic() - start
+    return RenderResult(scene, output, status, elapsed, error, cached)
+
+
+def render_batch(scenes, output_dir=None, jobs=None, runner_kwargs=None):
+    """Render scenes concurrently, one runner and pty per worker process.
+
+    Yields a RenderResult for each scene as soon as it finishes. Raises
+    ValueError, before rendering any, if two scenes have the same cast file.
+    """
+    check_outputs(scenes, output_dir)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(
+                render_scene, scene, cast_path(scene, output_dir), runner_kwargs
+            )
+            for scene in scenes
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def render_segment(
+    commands, output, runner_kwargs, scene_file, title, preamble, continued
+):
+    """Render one segment of a scene to a cast file. Runs inside a worker process."""
+    from .runner import AsciinwriterRunner
+
+    start = time.monotonic()
+    status, error = 0, None
+    try:
+        runner = AsciinwriterRunner(**runner_kwargs)
+        runner.scene_file = scene_file
+        runner.record(commands, output, title, preamble=preamble, continued=continued)
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        status, error = 1, f"{type(e).__name__}: {e}"
+    return RenderResult(scene_file, output, status, time.monotonic() - start, error)
+
+
+def render_segments(
+    segments,
+    preamble,
+    output_dir,
+    jobs=None,
+    runner_kwargs=None,
+    scene_file=None,
+    title=None,
+):
+    """Render the segments of a scene concurrently, one runner and pty per worker.
+
+    Each segment is written to its own cast in output_dir, and runs the
+    preamble first without showing it. A seed is varied per segment, so that
+    segments do not all type alike. Yields a RenderResult, with the name of
+    the segment as its scene, for each segment in order.
+    """
+    runner_kwargs = runner_kwargs or {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for index, (name, commands) in enumerate(segments):
+            kwargs = dict(runner_kwargs)
+            if kwargs.get("seed") is not None:
+                kwargs["seed"] += index
+            output = os.path.join(output_dir, f"{index:04d}.cast")
+            futures.append(
+                pool.submit(
+                    render_segment,
+                    commands,
+                    output,
+                    kwargs,
+                    scene_file,
+                    title,
+                    preamble,
+                    index > 0,
+                )
+            )
+        for (name, _), future in zip(segments, futures):
+            result = future.result()
+            result.scene = name
+            yield result
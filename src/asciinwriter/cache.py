@@ -0,0 +1,119 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+import hashlib
+import json
+import os
+import shutil
+
+from . import __version__
+from .files import atomic_write
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(text):
+    """Parse a size such as '512M' or '2G' into bytes."""
+    text = text.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+    return int(float(text[: len(text) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Content-addressed store of rendered casts with size-bounded LRU eviction.
+
+    Entries are keyed on the scene contents, the runner parameters and any
+    extra input files or environment variables the scene depends on. The
+    modification time of an entry is its last use, so the oldest ones are
+    evicted first once the cache grows beyond max_size.
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE, inputs=(), env_vars=()):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.inputs = tuple(inputs)
+        self.env_vars = tuple(env_vars)
+
+    @property
+    def casts_dir(self):
+        return os.path.join(self.cache_dir, "casts")
+
+    def key(self, input_file, params, inputs=()):
+        """Return the cache key for rendering input_file with the given parameters.
+
+        inputs are files this render depends on, on top of the cache's own inputs.
+        """
+        material = {
+            "asciinwriter": __version__,
+            "scene": _file_digest(input_file),
+            "params": params,
+            "inputs": {
+                path: _file_digest(path) for path in self.inputs + tuple(inputs)
+            },
+            "env": {var: os.environ.get(var) for var in self.env_vars},
+        }
+        data = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.casts_dir, key + ".cast")
+
+    def get(self, key, dest):
+        """Copy the cached cast for key to dest. Returns False on a cache miss.
+
+        A cache that cannot be read is a miss too.
+        """
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, dest)
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def put(self, key, src):
+        """Store the cast at src under key, then evict old entries if needed.
+
+        Raises OSError if the cache cannot be written.
+        """
+        os.makedirs(self.casts_dir, exist_ok=True)
+        path = self._path(key)
+        with open(src, "rb") as f, atomic_write(path, "wb") as out:
+            shutil.copyfileobj(f, out)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size."""
+        entries = []
+        for entry in os.scandir(self.casts_dir):
+            if entry.name.endswith(".cast"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
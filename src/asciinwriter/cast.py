@@ -0,0 +1,205 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+import json
+import time
+from contextlib import contextmanager
+
+
+class VirtualClock:
+    """Clock made of every sleep that was skipped plus the real time spent waiting.
+
+    Only time spent inside waiting() is taken from the real clock, so the
+    runner's own overhead never shows up in the timestamps.
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.wait_start = None
+        self.sleeps = 0
+
+    def sleep(self, seconds):
+        """Advance the clock without actually sleeping."""
+        self.elapsed += seconds
+        self.sleeps += 1
+
+    def now(self):
+        """Return the virtual time, in seconds, since the clock was created."""
+        if self.wait_start is None:
+            return self.elapsed
+        return self.elapsed + time.monotonic() - self.wait_start
+
+    @contextmanager
+    def waiting(self):
+        """Count real time while blocked on the child process."""
+        self.wait_start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.elapsed = self.now()
+            self.wait_start = None
+
+
+class CastWriter:
+    """Writes asciicast v2 files: a JSON header line followed by one event per line.
+
+    With a coalesce_window, in seconds, writes made less than that after the
+    first write of an event are merged into it, unless the clock slept in
+    between, so typing keeps one event per key. The last event is only
+    written by write_pending().
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        clock,
+        width=80,
+        height=24,
+        title=None,
+        env=None,
+        timestamp=None,
+        coalesce_window=None,
+    ):
+        self.fileobj = fileobj
+        self.clock = clock
+        self.width = width
+        self.height = height
+        self.title = title
+        self.env = env or {}
+        self.timestamp = timestamp
+        self.coalesce_window = coalesce_window
+        self.pending = None  # [time, clock sleeps, data] of the event being merged
+
+    def write_header(self):
+        """Write the asciicast v2 header."""
+        header = {"version": 2, "width": self.width, "height": self.height}
+        if self.timestamp is not None:
+            header["timestamp"] = self.timestamp
+        if self.title:
+            header["title"] = self.title
+        if self.env:
+            header["env"] = self.env
+        self.fileobj.write(json.dumps(header) + "\n")
+
+    def write(self, data):
+        """Record data as an output event at the current virtual time."""
+        if not data:
+            return
+        now = round(self.clock.now(), 6)
+        if not self.coalesce_window:
+            self.write_event(now, data)
+            return
+        pending = self.pending
+        if (
+            pending
+            and pending[1] == self.clock.sleeps
+            and now - pending[0] < self.coalesce_window
+        ):
+            pending[2].append(data)
+            return
+        self.write_pending()
+        self.pending = [now, self.clock.sleeps, [data]]
+
+    def write_pending(self):
+        """Write the event that later writes could still be merged into, if any."""
+        if self.pending:
+            now, _, parts = self.pending
+            self.pending = None
+            self.write_event(now, "".join(parts))
+
+    def write_event(self, now, data):
+        self.fileobj.write(json.dumps([now, "o", data]) + "\n")
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def read_header(fileobj):
+    """Read and check the header line of an asciicast v2 file."""
+    try:
+        header = json.loads(fileobj.readline())
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("version") != 2:
+        raise ValueError("not an asciicast v2 file")
+    return header
+
+
+class Retimer:
+    """Rewrites the timestamps of cast events as they stream past.
+
+    Events outside start..end are dropped, gaps between events are capped at
+    idle_limit seconds of the original recording, and the result is divided by
+    speed. Each call to events() continues where the previous one ended, so
+    several casts can be concatenated. Only the timestamp of each event line is
+    parsed; the rest of the line is passed through untouched.
+    """
+
+    def __init__(self, idle_limit=None, speed=1.0, start=None, end=None):
+        self.idle_limit = idle_limit
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.offset = 0.0
+
+    def events(self, lines):
+        """Yield the event lines of one cast with their new timestamps."""
+        start, end, idle_limit = self.start, self.end, self.idle_limit
+        previous = start or 0.0
+        now = self.offset
+        for line in lines:
+            stamp, sep, rest = line.partition(",")
+            if not sep:
+                continue  # blank line
+            t = float(stamp.lstrip("[ "))
+            if start is not None and t < start:
+                continue
+            if end is not None and t > end:
+                break
+            gap = t - previous
+            if idle_limit is not None and gap > idle_limit:
+                gap = idle_limit
+            now += gap / self.speed
+            previous = t
+            if not rest.endswith("\n"):
+                rest += "\n"
+            yield f"[{round(now, 6)},{rest}"
+        self.offset = now
+
+
+def merge_headers(headers, idle_limit=None):
+    """Return the header for the concatenation of casts with these headers."""
+    header = dict(headers[0])
+    header["width"] = max(h.get("width", 80) for h in headers)
+    header["height"] = max(h.get("height", 24) for h in headers)
+    header.pop("duration", None)
+    if idle_limit is not None:
+        header.pop("idle_time_limit", None)
+    return header
+
+
+def transform_casts(paths, out, idle_limit=None, speed=1.0, start=None, end=None):
+    """Write the concatenation of the cast files in paths to out, retimed.
+
+    The casts are streamed line by line, so memory use does not grow with
+    their size. The time range applies to each input cast.
+    """
+    headers = []
+    for path in paths:
+        with open(path) as f:
+            try:
+                headers.append(read_header(f))
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+    out.write(json.dumps(merge_headers(headers, idle_limit)) + "\n")
+
+    retimer = Retimer(idle_limit=idle_limit, speed=speed, start=start, end=end)
+    for path in paths:
+        with open(path) as f:
+            f.readline()
+            try:
+                out.writelines(retimer.events(f))
+            except ValueError:
+                raise ValueError(f"{path}: invalid event line") from None
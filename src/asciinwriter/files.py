@@ -0,0 +1,39 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Writing files so that readers only ever see them complete."""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# mkstemp creates files only the owner can read; the files written here get
+# the permissions open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(path, mode="w", opener=open, **kwargs):
+    """Context yielding a file that replaces path once it is written and closed.
+
+    The file is opened with opener (such as gzip.open) in a temporary file of
+    its own next to path, so that concurrent writers, in threads or
+    processes, never share it. It is removed if writing fails.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory or None)
+    try:
+        os.fchmod(fd, 0o666 & ~_UMASK)
+        os.close(fd)
+        with opener(tmp, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
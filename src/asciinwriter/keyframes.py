@@ -0,0 +1,168 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Keyframe indexes, to show the screen of a cast at any time without playing it all."""
+
+import bisect
+import gzip
+import json
+import os
+
+from .cast import read_header
+from .files import atomic_write
+from .screen import Screen
+
+FORMAT_VERSION = 1
+
+# Seconds of cast between two keyframes
+DEFAULT_INTERVAL = 5.0
+
+
+def index_path(cast):
+    """Return the path of the keyframe index kept next to a cast file."""
+    return os.path.splitext(cast)[0] + ".keyframes.gz"
+
+
+def _cast_id(cast):
+    """Return what tells whether an index was made from the current cast file."""
+    st = os.stat(cast)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _events(f):
+    """Yield (offset, time, line) for the event lines of a cast opened in binary mode."""
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            return
+        stamp, sep, _ = line.partition(b",")
+        if sep:
+            yield offset, float(stamp.lstrip(b"[ ")), line
+
+
+def _apply(screen, line):
+    _, kind, data = json.loads(line)
+    if kind == "o":
+        screen.feed(data)
+
+
+class KeyframeIndex:
+    """Snapshots of the screen of a cast, every interval seconds.
+
+    Each keyframe has the state of the screen once every event up to its time
+    was applied, and the byte offset of the first event after that.
+    """
+
+    def __init__(self, keyframes, interval, width, height, start, cast_id=None):
+        self.keyframes = keyframes
+        self.times = [k["time"] for k in keyframes]
+        self.interval = interval
+        self.width = width
+        self.height = height
+        self.start = start
+        self.cast_id = cast_id
+
+    @classmethod
+    def build(cls, cast, interval=DEFAULT_INTERVAL):
+        """Play the cast once, taking a snapshot of the screen every interval seconds."""
+        keyframes = []
+        with open(cast, "rb") as f:
+            header = read_header(f)
+            width, height = header.get("width", 80), header.get("height", 24)
+            start = f.tell()
+            screen = Screen(width, height)
+            next_time = 0.0
+            for offset, t, line in _events(f):
+                if t > next_time:
+                    snapshot = screen.snapshot()
+                    keyframes.append(
+                        {"time": next_time, "offset": offset, "screen": snapshot}
+                    )
+                    # a pause longer than the interval needs a single keyframe
+                    while t > next_time:
+                        next_time += interval
+                _apply(screen, line)
+        return cls(keyframes, interval, width, height, start, _cast_id(cast))
+
+    def save(self, path):
+        """Write the index as gzipped JSON lines, replacing path atomically."""
+        with atomic_write(path, "wt", gzip.open, encoding="utf-8") as f:
+            header = {
+                "version": FORMAT_VERSION,
+                "interval": self.interval,
+                "width": self.width,
+                "height": self.height,
+                "start": self.start,
+                "cast": self.cast_id,
+            }
+            f.write(json.dumps(header) + "\n")
+            for keyframe in self.keyframes:
+                f.write(json.dumps(keyframe) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(
+                    f"unsupported keyframe index version {header.get('version')}"
+                )
+            keyframes = [json.loads(line) for line in f]
+        return cls(
+            keyframes,
+            header["interval"],
+            header["width"],
+            header["height"],
+            header["start"],
+            header["cast"],
+        )
+
+    def nearest(self, t):
+        """Return the last keyframe at or before t, or None if t is before the first."""
+        i = bisect.bisect_right(self.times, t)
+        return self.keyframes[i - 1] if i else None
+
+    def seek(self, cast, t):
+        """Return the screen of the cast at time t, playing only from the nearest keyframe."""
+        keyframe = self.nearest(t)
+        if keyframe is None:
+            screen, offset = Screen(self.width, self.height), self.start
+        else:
+            screen = Screen.from_snapshot(keyframe["screen"], self.width, self.height)
+            offset = keyframe["offset"]
+        with open(cast, "rb") as f:
+            f.seek(offset)
+            for _, event_time, line in _events(f):
+                if event_time > t:
+                    break
+                _apply(screen, line)
+        return screen
+
+
+def write_index(cast, interval=DEFAULT_INTERVAL):
+    """Build the keyframe index of a cast file and save it next to it."""
+    index = KeyframeIndex.build(cast, interval)
+    index.save(index_path(cast))
+    return index
+
+
+def load_index(cast):
+    """Return the saved index of a cast, or None if there is none or it is out of date."""
+    try:
+        index = KeyframeIndex.load(index_path(cast))
+    except (OSError, ValueError, KeyError):
+        return None
+    return index if index.cast_id == _cast_id(cast) else None
+
+
+def seek(cast, t, interval=DEFAULT_INTERVAL):
+    """Return the screen of a cast file at time t.
+
+    The saved index is used when it is up to date; otherwise a new one is
+    built and saved first.
+    """
+    index = load_index(cast) or write_index(cast, interval)
+    return index.seek(cast, t)
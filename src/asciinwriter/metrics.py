@@ -0,0 +1,192 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Counters and histograms of a run, and their export as a Prometheus textfile."""
+
+import bisect
+import time
+
+from .files import atomic_write
+
+# Upper bounds, in seconds, of the histogram buckets
+SPAWN_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Yield (upper bound, count of values up to it), as Prometheus reports them."""
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics:
+    """What a run did and where its time went.
+
+    The runner adds to the counters as it goes. Sleeping is split between
+    typing and DELAY(), and is virtual time when writing a cast. bytes_read is
+    the output of the child, in bytes, and peak_buffer the most output, in
+    characters, pexpect held when an EXPECT matched.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.duration = None
+        self.status = 0
+        self.chars_typed = 0
+        self.commands = 0
+        self.sleeping = 0.0
+        self.delay = 0.0
+        self.blocked = 0.0
+        self.bytes_read = 0
+        self.peak_buffer = 0
+        self.spawn_latency = Histogram(SPAWN_BUCKETS)
+        self.waits = Histogram(WAIT_BUCKETS)
+
+    @property
+    def typing(self):
+        """Time slept while typing, which is all the sleeping outside of DELAY()."""
+        return self.sleeping - self.delay
+
+    def wait(self, seconds):
+        self.blocked += seconds
+        self.waits.observe(seconds)
+
+    def buffer(self, size):
+        self.peak_buffer = max(self.peak_buffer, size)
+
+    def finish(self):
+        self.duration = time.monotonic() - self.start
+
+    def summary(self):
+        """Return a short report of the run."""
+        spawns = self.spawn_latency
+        spawn = f"{spawns.sum / spawns.count:.3f}s" if spawns.count else "-"
+        return "\n".join(
+            [
+                f"{self.commands} commands, {self.chars_typed} characters typed, "
+                f"{self.bytes_read} bytes of output, peak buffer {self.peak_buffer}",
+                f"ran {self.duration or 0:.3f}s, blocked {self.blocked:.3f}s in "
+                f"{self.waits.count} waits, shell spawn {spawn}; slept "
+                f"{self.typing:.3f}s typing and {self.delay:.3f}s in DELAY()",
+            ]
+        )
+
+    def prometheus(self, labels=None):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = []
+        label_text = ",".join(
+            f'{name}="{_escape(value)}"' for name, value in (labels or {}).items()
+        )
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP asciinwriter_{name} {help_text}")
+            lines.append(f"# TYPE asciinwriter_{name} {kind}")
+            for suffix, extra, value in samples:
+                names = ",".join(filter(None, [label_text, extra]))
+                labelled = f"{{{names}}}" if names else ""
+                lines.append(f"asciinwriter_{name}{suffix}{labelled} {_number(value)}")
+
+        def histogram(name, help_text, hist):
+            samples = [
+                ("_bucket", f'le="{bound}"', count)
+                for bound, count in hist.cumulative()
+            ]
+            samples += [("_sum", "", hist.sum), ("_count", "", hist.count)]
+            metric(name, "histogram", help_text, samples)
+
+        metric(
+            "run_duration_seconds",
+            "gauge",
+            "Wall clock time of the run.",
+            [("", "", self.duration or 0)],
+        )
+        metric(
+            "run_status",
+            "gauge",
+            "Exit status of the run, 0 when it succeeded.",
+            [("", "", self.status)],
+        )
+        metric(
+            "run_timestamp_seconds",
+            "gauge",
+            "Time the run ended, in seconds since the epoch.",
+            [("", "", time.time())],
+        )
+        metric(
+            "commands_total",
+            "counter",
+            "Scene commands executed.",
+            [("", "", self.commands)],
+        )
+        metric(
+            "characters_typed_total",
+            "counter",
+            "Characters typed by SEND().",
+            [("", "", self.chars_typed)],
+        )
+        metric(
+            "sleep_seconds_total",
+            "counter",
+            "Time slept, for typing or in DELAY(); virtual when writing a cast.",
+            [("", 'kind="typing"', self.typing), ("", 'kind="delay"', self.delay)],
+        )
+        metric(
+            "blocked_seconds_total",
+            "counter",
+            "Time blocked waiting for the shell.",
+            [("", "", self.blocked)],
+        )
+        metric(
+            "output_bytes_total",
+            "counter",
+            "Bytes of output read from the shell, encoded in UTF-8.",
+            [("", "", self.bytes_read)],
+        )
+        metric(
+            "peak_buffer_characters",
+            "gauge",
+            "Most output held by pexpect when an EXPECT matched.",
+            [("", "", self.peak_buffer)],
+        )
+        histogram(
+            "spawn_latency_seconds",
+            "Time from spawning the shell to its first prompt.",
+            self.spawn_latency,
+        )
+        histogram(
+            "wait_seconds", "Time blocked in each wait for the shell.", self.waits
+        )
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path, labels=None):
+        """Write the metrics for the node exporter textfile collector, replacing path atomically."""
+        with atomic_write(path) as f:
+            f.write(self.prometheus(labels))
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(round(value, 6))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,110 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+import io
+import os
+import sys
+
+
+def echo_chunks(text):
+    """Translate text into what is shown for each typed character.
+
+    A newline that is not preceded by a carriage return is shown as \\r\\n. The
+    check looks at the whole payload, so a \\r\\n pair is left alone even though
+    it is typed as two separate characters.
+    """
+    chunks = list(text)
+    for i, c in enumerate(chunks):
+        if c == "\n" and (i == 0 or text[i - 1] != "\r"):
+            chunks[i] = "\r\n"
+    return chunks
+
+
+def output_tail(text, lines=10):
+    """Return the last lines of output, indented and with control characters escaped."""
+    if not isinstance(text, str) or not text.strip():
+        return "  (no output)"
+    tail = text.replace("\r\n", "\n").rstrip("\r\n").split("\n")[-lines:]
+    return "\n".join(
+        "  | "
+        + "".join(c if c.isprintable() else repr(c)[1:-1] for c in line.rstrip("\r"))
+        for line in tail
+    )
+
+
+class TerminalWriter:
+    """Writes echoed text straight to the file descriptor behind sys.stdout.
+
+    This skips print() and the text layer of sys.stdout for every keystroke.
+    Callers must flush() before writing, so that anything already buffered in
+    sys.stdout comes out first.
+    """
+
+    def __init__(self):
+        self.stream = None
+        self.fd = None
+
+    def _resolve(self):
+        stream = sys.stdout
+        if stream is not self.stream:
+            self.stream = stream
+            try:
+                self.fd = stream.fileno()
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                self.fd = None
+        return self.fd
+
+    def write(self, data):
+        fd = self._resolve()
+        if fd is None:
+            self.stream.write(data)
+            self.stream.flush()
+            return
+        data = data.encode("utf-8")
+        while data:
+            data = data[os.write(fd, data) :]
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class RingBuffer:
+    """In-memory text buffer that only keeps the last limit characters written.
+
+    It stands in for the io.StringIO buffers pexpect keeps the child output
+    in. Positions given to tell() and seek() count every character ever
+    written, as they would in a StringIO; seeking to a dropped position goes
+    to the oldest character kept instead. Old text is dropped in batches, so
+    a write costs O(1) amortized.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.start = 0
+        self.io = io.StringIO()
+
+    def write(self, data):
+        n = self.io.write(data)
+        if self.io.tell() > 2 * self.limit:
+            kept = self.io.getvalue()[-self.limit :]
+            self.start += self.io.tell() - len(kept)
+            self.io = io.StringIO(kept)
+            self.io.seek(0, io.SEEK_END)
+        return n
+
+    def getvalue(self):
+        value = self.io.getvalue()
+        return value[-self.limit :] if len(value) > self.limit else value
+
+    def tell(self):
+        return self.start + self.io.tell()
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            return self.start + self.io.seek(max(0, pos - self.start))
+        return self.start + self.io.seek(0, whence)
+
+    def read(self, size=-1):
+        return self.io.read(size)
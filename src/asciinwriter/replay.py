@@ -0,0 +1,85 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Record the output of a scene once, and replay it later without a shell.
+
+The child that plays a recording back is ReplayChild, in backends.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from .files import atomic_write
+
+FORMAT_VERSION = 1
+
+
+def replay_path(scene):
+    """Return the path of the recording kept next to a scene file."""
+    return os.path.splitext(scene)[0] + ".replay.gz"
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Recording:
+    """The output read from the shell, as chunks with the time spent blocked on each.
+
+    The time of a chunk is counted from the previous chunk or from the start of
+    the wait that read it, whichever is later, so time spent typing or sleeping
+    is not part of it.
+    """
+
+    def __init__(self, chunks=None, scene=None):
+        self.chunks = chunks if chunks is not None else []
+        self.scene = scene
+        self.last = time.monotonic()
+
+    def mark(self):
+        """Note that the runner starts waiting for the shell."""
+        self.last = time.monotonic()
+
+    def add(self, data):
+        now = time.monotonic()
+        self.chunks.append((round(now - self.last, 6), data))
+        self.last = now
+
+    def save(self, path):
+        """Write the recording as gzipped JSON lines, replacing path atomically."""
+        with atomic_write(path, "wt", gzip.open, encoding="utf-8") as f:
+            f.write(json.dumps({"version": FORMAT_VERSION, "scene": self.scene}) + "\n")
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(
+                    f"unsupported recording version {header.get('version')}"
+                )
+            chunks = [tuple(json.loads(line)) for line in f]
+        return cls(chunks, scene=header.get("scene"))
+
+
+class RecordingWriter:
+    """File-like wrapper for logfile_read that adds what it sees to a Recording."""
+
+    def __init__(self, out, recording):
+        self.out = out
+        self.recording = recording
+
+    def write(self, data):
+        self.recording.add(data)
+        self.out.write(data)
+
+    def flush(self):
+        self.out.flush()
@@ -0,0 +1,847 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""The scene runner. pexpect is only imported once a shell is spawned."""
+
+import contextlib
+import functools
+import io
+import os
+import random
+import re
+import sys
+import time
+
+from .cast import CastWriter
+from .cast import VirtualClock
+from .output import echo_chunks
+from .output import output_tail
+from .output import RingBuffer
+from .output import TerminalWriter
+from .scene import command_pattern
+from .scene import compile_scene
+from .scene import format_command
+from .scene import parse_line
+from .scene import SceneError
+from .scene import split_segments
+from .scene import uses_screen
+from .scene import uses_segments
+from .scene import uses_sessions
+from .scene import VALID_COMMANDS
+from .screen import Screen
+from .screen import ScreenWriter
+from .trace import buffer_size
+from .trace import CountingWriter
+
+
+def command_timeout(command, default):
+    """Return the time an EXPECT command waits before it times out."""
+    while command.cmd in ("ON", "TIMEOUT"):
+        if command.cmd == "TIMEOUT":
+            return command.param[0]
+        command = command.param[1]
+    return default
+
+
+class _CommandPattern:
+    """Class attribute that compiles the scene command regex on first use."""
+
+    def __get__(self, obj, objtype=None):
+        return command_pattern()
+
+
+class AsciinwriterRunner:
+    """Handles automation of terminal sessions with configurable parameters."""
+
+    VALID_COMMANDS = VALID_COMMANDS
+    command_re = _CommandPattern()
+
+    # Parameters that affect the rendered cast, used for render cache keys
+    CACHE_PARAMS = (
+        "typing_delay_range",
+        "jitter_factor",
+        "jitter_range",
+        "post_typing_delay",
+        "shell",
+        "shell_prompt",
+        "bootstrap",
+        "rcfile",
+        "timeout",
+        "search_window",
+        "cols",
+        "rows",
+        "seed",
+        "replay_mode",
+        "max_buffer",
+        "send_upfront",
+        "backend",
+        "coalesce_window",
+    )
+
+    # Characters read from the child at once when the output is bounded
+    BOUNDED_MAXREAD = 65536
+
+    def __init__(
+        self,
+        typing_delay_range=(0.03, 0.12),
+        jitter_factor=0.01,
+        jitter_range=6,
+        post_typing_delay=0.2,
+        shell="bash",
+        shell_prompt=r"\$ ",
+        bootstrap=False,
+        rcfile=None,
+        timeout=600,
+        search_window=8192,
+        cols=80,
+        rows=24,
+        ir_cache_dir=None,
+        render_cache=None,
+        seed=None,
+        session_casts=False,
+        replay_mode=None,
+        time_budget=None,
+        max_buffer=None,
+        send_upfront=False,
+        segment_jobs=None,
+        shell_pool=None,
+        cwd=None,
+        keyframe_interval=None,
+        backend="pexpect",
+        coalesce_window=None,
+    ):
+        self.typing_delay_range = typing_delay_range
+        self.jitter_factor = jitter_factor
+        self.jitter_range = jitter_range
+        self.post_typing_delay = post_typing_delay
+        self.shell = shell
+        self.shell_prompt = shell_prompt
+        self.bootstrap = bootstrap or bool(rcfile)
+        self.rcfile = rcfile
+        self.bootstrapper = None
+        if self.bootstrap:
+            from .shell import ShellBootstrap
+
+            self.bootstrapper = ShellBootstrap(shell, rcfile)
+        self.spawn_latency = None
+        self.timeout = timeout
+        self.time_budget = time_budget
+        self.max_buffer = max_buffer
+        self.send_upfront = send_upfront
+        self.segment_jobs = segment_jobs
+        self.shell_pool = shell_pool
+        self.cwd = cwd
+        self.keyframe_interval = keyframe_interval
+        self.backend = backend
+        self.coalesce_window = coalesce_window
+        self.command = None
+        self.next_command = None
+        self.enters_sent = 0
+        self.command_timeout = None
+        self.deadline = None
+        self.scene_file = None
+        self.search_window = search_window
+        self.cols = cols
+        self.rows = rows
+        self.ir_cache_dir = ir_cache_dir
+        self.render_cache = render_cache
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.session_casts = session_casts
+        self.replay_mode = replay_mode
+        self.recording = None
+        self.terminal = TerminalWriter()
+        self.patterns = {}
+        self.last_match = None
+        self.clock = None
+        self.cast = None
+        self.screen = None
+        self.output_file = None
+        self.tracer = None
+        self.metrics = None
+
+    def typing_delay(self):
+        """Calculate a randomized typing delay with jitter."""
+        base_delay = self.random.uniform(*self.typing_delay_range)
+        jitter = self.jitter_factor * self.random.randint(0, self.jitter_range)
+        return base_delay + jitter
+
+    def typing_delays(self, count):
+        """Calculate a schedule of count typing delays in a single batch."""
+        low, high = self.typing_delay_range
+        span = high - low
+        rand = self.random.random
+        jitters = self.random.choices(range(self.jitter_range + 1), k=count)
+        return [low + span * rand() + self.jitter_factor * j for j in jitters]
+
+    def sleep(self, seconds):
+        """Sleep for real, or only advance the virtual clock when writing a cast."""
+        if self.tracer:
+            self.tracer.sleeping += seconds
+        if self.metrics:
+            self.metrics.sleeping += seconds
+        if self.clock:
+            self.clock.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    @contextlib.contextmanager
+    def waiting(self):
+        """Context for blocking on the child, which takes real time even in a cast."""
+        start = time.monotonic()
+        if self.recording and self.replay_mode == "record":
+            self.recording.mark()
+        try:
+            with self.clock.waiting() if self.clock else contextlib.nullcontext():
+                yield
+        finally:
+            blocked = time.monotonic() - start
+            if self.tracer:
+                self.tracer.blocked += blocked
+            if self.metrics:
+                self.metrics.wait(blocked)
+
+    @contextlib.contextmanager
+    def hidden(self):
+        """Context for commands that are neither shown nor take time in a cast."""
+        shown = self.cast, self.clock, self.terminal, self.screen
+        self.cast, self.clock, self.terminal = None, VirtualClock(), io.StringIO()
+        if self.screen:
+            self.screen = Screen(self.cols, self.rows)
+        try:
+            yield
+        finally:
+            self.cast, self.clock, self.terminal, self.screen = shown
+
+    def span(self, command, child):
+        """Context that traces the execution of a command, if tracing."""
+        if self.tracer:
+            return self.tracer.command_span(command, child)
+        return contextlib.nullcontext()
+
+    def viewer(self):
+        """Return where what the viewer sees is written, on stdout or as cast events.
+
+        When the scene looks at the screen, it is also applied to the screen.
+        """
+        out = self.cast or self.terminal
+        if self.screen:
+            out = ScreenWriter(out, self.screen)
+        return out
+
+    def echo(self, text):
+        """Show text to the viewer, either on stdout or as a cast event."""
+        out = self.viewer()
+        out.flush()
+        out.write(text)
+
+    def human_type(self, child, text, ahead=""):
+        """Type text with human-like delays.
+
+        With send_upfront, text (followed by ahead) is sent to the child in a
+        single write, and only the echo is animated.
+        """
+        delays = self.typing_delays(len(text) + 1)
+        if self.metrics:
+            self.metrics.chars_typed += len(text)
+        out = self.viewer()
+        out.flush()
+        if self.send_upfront:
+            child.send(text + ahead)
+            for shown, delay in zip(echo_chunks(text), delays):
+                self.sleep(delay)
+                out.write(shown)
+        else:
+            for c, shown, delay in zip(text, echo_chunks(text), delays):
+                self.sleep(delay)
+                child.send(c)
+                out.write(shown)
+        self.sleep(delays[-1] + self.post_typing_delay)
+
+    def send_text(self, child, text):
+        """Type a SEND() payload.
+
+        With send_upfront, the carriage returns of an ENTER() right after it
+        are sent along with it, so the command runs while its typing is shown.
+        """
+        following = self.next_command
+        if self.send_upfront and following and following.cmd == "ENTER":
+            self.enters_sent = following.param
+            self.human_type(child, text, "\r" * following.param)
+        else:
+            self.human_type(child, text)
+
+    def press_enter(self, child, count):
+        for _ in range(count):
+            if self.enters_sent:
+                self.enters_sent -= 1
+            else:
+                child.send("\r")
+            self.echo("\r")
+
+    def process_line(self, child, line):
+        """Process a single script line."""
+        try:
+            command = parse_line(line)
+        except SceneError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        self.execute(child, command)
+
+    def execute(self, child, command):
+        """Execute a single compiled scene command."""
+        match command.cmd:
+            case "SEND":
+                self.send_text(child, command.param)
+            case (
+                "EXPECT"
+                | "EXPECT_RE"
+                | "EXPECT_ANY"
+                | "EXPECT_PROMPT"
+                | "EXPECT_SCREEN"
+            ):
+                with self.waiting():
+                    self.expect(child, command)
+                if self.metrics:
+                    self.metrics.buffer(buffer_size(child))
+            case "ON":
+                index, inner = command.param
+                if index == self.last_match:
+                    self.execute(child, inner)
+            case "TIMEOUT":
+                self.command_timeout, inner = command.param
+                try:
+                    self.execute(child, inner)
+                finally:
+                    self.command_timeout = None
+            case "ENTER":
+                self.press_enter(child, command.param)
+            case "DELAY":
+                if self.metrics:
+                    self.metrics.delay += command.param
+                self.sleep(command.param)
+
+    def expect(self, child, command):
+        """Wait for the output of an EXPECT command."""
+        timeout = self.expect_timeout()
+        match command.cmd:
+            case "EXPECT":
+                child.expect_exact(command.param, **timeout)
+            case "EXPECT_RE":
+                child.expect_list(
+                    [self.compiled_pattern(command.param)],
+                    searchwindowsize=self.search_window,
+                    **timeout,
+                )
+            case "EXPECT_ANY":
+                self.last_match = child.expect_exact(command.param, **timeout) + 1
+            case "EXPECT_PROMPT":
+                self.expect_prompt(child, **timeout)
+            case "EXPECT_SCREEN":
+                self.expect_screen(child, command.param, **timeout)
+
+    def expect_screen(self, child, text, timeout=-1):
+        """Wait until a row of the screen shows text.
+
+        Only the rows that changed since the last check are searched again.
+        Like the other EXPECT commands, it consumes the output read so far, up
+        to the text when the read that showed it has the text in it.
+        """
+        from pexpect import TIMEOUT
+
+        if timeout == -1:
+            timeout = child.timeout
+        end = None if timeout is None else time.monotonic() + timeout
+        self.screen.take_dirty()
+        rows = None
+        chunk = child.string_type()
+        while self.screen.find(text, rows) is None:
+            remaining = None if end is None else end - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TIMEOUT(f"'{text}' was not shown on the screen")
+            chunk = child.read_nonblocking(child.maxread, remaining)
+            rows = self.screen.take_dirty()
+        # what the shell printed after the text, such as its prompt, is kept
+        # for the next EXPECT
+        child.buffer = chunk.rpartition(text)[2]
+
+    def expect_timeout(self):
+        """Return the timeout argument for an expect, unless it is the child's default.
+
+        That is the TIMEOUT() of the command, if any, cut short to what is left
+        of the time budget.
+        """
+        timeout = self.command_timeout
+        if self.deadline is not None:
+            remaining = max(self.deadline - time.monotonic(), 0)
+            timeout = min(timeout or self.timeout, remaining)
+        return {} if timeout is None else {"timeout": timeout}
+
+    def over_budget(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def compiled_pattern(self, pattern):
+        """Return the compiled form of an EXPECT_RE() pattern, compiling it only once."""
+        compiled = self.patterns.get(pattern)
+        if compiled is None:
+            # pexpect lets dot match newlines as well
+            compiled = self.patterns[pattern] = re.compile(pattern, re.DOTALL)
+        return compiled
+
+    def load_scene(self, input_file):
+        """Compile the scene file, exiting with an error message if it is invalid."""
+        try:
+            return compile_scene(input_file, cache_dir=self.ir_cache_dir)
+        except FileNotFoundError:
+            print(f"Error: File '{input_file}' not found.", file=sys.stderr)
+        except SceneError as e:
+            print(f"Error: {e}", file=sys.stderr)
+        except (IOError, UnicodeDecodeError) as e:
+            print(f"Error reading file '{input_file}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+    def prompt_expectation(self):
+        """Return the child method and pattern used to wait for the shell prompt."""
+        if self.bootstrap:
+            from .shell import SENTINEL_PROMPT
+
+            return "expect_exact", SENTINEL_PROMPT
+        return "expect", self.shell_prompt
+
+    def expect_prompt(self, child, **kwargs):
+        """Wait for the shell prompt."""
+        method, pattern = self.prompt_expectation()
+        return getattr(child, method)(pattern, **kwargs)
+
+    def spawn(self):
+        """Start the shell session, or a stand-in for it when replaying.
+
+        With a shell_pool, a shell that is already at its first prompt is
+        taken from it instead.
+        """
+        if self.shell_pool:
+            return self.shell_pool.take()
+        if self.replay_mode == "replay":
+            from .backends import ReplayChild
+
+            sleep = self.clock.sleep if self.clock else time.sleep
+            child = ReplayChild(self.recording, sleep, timeout=self.timeout)
+            if self.max_buffer:
+                self.bound_output(child)
+            return child
+        return self.spawn_shell(cast=bool(self.cast))
+
+    def spawn_shell(self, cast=False):
+        """Spawn the shell, sized and tuned for writing a cast if cast is set.
+
+        backend is the name of one of the BACKENDS, or a function called like
+        pexpect.spawn.
+        """
+        from .backends import BACKENDS
+
+        spawn = (
+            BACKENDS[self.backend] if isinstance(self.backend, str) else self.backend
+        )
+        kwargs = {}
+        if cast:
+            kwargs["dimensions"] = (self.rows, self.cols)
+        if self.bootstrapper:
+            kwargs["args"] = self.bootstrapper.args()
+            kwargs["env"] = self.bootstrapper.env()
+        if self.cwd:
+            kwargs["cwd"] = self.cwd
+        child = spawn(
+            self.shell,
+            encoding="utf-8",
+            timeout=self.timeout,
+            **kwargs,
+        )
+        if cast:
+            # pexpect sleeps 50ms before every send by default; in a cast the
+            # typing delays are virtual, so that would be pure wasted time
+            child.delaybeforesend = None
+        if self.max_buffer:
+            self.bound_output(child)
+        return child
+
+    def bound_output(self, child):
+        """Keep the memory pexpect uses for the child's output flat.
+
+        Only the last max_buffer characters read are kept, every expect only
+        searches the last search_window characters, and output is read (and
+        passed through) in large chunks.
+        """
+        child.maxread = self.BOUNDED_MAXREAD
+        child.searchwindowsize = self.search_window
+        # a match needs the search window and the chunk just read
+        limit = max(self.max_buffer, self.search_window + child.maxread)
+        child.buffer_type = functools.partial(RingBuffer, limit)
+        child._buffer = child.buffer_type()
+        child._before = child.buffer_type()
+
+    def output_log(self):
+        """Return where the output read from the child is written."""
+        out = self.viewer()
+        for counter in (self.tracer, self.metrics):
+            if counter:
+                out = CountingWriter(out, counter)
+        if self.recording and self.replay_mode == "record":
+            from .replay import RecordingWriter
+
+            out = RecordingWriter(out, self.recording)
+        return out
+
+    def cache_params(self):
+        """Return the runner parameters that affect the rendered cast."""
+        return {name: getattr(self, name) for name in self.CACHE_PARAMS}
+
+    def process_file(self, input_file, output_file=None, title=None):
+        """Process the script file line by line.
+
+        When output_file is given, the session is written there as an asciicast v2
+        file instead of stdout, and typing delays advance a virtual clock instead
+        of sleeping. Only waiting for the child (EXPECT) takes real time.
+
+        With a render_cache, an unchanged scene is copied from the cache instead
+        of being rendered again. Returns True when the cast came from the cache.
+
+        With replay_mode "record", the shell output is also saved next to the
+        scene; with "replay", that output is played back instead of running a
+        shell.
+
+        With a keyframe_interval, a keyframe index is written next to the cast.
+
+        The whole scene is compiled and validated before the shell is spawned.
+        """
+        self.scene_file = input_file
+        if self.replay_mode:
+            self.recording = self.open_recording(input_file)
+        try:
+            cached = self.render(input_file, output_file, title)
+            if output_file and self.keyframe_interval:
+                self.write_keyframes(output_file)
+            if self.replay_mode == "record":
+                self.save_recording(input_file)
+            return cached
+        finally:
+            self.recording = None
+
+    def render(self, input_file, output_file, title):
+        if output_file is None:
+            self.run(self.load_scene(input_file))
+            return False
+
+        key = None
+        # a recording has to come from actually running the scene
+        if self.render_cache and self.replay_mode != "record":
+            inputs = []
+            if self.replay_mode == "replay":
+                from .replay import replay_path
+
+                inputs.append(replay_path(input_file))
+            key = self.render_cache.key(
+                input_file, dict(self.cache_params(), title=title), inputs
+            )
+            if self.render_cache.get(key, output_file):
+                return True
+
+        commands = self.load_scene(input_file)
+        if uses_segments(commands):
+            self.record_segments(commands, output_file, title)
+        else:
+            self.record(commands, output_file, title)
+        if key:
+            try:
+                self.render_cache.put(key, output_file)
+            except OSError:
+                pass  # caching is best effort
+        return False
+
+    def write_keyframes(self, output_file):
+        from .keyframes import index_path
+        from .keyframes import write_index
+
+        try:
+            write_index(output_file, self.keyframe_interval)
+        except (IOError, ValueError) as e:
+            print(
+                f"Error writing file '{index_path(output_file)}': {e}", file=sys.stderr
+            )
+            sys.exit(1)
+
+    def open_recording(self, input_file):
+        """Start a new recording, or load the one to replay, exiting on errors."""
+        from .replay import file_digest
+        from .replay import Recording
+        from .replay import replay_path
+
+        if self.replay_mode == "record":
+            return Recording()
+
+        path = replay_path(input_file)
+        try:
+            recording = Recording.load(path)
+        except FileNotFoundError:
+            print(
+                f"Error: No recording '{path}' of '{input_file}', make one with --record.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        except (IOError, ValueError) as e:
+            print(f"Error reading file '{path}': {e}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            changed = recording.scene != file_digest(input_file)
+        except OSError:
+            changed = False  # reported when the scene is loaded
+        if changed:
+            print(
+                f"Warning: '{path}' was recorded from a different version of '{input_file}'",
+                file=sys.stderr,
+            )
+        return recording
+
+    def save_recording(self, input_file):
+        from .replay import file_digest
+        from .replay import replay_path
+
+        path = replay_path(input_file)
+        self.recording.scene = file_digest(input_file)
+        try:
+            self.recording.save(path)
+        except IOError as e:
+            print(f"Error writing file '{path}': {e}", file=sys.stderr)
+            sys.exit(1)
+
+    def record(self, commands, output_file, title=None, **run_options):
+        """Run compiled scene commands, writing the session to an asciicast file."""
+        try:
+            with open(output_file, "w") as out:
+                self.output_file = output_file
+                self.clock = VirtualClock()
+                self.cast = CastWriter(
+                    out,
+                    self.clock,
+                    width=self.cols,
+                    height=self.rows,
+                    title=title,
+                    env={"SHELL": self.shell, "TERM": os.environ.get("TERM", "xterm")},
+                    # seeded renders leave it out so that they are reproducible
+                    timestamp=int(time.time()) if self.seed is None else None,
+                    coalesce_window=self.coalesce_window,
+                )
+                self.cast.write_header()
+                try:
+                    self.run(commands, **run_options)
+                finally:
+                    self.cast.write_pending()
+        except IOError as e:
+            print(f"Error writing file '{output_file}': {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            self.clock = None
+            self.cast = None
+            self.output_file = None
+
+    def run(self, commands, preamble=None, continued=False):
+        """Run compiled scene commands against a new shell session.
+
+        Scenes that declare sessions run each session concurrently instead,
+        and scenes split into segments run each segment in a shell of its own.
+        The preamble commands run first without being shown. A continued run
+        starts on the line the previous one ended on.
+        When an EXPECT times out, or the shell exits while it waits, the shell
+        is killed and the run exits with an error.
+        """
+        self.patterns = {}
+        self.last_match = None
+        self.screen = None
+        if uses_segments(commands):
+            self.run_segments(commands)
+            return
+        if uses_sessions(commands):
+            self.run_sessions(commands)
+            return
+
+        from pexpect import EOF
+        from pexpect import TIMEOUT
+
+        if uses_screen(commands) or uses_screen(preamble or []):
+            self.screen = Screen(self.cols, self.rows)
+        self.deadline = None
+        if self.time_budget:
+            self.deadline = time.monotonic() + self.time_budget
+        start = time.monotonic()
+        child = self.spawn()
+        child.setecho(False)
+        self.command = failure = None
+        try:
+            if continued:
+                self.echo("\r\x1b[K")
+            if preamble or self.shell_pool:
+                self.run_preamble(child, start, preamble)
+            else:
+                child.logfile_read = self.output_log()
+                self.wait_for_shell(child, start)
+            self.run_commands(child, commands)
+        except (EOF, TIMEOUT) as e:
+            failure = self.failure_report(child, self.command, e)
+        finally:
+            if not failure:
+                child.sendeof()
+            if self.shell_pool:
+                # closing waits for the shell to exit, which a job need not do
+                self.shell_pool.retire(child)
+            elif failure:
+                child.close(force=True)
+        if failure:
+            print(f"Error: {failure}", file=sys.stderr)
+            sys.exit(1)
+
+    def run_commands(self, child, commands):
+        from pexpect import TIMEOUT
+
+        for self.command, self.next_command in zip(commands, commands[1:] + [None]):
+            if self.over_budget():
+                raise TIMEOUT("time budget exceeded")
+            if self.metrics:
+                self.metrics.commands += 1
+            with self.span(self.command, child):
+                self.execute(child, self.command)
+
+    def run_preamble(self, child, start, preamble):
+        """Start the shell and run the preamble, then show the prompt it ended at.
+
+        Shells from the shell_pool are already at their first prompt, in the
+        directory the pool was started in, so they change to cwd first. The
+        output of the preamble is not shown, but it reaches the hidden screen
+        that its EXPECT_SCREEN commands look at.
+        """
+        with self.hidden():
+            child.logfile_read = self.viewer()
+            if not self.shell_pool:
+                self.wait_for_shell(child, start)
+            elif self.cwd and not os.path.samefile(self.cwd, os.getcwd()):
+                import shlex
+
+                # sent as is, so that the typing delays stay the same
+                child.send(f"cd -- {shlex.quote(self.cwd)}\r")
+                with self.waiting():
+                    self.expect_prompt(child, **self.expect_timeout())
+            if preamble:
+                self.run_commands(child, preamble)
+                if self.command.cmd != "EXPECT_PROMPT":
+                    self.command = None
+                    with self.waiting():
+                        self.expect_prompt(child, **self.expect_timeout())
+        self.echo(child.before.rpartition("\n")[2] + child.after)
+        child.logfile_read = self.output_log()
+
+    def segment_kwargs(self):
+        """Return the arguments of a runner that renders a segment like this one."""
+        return dict(
+            self.cache_params(),
+            replay_mode=None,
+            time_budget=self.time_budget,
+            cwd=self.cwd,
+        )
+
+    def check_segments(self):
+        if self.replay_mode:
+            print(
+                "Error: Scenes with SEGMENT() cannot be recorded or replayed.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+    def run_segments(self, commands):
+        """Run each segment in a new shell, one after the other."""
+        self.check_segments()
+        preamble, segments = split_segments(commands)
+        for index, (_, segment) in enumerate(segments):
+            if self.seed is not None:
+                # as when the segments are rendered in parallel
+                self.random = random.Random(self.seed + index)
+            self.run(segment, preamble, continued=index > 0)
+
+    def record_segments(self, commands, output_file, title=None):
+        """Render the segments of a scene in parallel, and join them into one cast.
+
+        Each segment is rendered by a worker process, in a shell of its own that
+        first runs the preamble, to a cast of its own. The casts are then
+        concatenated, each segment starting where the previous one ended.
+        """
+        import tempfile
+
+        from .batch import render_segments
+        from .cast import transform_casts
+
+        self.check_segments()
+        preamble, segments = split_segments(commands)
+        with tempfile.TemporaryDirectory(prefix="asciinwriter-") as tmp:
+            paths = []
+            for result in render_segments(
+                segments,
+                preamble,
+                tmp,
+                self.segment_jobs,
+                self.segment_kwargs(),
+                self.scene_file,
+                title,
+            ):
+                if not result.ok:
+                    # the worker already reported the error unless it crashed
+                    if result.error:
+                        print(f"Error: {result.error}", file=sys.stderr)
+                    print(f"Error: Segment '{result.scene}' failed.", file=sys.stderr)
+                    sys.exit(1)
+                paths.append(result.output)
+            try:
+                with open(output_file, "w") as out:
+                    transform_casts(paths, out)
+            except IOError as e:
+                print(f"Error writing file '{output_file}': {e}", file=sys.stderr)
+                sys.exit(1)
+
+    def run_sessions(self, commands):
+        from .aio import run_sessions
+
+        if self.replay_mode:
+            print(
+                "Error: Scenes with SESSION() cannot be recorded or replayed.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        run_sessions(self, commands)
+
+    def wait_for_shell(self, child, start):
+        """Wait for the first prompt of a shell spawned at start."""
+        with (
+            self.tracer.span("SPAWN", self.shell)
+            if self.tracer
+            else contextlib.nullcontext()
+        ):
+            with self.waiting():
+                self.expect_prompt(child, **self.expect_timeout())
+        self.spawn_latency = time.monotonic() - start
+        if self.metrics:
+            self.metrics.spawn_latency.observe(self.spawn_latency)
+
+    def failure_report(self, child, command, error):
+        """Describe why the scene stopped at command, with the last output read."""
+        from pexpect import EOF
+
+        what = format_command(command) if command else "the first shell prompt"
+        if self.over_budget():
+            message = f"time budget of {self.time_budget:g}s exceeded at {what}"
+        elif isinstance(error, EOF):
+            message = f"the shell exited while waiting at {what}"
+        else:
+            timeout = (
+                command_timeout(command, self.timeout) if command else self.timeout
+            )
+            message = f"timed out after {timeout:g}s waiting at {what}"
+        message = str(SceneError(message, command and command.lineno, self.scene_file))
+        return f"{message}\nLast output:\n{output_tail(getattr(child, 'before', None))}"
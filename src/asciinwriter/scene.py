@@ -0,0 +1,423 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+import hashlib
+import json
+import math
+import os
+import re
+from collections import namedtuple
+
+VALID_COMMANDS = [
+    "SEND",
+    "EXPECT",
+    "EXPECT_RE",
+    "EXPECT_ANY",
+    "EXPECT_PROMPT",
+    "EXPECT_SCREEN",
+    "ON",
+    "TIMEOUT",
+    "ENTER",
+    "DELAY",
+    "SESSION",
+    "SIGNAL",
+    "WAIT",
+    "SEGMENT",
+]
+
+_command_re = None
+
+# Bump whenever the compiled form, or what compiles, changes, so stale cache entries are ignored.
+IR_VERSION = 5
+
+# Separates the alternatives of EXPECT_ANY()
+ALTERNATIVES_SEPARATOR = "||"
+
+# Commands before the first SESSION() belong to this session
+DEFAULT_SESSION = "main"
+
+SESSION_COMMANDS = ("SESSION", "SIGNAL", "WAIT")
+
+# Commands that wait for the shell, and can be given a TIMEOUT()
+EXPECT_COMMANDS = (
+    "EXPECT",
+    "EXPECT_RE",
+    "EXPECT_ANY",
+    "EXPECT_PROMPT",
+    "EXPECT_SCREEN",
+)
+
+# Commands whose parameter is a number and another command
+WRAPPER_COMMANDS = ("ON", "TIMEOUT")
+
+name_re = re.compile(r"^[\w.-]+$")
+
+
+def command_pattern():
+    """Return the regex matching a scene line, compiling it on first use."""
+    global _command_re
+    if _command_re is None:
+        _command_re = re.compile(
+            rf'^\s*(?P<cmd>{"|".join(VALID_COMMANDS)})\((?P<param>.*)\)\s*(?:#.*)?$'
+        )
+    return _command_re
+
+
+def __getattr__(name):
+    if name == "command_re":
+        return command_pattern()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class SceneError(Exception):
+    """A scene file that cannot be compiled."""
+
+    def __init__(self, message, lineno=None, filename=None):
+        super().__init__(message)
+        self.message = message
+        self.lineno = lineno
+        self.filename = filename
+
+    def __str__(self):
+        if self.lineno is None:
+            return self.message
+        return f"{self.filename or '<scene>'}:{self.lineno}: {self.message}"
+
+
+class Command(namedtuple("Command", ["cmd", "param", "lineno"], defaults=[0])):
+    """A single compiled scene command, with its parameter already validated."""
+
+    __slots__ = ()
+
+
+def _parse_enter(param):
+    try:
+        return int(param) if param else 1
+    except ValueError:
+        raise ValueError(
+            f"ENTER() requires an integer parameter, got '{param}'"
+        ) from None
+
+
+def _parse_delay(param):
+    try:
+        seconds = float(param)
+        if not (math.isfinite(seconds) and seconds >= 0):
+            raise ValueError
+    except ValueError:
+        raise ValueError(
+            f"DELAY() requires a non-negative number of seconds, got '{param}'"
+        ) from None
+    return seconds
+
+
+def _parse_regex(param):
+    try:
+        re.compile(param)
+    except re.error as e:
+        raise ValueError(
+            f"EXPECT_RE() has an invalid regular expression: {e}"
+        ) from None
+    return param
+
+
+def _parse_alternatives(param):
+    alternatives = [alt.strip() for alt in param.split(ALTERNATIVES_SEPARATOR)]
+    if not all(alternatives):
+        raise ValueError(
+            f"EXPECT_ANY() requires non-empty alternatives separated by "
+            f"'{ALTERNATIVES_SEPARATOR}', got '{param}'"
+        )
+    return alternatives
+
+
+def _parse_on(param):
+    index, _, command = param.partition(",")
+    try:
+        index = int(index)
+        if index < 1:
+            raise ValueError
+    except ValueError:
+        raise ValueError(
+            f"ON() requires a positive alternative number and a command, got '{param}'"
+        ) from None
+    return index, command.strip()
+
+
+def _parse_timeout(param):
+    seconds, _, command = param.partition(",")
+    try:
+        seconds = float(seconds)
+        if not (math.isfinite(seconds) and seconds > 0):
+            raise ValueError
+    except ValueError:
+        raise ValueError(
+            f"TIMEOUT() requires a positive number of seconds and an EXPECT command, got '{param}'"
+        ) from None
+    return seconds, command.strip()
+
+
+def _parse_empty(param):
+    if param:
+        raise ValueError(f"EXPECT_PROMPT() takes no parameter, got '{param}'")
+    return None
+
+
+def _parse_screen_text(param):
+    if not param:
+        raise ValueError("EXPECT_SCREEN() requires the text to look for")
+    return param
+
+
+def _parse_name(param):
+    if not name_re.match(param):
+        raise ValueError(
+            f"expected a name made of letters, digits, '_', '.' or '-', got '{param}'"
+        )
+    return param
+
+
+PARAM_PARSERS = {
+    "SEND": str,
+    "EXPECT": str,
+    "EXPECT_RE": _parse_regex,
+    "EXPECT_ANY": _parse_alternatives,
+    "EXPECT_PROMPT": _parse_empty,
+    "EXPECT_SCREEN": _parse_screen_text,
+    "ON": _parse_on,
+    "TIMEOUT": _parse_timeout,
+    "ENTER": _parse_enter,
+    "DELAY": _parse_delay,
+    "SESSION": _parse_name,
+    "SIGNAL": _parse_name,
+    "WAIT": _parse_name,
+    "SEGMENT": _parse_name,
+}
+
+
+def parse_line(line, lineno=None):
+    """Compile one scene line into a Command."""
+    match = command_pattern().match(line)
+    if not match:
+        raise SceneError(f"Invalid command format: '{line}'", lineno)
+
+    cmd, param = match.group("cmd"), match.group("param").strip()
+    try:
+        value = PARAM_PARSERS[cmd](param)
+    except ValueError as e:
+        raise SceneError(str(e), lineno) from None
+    if cmd in WRAPPER_COMMANDS:
+        # ON(n, COMMAND(...)) runs COMMAND only if alternative n was matched,
+        # TIMEOUT(seconds, EXPECT(...)) gives up on EXPECT after seconds
+        number, inner = value
+        inner = parse_line(inner, lineno)
+        if cmd == "TIMEOUT" and inner.cmd not in EXPECT_COMMANDS:
+            raise SceneError(
+                f"TIMEOUT() only applies to {', '.join(EXPECT_COMMANDS)}, got {inner.cmd}()",
+                lineno,
+            )
+        value = (number, inner)
+    return Command(cmd, value, lineno or 0)
+
+
+def format_command(command):
+    """Return a compiled command as it would be written in a scene."""
+    param = command.param
+    if command.cmd in WRAPPER_COMMANDS:
+        param = f"{param[0]:g}, {format_command(param[1])}"
+    elif command.cmd == "EXPECT_ANY":
+        param = f" {ALTERNATIVES_SEPARATOR} ".join(param)
+    return f"{command.cmd}({'' if param is None else param})"
+
+
+def _check_branch(command, alternatives):
+    """Check that an ON() refers to an alternative of the last EXPECT_ANY()."""
+    if command.cmd == "TIMEOUT":
+        command = command.param[1]
+    if command.cmd == "EXPECT_ANY":
+        return len(command.param)
+    if command.cmd == "ON" and command.param[0] > alternatives:
+        raise SceneError(
+            f"ON({command.param[0]}, ...) does not match an alternative of a preceding EXPECT_ANY()",
+            command.lineno,
+        )
+    return alternatives
+
+
+def uses_sessions(commands):
+    """Return True if the scene drives several sessions concurrently."""
+    return any(command.cmd in SESSION_COMMANDS for command in commands)
+
+
+def split_sessions(commands):
+    """Split compiled commands into one track per session, in order of appearance."""
+    tracks = {}
+    current = DEFAULT_SESSION
+    signals = set()
+    for command in commands:
+        if command.cmd == "SESSION":
+            current = command.param
+            tracks.setdefault(current, [])
+            continue
+        if command.cmd == "SIGNAL":
+            signals.add(command.param)
+        tracks.setdefault(current, []).append(command)
+
+    for command in commands:
+        if command.cmd == "WAIT" and command.param not in signals:
+            raise SceneError(
+                f"WAIT({command.param}) has no matching SIGNAL({command.param})",
+                command.lineno,
+            )
+    return tracks
+
+
+def innermost(command):
+    """Return the command run by an ON() or TIMEOUT(), or command itself."""
+    while command.cmd in WRAPPER_COMMANDS:
+        command = command.param[1]
+    return command
+
+
+def uses_screen(commands):
+    """Return True if the scene looks at the screen, with EXPECT_SCREEN()."""
+    return any(innermost(command).cmd == "EXPECT_SCREEN" for command in commands)
+
+
+def uses_segments(commands):
+    """Return True if the scene is split into independent segments."""
+    return any(command.cmd == "SEGMENT" for command in commands)
+
+
+def split_segments(commands):
+    """Split compiled commands into the preamble and a list of (name, commands)."""
+    preamble = []
+    segments = []
+    track = preamble
+    for command in commands:
+        if command.cmd == "SEGMENT":
+            if any(name == command.param for name, _ in segments):
+                raise SceneError(
+                    f"SEGMENT({command.param}) is already defined", command.lineno
+                )
+            track = []
+            segments.append((command.param, track))
+            continue
+        track.append(command)
+    return preamble, segments
+
+
+def _check_segments(commands):
+    if uses_sessions(commands):
+        raise SceneError(
+            "SEGMENT() cannot be used in a scene with SESSION()",
+            next(c for c in commands if c.cmd == "SEGMENT").lineno,
+        )
+    split_segments(commands)
+
+
+def _check_sessions(commands):
+    if uses_screen(commands):
+        raise SceneError(
+            "EXPECT_SCREEN() cannot be used in a scene with SESSION()",
+            next(c for c in commands if innermost(c).cmd == "EXPECT_SCREEN").lineno,
+        )
+    split_sessions(commands)
+
+
+def compile_lines(lines, filename=None):
+    """Compile scene lines, skipping blank lines and comments."""
+    commands = []
+    alternatives = 0
+    for lineno, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            command = parse_line(line, lineno)
+            if command.cmd == "SEGMENT":
+                # an ON() cannot refer to an EXPECT_ANY() of another segment
+                alternatives = 0
+            alternatives = _check_branch(command, alternatives)
+        except SceneError as e:
+            e.filename = filename
+            raise
+        commands.append(command)
+    try:
+        if uses_segments(commands):
+            _check_segments(commands)
+        elif uses_sessions(commands):
+            _check_sessions(commands)
+    except SceneError as e:
+        e.filename = filename
+        raise
+    return commands
+
+
+def default_cache_dir():
+    """Return the directory used for asciinwriter caches."""
+    if os.environ.get("ASCIINWRITER_CACHE_DIR"):
+        return os.environ["ASCIINWRITER_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "asciinwriter")
+
+
+def _ir_cache_path(cache_dir, data):
+    digest = hashlib.sha256(b"%d\0" % IR_VERSION + data).hexdigest()
+    return os.path.join(cache_dir, "ir", digest + ".json")
+
+
+def _encode(command):
+    param = command.param
+    if command.cmd in WRAPPER_COMMANDS:
+        param = [param[0], _encode(param[1])]
+    return [command.cmd, param, command.lineno]
+
+
+def _decode(item):
+    cmd, param, lineno = item
+    if cmd in WRAPPER_COMMANDS:
+        param = (param[0], _decode(param[1]))
+    return Command(cmd, param, lineno)
+
+
+def _load_ir(path):
+    try:
+        with open(path) as f:
+            return [_decode(item) for item in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _store_ir(path, commands):
+    from .files import atomic_write
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path) as f:
+            json.dump([_encode(c) for c in commands], f)
+    except OSError:
+        pass  # caching is best effort
+
+
+def compile_scene(input_file, cache_dir=None):
+    """Compile a scene file into a list of Commands.
+
+    With cache_dir, the compiled form is stored keyed by the file contents hash
+    and reused on later runs instead of parsing the file again.
+    """
+    with open(input_file, "rb") as f:
+        data = f.read()
+
+    if cache_dir:
+        path = _ir_cache_path(cache_dir, data)
+        commands = _load_ir(path)
+        if commands is not None:
+            return commands
+
+    commands = compile_lines(data.decode("utf-8").splitlines(), filename=input_file)
+    if cache_dir:
+        _store_ir(path, commands)
+    return commands
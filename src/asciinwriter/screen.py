@@ -0,0 +1,326 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""A terminal screen model, fed with the output of the child as it is read."""
+
+import re
+
+# Text, escape sequences and control characters, one at a time. An escape
+# sequence that is cut short at the end of a chunk matches none of them.
+_TOKEN = re.compile(
+    r"""
+    (?P<text>[^\x00-\x1f\x7f]+)
+  | \x1b\[(?P<private>[?<=>!]?)(?P<params>[0-9;:]*)[ -/]*(?P<final>[@-~])
+  | \x1b\][^\x07\x1b]*(?:\x07|\x1b\\)
+  | \x1bP[^\x1b]*\x1b\\
+  | \x1b[()*+\#%].
+  | \x1b(?P<esc>[^\[\]P()*+\#%])
+  | (?P<control>[\x00-\x1a\x1c-\x1f\x7f])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# An unfinished escape sequence longer than this is dropped as garbage
+MAX_PENDING = 4096
+
+# Private modes that switch to the alternate screen
+ALTERNATE_MODES = {"47", "1047", "1049"}
+
+
+class ScreenWriter:
+    """File-like wrapper that feeds what is written to a Screen."""
+
+    def __init__(self, out, screen):
+        self.out = out
+        self.screen = screen
+
+    def write(self, data):
+        self.screen.feed(data)
+        self.out.write(data)
+
+    def flush(self):
+        self.out.flush()
+
+
+class Screen:
+    """A grid of characters that applies the output of a program the way a terminal would.
+
+    It handles cursor movement, erasing, scrolling regions, insert and delete,
+    and the alternate screen of full-screen programs. Colors and other
+    attributes are ignored, and every character takes one cell. The rows that
+    changed are kept in dirty, so that searches only need to look at those.
+    """
+
+    def __init__(self, cols=80, rows=24):
+        self.cols = cols
+        self.rows = rows
+        self.lines = [self.blank() for _ in range(rows)]
+        self.saved_lines = None
+        self.x = self.y = 0
+        self.saved_cursor = (0, 0)
+        self.wrap_pending = False
+        self.top, self.bottom = 0, rows - 1
+        self.pending = ""
+        self.dirty = set(range(rows))
+
+    def blank(self):
+        return [" "] * self.cols
+
+    def line(self, y):
+        """Return the text of row y, without trailing blanks."""
+        return "".join(self.lines[y]).rstrip()
+
+    def display(self):
+        """Return the text of every row."""
+        return [self.line(y) for y in range(self.rows)]
+
+    def take_dirty(self):
+        """Return the rows that changed since the last call, in order."""
+        dirty = sorted(self.dirty)
+        self.dirty.clear()
+        return dirty
+
+    def find(self, text, rows=None):
+        """Return the first of rows (by default all of them) that shows text, or None."""
+        for y in range(self.rows) if rows is None else rows:
+            if text in "".join(self.lines[y]):
+                return y
+        return None
+
+    def snapshot(self):
+        """Return the state of the screen as plain JSON types."""
+        saved = self.saved_lines
+        return {
+            "lines": self.display(),
+            "alternate": (
+                None if saved is None else ["".join(r).rstrip() for r in saved]
+            ),
+            "cursor": [self.x, self.y, self.wrap_pending],
+            "saved_cursor": list(self.saved_cursor),
+            "region": [self.top, self.bottom],
+            "pending": self.pending,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state, cols, rows):
+        """Return a screen of cols by rows in the state returned by snapshot()."""
+        screen = cls(cols, rows)
+
+        def grid(lines):
+            return [list(line.ljust(cols)[:cols]) for line in lines]
+
+        screen.lines = grid(state["lines"])
+        if state["alternate"] is not None:
+            screen.saved_lines = grid(state["alternate"])
+        screen.x, screen.y, screen.wrap_pending = state["cursor"]
+        screen.saved_cursor = tuple(state["saved_cursor"])
+        screen.top, screen.bottom = state["region"]
+        screen.pending = state["pending"]
+        return screen
+
+    def feed(self, data):
+        """Apply output to the screen. Sequences may be split across calls."""
+        data = self.pending + data
+        self.pending = ""
+        pos, end = 0, len(data)
+        while pos < end:
+            match = _TOKEN.match(data, pos)
+            if match is None:
+                # an escape sequence that is not complete yet
+                if end - pos < MAX_PENDING:
+                    self.pending = data[pos:]
+                    return
+                pos += 1
+                continue
+            pos = match.end()
+            if match["text"]:
+                self.print(match["text"])
+            elif match["final"]:
+                self.csi(match["private"], match["params"], match["final"])
+            elif match["esc"]:
+                self.escape(match["esc"])
+            elif match["control"]:
+                self.control(match["control"])
+
+    def print(self, text):
+        while text:
+            if self.wrap_pending:
+                self.wrap_pending = False
+                self.x = 0
+                self.linefeed()
+            part = text[: self.cols - self.x]
+            text = text[len(part) :]
+            self.lines[self.y][self.x : self.x + len(part)] = part
+            self.dirty.add(self.y)
+            self.x += len(part)
+            if self.x >= self.cols:
+                self.x = self.cols - 1
+                self.wrap_pending = True
+
+    def control(self, c):
+        if c == "\r":
+            self.move_to(0, self.y)
+        elif c in "\n\x0b\x0c":
+            self.wrap_pending = False
+            self.linefeed()
+        elif c == "\b":
+            self.move_to(self.x - 1, self.y)
+        elif c == "\t":
+            self.move_to(min(self.x // 8 * 8 + 8, self.cols - 1), self.y)
+
+    def escape(self, c):
+        if c == "7":
+            self.saved_cursor = (self.x, self.y)
+        elif c == "8":
+            self.move_to(*self.saved_cursor)
+        elif c == "D":
+            self.linefeed()
+        elif c == "E":
+            self.move_to(0, self.y)
+            self.linefeed()
+        elif c == "M":
+            self.reverse_index()
+        elif c == "c":
+            self.__init__(self.cols, self.rows)
+
+    def csi(self, private, params, final):
+        args = [int(p) if p.isdigit() else 0 for p in params.split(";")]
+        n = max(args[0], 1)
+        if private == "?":
+            if final in "hl" and ALTERNATE_MODES.intersection(params.split(";")):
+                self.alternate(final == "h")
+            return
+        if private:
+            return
+        handler = self.CSI_HANDLERS.get(final)
+        if handler:
+            handler(self, n, args)
+
+    def move_to(self, x, y):
+        self.wrap_pending = False
+        self.x = min(max(x, 0), self.cols - 1)
+        self.y = min(max(y, 0), self.rows - 1)
+
+    def linefeed(self):
+        if self.y == self.bottom:
+            self.scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def reverse_index(self):
+        if self.y == self.top:
+            self.scroll_down(1)
+        elif self.y > 0:
+            self.y -= 1
+
+    def scroll_up(self, n, top=None):
+        top = self.top if top is None else top
+        n = min(n, self.bottom - top + 1)
+        del self.lines[top : top + n]
+        self.lines[self.bottom - n + 1 : self.bottom - n + 1] = [
+            self.blank() for _ in range(n)
+        ]
+        self.dirty.update(range(top, self.bottom + 1))
+
+    def scroll_down(self, n, top=None):
+        top = self.top if top is None else top
+        n = min(n, self.bottom - top + 1)
+        del self.lines[self.bottom - n + 1 : self.bottom + 1]
+        self.lines[top:top] = [self.blank() for _ in range(n)]
+        self.dirty.update(range(top, self.bottom + 1))
+
+    def erase(self, y, start, end):
+        self.lines[y][start:end] = [" "] * (min(end, self.cols) - start)
+        self.dirty.add(y)
+
+    def erase_display(self, n, args):
+        mode = args[0]
+        if mode == 0:
+            self.erase(self.y, self.x, self.cols)
+            rows = range(self.y + 1, self.rows)
+        elif mode == 1:
+            self.erase(self.y, 0, self.x + 1)
+            rows = range(self.y)
+        else:
+            rows = range(self.rows)
+        for y in rows:
+            self.erase(y, 0, self.cols)
+
+    def erase_line(self, n, args):
+        if args[0] == 0:
+            self.erase(self.y, self.x, self.cols)
+        elif args[0] == 1:
+            self.erase(self.y, 0, self.x + 1)
+        else:
+            self.erase(self.y, 0, self.cols)
+
+    def cursor_position(self, n, args):
+        col = args[1] if len(args) > 1 and args[1] else 1
+        self.move_to(col - 1, n - 1)
+
+    def insert_lines(self, n, args):
+        if self.top <= self.y <= self.bottom:
+            self.scroll_down(n, top=self.y)
+
+    def delete_lines(self, n, args):
+        if self.top <= self.y <= self.bottom:
+            self.scroll_up(n, top=self.y)
+
+    def insert_chars(self, n, args):
+        row = self.lines[self.y]
+        row[self.x : self.x] = [" "] * n
+        del row[self.cols :]
+        self.dirty.add(self.y)
+
+    def delete_chars(self, n, args):
+        row = self.lines[self.y]
+        del row[self.x : self.x + n]
+        row.extend([" "] * (self.cols - len(row)))
+        self.dirty.add(self.y)
+
+    def set_region(self, n, args):
+        top = args[0] or 1
+        bottom = args[1] if len(args) > 1 and args[1] else self.rows
+        if top < bottom <= self.rows:
+            self.top, self.bottom = top - 1, bottom - 1
+            self.move_to(0, 0)
+
+    def alternate(self, enter):
+        """Switch to or from the alternate screen of full-screen programs."""
+        if enter == (self.saved_lines is not None):
+            return
+        if enter:
+            self.saved_lines = self.lines
+            self.saved_cursor = (self.x, self.y)
+            self.lines = [self.blank() for _ in range(self.rows)]
+        else:
+            self.lines, self.saved_lines = self.saved_lines, None
+            self.move_to(*self.saved_cursor)
+        self.dirty.update(range(self.rows))
+
+    CSI_HANDLERS = {
+        "A": lambda s, n, a: s.move_to(s.x, s.y - n),
+        "B": lambda s, n, a: s.move_to(s.x, s.y + n),
+        "C": lambda s, n, a: s.move_to(s.x + n, s.y),
+        "D": lambda s, n, a: s.move_to(s.x - n, s.y),
+        "E": lambda s, n, a: s.move_to(0, s.y + n),
+        "F": lambda s, n, a: s.move_to(0, s.y - n),
+        "G": lambda s, n, a: s.move_to(n - 1, s.y),
+        "H": cursor_position,
+        "f": cursor_position,
+        "d": lambda s, n, a: s.move_to(s.x, n - 1),
+        "J": erase_display,
+        "K": erase_line,
+        "L": insert_lines,
+        "M": delete_lines,
+        "@": insert_chars,
+        "P": delete_chars,
+        "X": lambda s, n, a: s.erase(s.y, s.x, s.x + n),
+        "S": lambda s, n, a: s.scroll_up(n),
+        "T": lambda s, n, a: s.scroll_down(n),
+        "r": set_region,
+        "s": lambda s, n, a: setattr(s, "saved_cursor", (s.x, s.y)),
+        "u": lambda s, n, a: s.move_to(*s.saved_cursor),
+    }
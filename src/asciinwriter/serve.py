@@ -0,0 +1,198 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""A render daemon on a Unix socket, with shells spawned ahead of the jobs.
+
+The client side only needs the standard library modules imported here, so
+that submitting a job stays cheap.
+"""
+
+import json
+import os
+import socket
+import tempfile
+
+
+def default_socket_path():
+    """Return the socket used when none is given."""
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"asciinwriter-{os.getuid()}.sock")
+
+
+def submit(socket_path, scene, output, title=None):
+    """Send a render job to the daemon and return its reply, once it is done.
+
+    The scene runs in the current directory, as it would without the daemon.
+    """
+    job = {
+        "scene": os.path.abspath(scene),
+        "output": os.path.abspath(output),
+        "title": title,
+        "cwd": os.getcwd(),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rw", encoding="utf-8") as f:
+            f.write(json.dumps(job) + "\n")
+            f.flush()
+            reply = f.readline()
+    if not reply:
+        raise ConnectionError("the server closed the connection")
+    return json.loads(reply)
+
+
+class ShellPool:
+    """Shells spawned ahead of time, waiting at their first prompt.
+
+    A background thread keeps size shells ready, and replaces each one as soon
+    as it is taken. Every shell is used for a single job.
+    """
+
+    def __init__(self, runner, size=2):
+        import queue
+        import threading
+
+        self.runner = runner
+        self.ready = queue.Queue(maxsize=size)
+        self.closed = False
+        self.thread = threading.Thread(target=self.fill, daemon=True)
+        self.thread.start()
+
+    def spawn_ready(self):
+        child = self.runner.spawn_shell(cast=True)
+        # before the prompt, as the shell may keep the terminal settings it starts with
+        child.setecho(False)
+        self.runner.expect_prompt(child)
+        return child
+
+    def fill(self):
+        while not self.closed:
+            try:
+                child = self.spawn_ready()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                child = e  # raised to the job that takes it
+            self.ready.put(child)
+
+    def take(self):
+        """Return a shell at its first prompt, waiting for one if none is ready."""
+        while True:
+            child = self.ready.get()
+            if isinstance(child, Exception):
+                raise child
+            if child.isalive():
+                return child
+            child.close(force=True)
+
+    def retire(self, child):
+        """Close a shell that was used, in the background."""
+        import threading
+
+        threading.Thread(
+            target=child.close, kwargs={"force": True}, daemon=True
+        ).start()
+
+    def close(self):
+        import queue
+
+        self.closed = True
+        while True:
+            try:
+                child = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(child, Exception):
+                child.close(force=True)
+
+
+class JobErrors:
+    """Stands in for sys.stderr, so the errors of each job go back to its client.
+
+    What a thread writes while capturing is kept for it; everything else goes
+    to the real stream.
+    """
+
+    def __init__(self, stream):
+        import threading
+
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, data):
+        return (getattr(self.local, "buffer", None) or self.stream).write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+    def capture(self):
+        import io
+
+        self.local.buffer = io.StringIO()
+        return self.local.buffer
+
+    def release(self):
+        text = self.local.buffer.getvalue()
+        self.local.buffer = None
+        return text
+
+
+def handle_job(job, runner_kwargs, errors):
+    """Render a job and return the reply for the client."""
+    from dataclasses import asdict
+
+    from .batch import render_scene
+
+    errors.capture()
+    try:
+        result = render_scene(
+            job["scene"],
+            job["output"],
+            dict(runner_kwargs, cwd=job.get("cwd")),
+            title=job.get("title"),
+        )
+    finally:
+        messages = errors.release()
+    return dict(asdict(result), messages=messages)
+
+
+def serve(socket_path, runner_kwargs, pool_size=2):
+    """Render the jobs sent to socket_path until interrupted.
+
+    Jobs are run concurrently, each with a shell from a pool that is shared by
+    all of them and uses the runner options in runner_kwargs.
+    """
+    import socketserver
+    import sys
+
+    from .runner import AsciinwriterRunner
+
+    pool = ShellPool(AsciinwriterRunner(**runner_kwargs), pool_size)
+    job_kwargs = dict(runner_kwargs, shell_pool=pool)
+    errors = JobErrors(sys.stderr)
+
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                return  # only checking that the server is up
+            try:
+                reply = handle_job(json.loads(line), job_kwargs, errors)
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"status": 1, "error": f"invalid job: {e}", "messages": ""}
+            try:
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            except BrokenPipeError:
+                pass  # the client went away
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    with Server(socket_path, JobHandler) as server:
+        sys.stderr = errors
+        try:
+            server.serve_forever()
+        finally:
+            sys.stderr = errors.stream
+            pool.close()
+            os.remove(socket_path)
@@ -0,0 +1,75 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Fast, deterministic shell startup with a sentinel prompt."""
+
+import atexit
+import os
+import shlex
+import tempfile
+
+# An OSC sequence that terminals and cast players ignore. It marks the prompt
+# invisibly, so that command output can never be mistaken for a prompt.
+SENTINEL = "\x1b]697;asciinwriter\x07"
+SENTINEL_PROMPT = SENTINEL + "$ "
+
+# The same prompt written with bash prompt escapes, so that bash knows the
+# sentinel does not take up any room on the line.
+BASH_PS1 = r"\[\e]697;asciinwriter\a\]$ "
+
+# Variables that make POSIX shells read startup files
+STARTUP_ENV_VARS = ("ENV", "BASH_ENV")
+
+
+def _is_bash(shell):
+    return os.path.basename(shell) == "bash"
+
+
+def _rc_wrapper(rcfile):
+    """Write a bash rc file that sources rcfile and then sets the sentinel prompt."""
+    fd, path = tempfile.mkstemp(prefix="asciinwriter-", suffix=".bashrc")
+    with os.fdopen(fd, "w") as f:
+        f.write(f". {shlex.quote(os.path.abspath(rcfile))}\n")
+        f.write(f"PS1={shlex.quote(BASH_PS1)}\n")
+        f.write("unset PROMPT_COMMAND\n")
+    atexit.register(_remove, path)
+    return path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ShellBootstrap:
+    """Builds the command line and environment for a bootstrapped shell.
+
+    The shell starts without the user's startup files, or with only rcfile,
+    and shows SENTINEL_PROMPT as its prompt. This is meant for bash and POSIX
+    shells that take their prompt from PS1.
+    """
+
+    def __init__(self, shell, rcfile=None):
+        self.shell = shell
+        self.rcfile = rcfile
+        self._wrapper = None
+
+    def args(self):
+        if not _is_bash(self.shell):
+            return []
+        if not self.rcfile:
+            return ["--noprofile", "--norc"]
+        if self._wrapper is None:
+            self._wrapper = _rc_wrapper(self.rcfile)
+        return ["--noprofile", "--rcfile", self._wrapper]
+
+    def env(self):
+        env = {k: v for k, v in os.environ.items() if k not in STARTUP_ENV_VARS}
+        env["PS1"] = BASH_PS1 if _is_bash(self.shell) else SENTINEL_PROMPT
+        if self.rcfile and not _is_bash(self.shell):
+            env["ENV"] = os.path.abspath(self.rcfile)
+        return env
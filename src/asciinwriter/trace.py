@@ -0,0 +1,136 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Per-command tracing of a run, written as JSON lines."""
+
+import json
+import time
+from contextlib import contextmanager
+
+from .scene import EXPECT_COMMANDS
+from .scene import innermost
+from .scene import WRAPPER_COMMANDS
+
+
+def buffer_size(child):
+    """Return how much output pexpect held when the last expect matched."""
+    size = 0
+    for name in ("before", "after", "buffer"):
+        value = getattr(child, name, None)
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+    return size
+
+
+def _param(command):
+    if command.cmd in WRAPPER_COMMANDS:
+        number, inner = command.param
+        return f"{number}, {inner.cmd}({_param(inner)})"
+    return command.param
+
+
+class CountingWriter:
+    """File-like wrapper for logfile_read that counts the child output, in UTF-8 bytes.
+
+    counter is anything with a bytes_read attribute, a Tracer or Metrics.
+    """
+
+    def __init__(self, out, counter):
+        self.out = out
+        self.counter = counter
+
+    def write(self, data):
+        self.counter.bytes_read += len(data.encode("utf-8"))
+        self.out.write(data)
+
+    def flush(self):
+        self.out.flush()
+
+
+class Tracer:
+    """Records one span per scene command.
+
+    The runner adds to the sleeping, blocked and bytes_read counters as it
+    goes; each span gets the difference between its start and its end. Spans
+    are written to fileobj as they finish, and kept for summary().
+    """
+
+    def __init__(self, fileobj=None):
+        self.fileobj = fileobj
+        self.start = time.monotonic()
+        self.sleeping = 0.0
+        self.blocked = 0.0
+        self.bytes_read = 0
+        self.spans = []
+
+    def add(self, span):
+        self.spans.append(span)
+        if self.fileobj:
+            self.fileobj.write(json.dumps(span, default=str) + "\n")
+
+    @contextmanager
+    def span(self, cmd, param=None, line=0, child=None):
+        start = time.monotonic()
+        sleeping, blocked, bytes_read = self.sleeping, self.blocked, self.bytes_read
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            span = {
+                "line": line,
+                "cmd": cmd,
+                "param": param,
+                "start": round(start - self.start, 6),
+                "end": round(end - self.start, 6),
+                "duration": round(end - start, 6),
+                "sleeping": round(self.sleeping - sleeping, 6),
+                "blocked": round(self.blocked - blocked, 6),
+                "bytes_read": self.bytes_read - bytes_read,
+            }
+            if child is not None:
+                span["buffer_size"] = buffer_size(child)
+            self.add(span)
+
+    def command_span(self, command, child):
+        """Return a span context for executing a compiled scene command.
+
+        Commands that wait for the shell, even inside ON() or TIMEOUT(), also
+        get the size of the output pexpect held.
+        """
+        if innermost(command).cmd not in EXPECT_COMMANDS:
+            child = None
+        return self.span(command.cmd, _param(command), command.lineno, child)
+
+    def close(self):
+        if self.fileobj:
+            self.fileobj.close()
+
+
+def load_spans(path):
+    """Read the spans of a trace file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summary(spans, top=10):
+    """Return a report of totals and the slowest commands of a trace."""
+    total = sum(span["duration"] for span in spans)
+    lines = [
+        f"{len(spans)} spans, {total:.3f}s total: "
+        f"{sum(s['sleeping'] for s in spans):.3f}s sleeping, "
+        f"{sum(s['blocked'] for s in spans):.3f}s blocked on the child, "
+        f"{sum(s['bytes_read'] for s in spans)} bytes read",
+        f"slowest {min(top, len(spans))} commands:",
+        f"  {'line':>5} {'seconds':>9} {'blocked':>9} {'buffer':>8}  command",
+    ]
+    for span in sorted(spans, key=lambda s: s["duration"], reverse=True)[:top]:
+        param = str(span["param"] if span["param"] is not None else "")
+        if len(param) > 40:
+            param = param[:37] + "..."
+        lines.append(
+            f"  {span['line']:>5} {span['duration']:9.3f} {span['blocked']:9.3f} "
+            f"{span.get('buffer_size', ''):>8}  {span['cmd']}({param})"
+        )
+    return "\n".join(lines)
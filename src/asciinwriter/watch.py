@@ -0,0 +1,258 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+"""Render scenes again each time they are saved."""
+
+import os
+import select
+import struct
+import time
+
+# Seconds without changes before the scenes that changed are rendered
+DEFAULT_DEBOUNCE = 0.2
+
+# Seconds between two scans of the scenes when polling
+POLL_INTERVAL = 0.5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_EVENT = struct.Struct("iIII")
+
+
+def find_scenes(paths):
+    """Return the scene files given in paths, and the .scene files under the directories."""
+    scenes = []
+    for path in paths:
+        if not os.path.isdir(path):
+            scenes.append(os.path.normpath(path))
+            continue
+        for root, _, files in os.walk(path):
+            scenes.extend(
+                os.path.normpath(os.path.join(root, name))
+                for name in sorted(files)
+                if name.endswith(".scene")
+            )
+    return scenes
+
+
+def scene_filter(paths):
+    """Return a function telling whether a file path is one of the scenes watched."""
+    files = {os.path.normpath(p) for p in paths if not os.path.isdir(p)}
+    dirs = [os.path.normpath(p) for p in paths if os.path.isdir(p)]
+
+    def wanted(path):
+        if path in files:
+            return True
+        return path.endswith(".scene") and any(
+            d == os.curdir or path.startswith(d + os.sep) for d in dirs
+        )
+
+    return wanted
+
+
+class InotifyWatcher:
+    """Changes to the scenes under paths, as inotify reports them (Linux only).
+
+    Directories are watched recursively, including the ones created later.
+    Scene files given on their own are watched through their directory, so
+    that editors replacing the file on save are seen too.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, paths):
+        import ctypes
+
+        self.paths = paths
+        self.wanted = scene_filter(paths)
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            self.raise_errno()
+        self.dirs = {}
+        try:
+            for path in paths:
+                if os.path.isdir(path):
+                    self.add_tree(path)
+                else:
+                    self.add(os.path.dirname(path) or os.curdir, recursive=False)
+        except OSError:
+            self.close()
+            raise
+
+    def raise_errno(self):
+        import ctypes
+
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    def add(self, directory, recursive=True):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            self.raise_errno()
+        self.dirs[wd] = (directory, recursive)
+
+    def add_tree(self, directory):
+        for root, _, _ in os.walk(directory):
+            self.add(root)
+
+    def changes(self, timeout=None):
+        """Return the scenes that changed, waiting up to timeout seconds for one."""
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            changed.update(self.parse(data))
+
+    def parse(self, data):
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size : offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, so anything may have changed
+                yield from find_scenes(self.paths)
+                continue
+            if wd not in self.dirs:
+                continue
+            directory, recursive = self.dirs[wd]
+            path = os.path.normpath(
+                os.path.join(directory, os.fsdecode(name.rstrip(b"\0")))
+            )
+            if mask & IN_ISDIR:
+                if recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self.add_tree(path)
+                    except OSError:
+                        continue  # already gone
+                    # scenes may have been written before the watch was added
+                    yield from filter(self.wanted, find_scenes([path]))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and self.wanted(path):
+                yield path
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changes to the scenes under paths, found by comparing their mtimes."""
+
+    def __init__(self, paths, interval=POLL_INTERVAL):
+        self.paths = paths
+        self.interval = interval
+        self.mtimes = self.scan()
+
+    def scan(self):
+        mtimes = {}
+        for scene in find_scenes(self.paths):
+            try:
+                mtimes[scene] = os.stat(scene).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def changes(self, timeout=None):
+        """Return the scenes that changed, waiting up to timeout seconds for one."""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            mtimes = self.scan()
+            changed = {
+                scene
+                for scene, mtime in mtimes.items()
+                if self.mtimes.get(scene) != mtime
+            }
+            self.mtimes = mtimes
+            remaining = None if end is None else end - time.monotonic()
+            if changed or (remaining is not None and remaining <= 0):
+                return changed
+            time.sleep(
+                self.interval if remaining is None else min(self.interval, remaining)
+            )
+
+    def close(self):
+        pass
+
+
+def make_watcher(paths, poll=False):
+    """Return an InotifyWatcher, or a PollingWatcher if poll is set or inotify is unavailable."""
+    if not poll:
+        try:
+            return InotifyWatcher(paths)
+        except OSError:
+            pass
+    return PollingWatcher(paths)
+
+
+def wait_for_changes(watcher, debounce=DEFAULT_DEBOUNCE):
+    """Wait for scenes to change, then until none changed for debounce seconds.
+
+    A burst of saves, or an editor writing a file in several steps, gives a
+    single set of scenes to render.
+    """
+    changed = set()
+    while not changed:
+        changed = watcher.changes()
+    while True:
+        more = watcher.changes(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def is_stale(scene, output):
+    """Return True if the cast of a scene is missing or older than the scene."""
+    try:
+        return os.stat(output).st_mtime_ns < os.stat(scene).st_mtime_ns
+    except OSError:
+        return True
+
+
+def watch(
+    paths, runner_kwargs=None, output_dir=None, debounce=DEFAULT_DEBOUNCE, poll=False
+):
+    """Render the scenes under paths whenever they change, yielding a RenderResult for each.
+
+    Scenes whose cast is missing or out of date are rendered first. The
+    process stays up between renders, with a shell waiting at its first
+    prompt, so a render starts typing as soon as a scene is saved.
+    """
+    from .batch import cast_path
+    from .batch import render_scene
+    from .runner import AsciinwriterRunner
+    from .serve import ShellPool
+
+    runner_kwargs = runner_kwargs or {}
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    watcher = make_watcher(paths, poll)
+    pool = ShellPool(AsciinwriterRunner(**runner_kwargs), size=1)
+    job_kwargs = dict(runner_kwargs, shell_pool=pool)
+    try:
+        changed = [
+            scene
+            for scene in find_scenes(paths)
+            if is_stale(scene, cast_path(scene, output_dir))
+        ]
+        while True:
+            for scene in sorted(changed):
+                if os.path.exists(scene):
+                    yield render_scene(scene, cast_path(scene, output_dir), job_kwargs)
+            changed = wait_for_changes(watcher, debounce)
+    finally:
+        pool.close()
+        watcher.close()
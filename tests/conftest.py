@@ -0,0 +1,47 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+
+import pytest
+
+from asciinwriter.runner import AsciinwriterRunner
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep asciinwriter caches out of the user's home directory during tests."""
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("ASCIINWRITER_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture
+def fast_runner():
+    """Return a factory of runners that type without delays and time out quickly."""
+
+    def make(**kwargs):
+        options = dict(
+            typing_delay_range=(0.001, 0.001),
+            jitter_factor=0,
+            post_typing_delay=0,
+            shell="sh",
+            shell_prompt=r"[#$] ",
+            timeout=10,
+        )
+        options.update(kwargs)
+        return AsciinwriterRunner(**options)
+
+    return make
+
+
+@pytest.fixture
+def cast_text():
+    """Return a function that joins the output of the events of a cast file."""
+
+    def text(path):
+        lines = path.read_text().splitlines()
+        return "".join(json.loads(line)[2] for line in lines[1:])
+
+    return text
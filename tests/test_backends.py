@@ -0,0 +1,99 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import functools
+import time
+
+import pexpect
+import pytest
+
+from asciinwriter.backends import FakeShell
+from asciinwriter.backends import PtyChild
+
+
+def test_pty_backend_renders_scene(fast_runner, tmp_path, cast_text):
+    """Test a real render on the pty backend, in a terminal of the cast's size."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(stty size)\nENTER()\nEXPECT(24 80)\nEXPECT_PROMPT()\n")
+    cast = tmp_path / "demo.cast"
+
+    fast_runner(backend="pty").process_file(str(scene), output_file=str(cast))
+
+    assert "24 80\r\n" in cast_text(cast)
+
+
+def test_pty_backend_runs_sessions(fast_runner, tmp_path, cast_text):
+    """Test that the pty backend drives the shells of a scene with sessions."""
+    scene = tmp_path / "sessions.scene"
+    scene.write_text(
+        "SESSION(server)\nSEND(echo server-ready)\nENTER()\nEXPECT(server-ready)\nSIGNAL(ready)\n"
+        "SESSION(client)\nWAIT(ready)\nSEND(echo client-done)\nENTER()\nEXPECT(client-done)\n"
+    )
+    cast = tmp_path / "sessions.cast"
+
+    fast_runner(backend="pty").process_file(str(scene), output_file=str(cast))
+
+    assert "client-done" in cast_text(cast)
+
+
+def test_pty_child_eof_and_exit_status():
+    """Test that a shell exiting is an EOF, with its exit status."""
+    child = PtyChild("sh", args=["-c", "echo bye; exit 3"], timeout=5)
+    child.expect_exact("bye")
+    child.expect(pexpect.EOF)
+    assert not child.isalive()
+    assert child.exitstatus == 3
+    child.close()
+
+
+def test_pty_child_close_hangs_up_the_shell():
+    """Test that closing the child ends a shell that is still running."""
+    child = PtyChild("sh", timeout=5)
+    child.send("echo ready\r")
+    child.expect_exact("ready\r\n")
+    start = time.monotonic()
+    child.close()
+    assert time.monotonic() - start < 0.5
+    assert not child.isalive()
+    with pytest.raises(ValueError):
+        child.read_nonblocking()
+
+
+def test_fake_shell_renders_scene(fast_runner, tmp_path, cast_text):
+    """Test a hermetic render against the in-memory shell."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\nEXPECT(notes.txt)\nEXPECT_PROMPT()\n")
+    cast = tmp_path / "demo.cast"
+    backend = functools.partial(FakeShell, outputs={"ls": "notes.txt"})
+
+    fast_runner(backend=backend, bootstrap=True).process_file(
+        str(scene), output_file=str(cast)
+    )
+
+    assert "$ ls\r\r\nnotes.txt\r\n" in cast_text(cast)
+
+
+def test_fake_shell_times_out_at_once(fast_runner, tmp_path, capsys):
+    """Test that waiting for output the fake shell never gives fails without waiting."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\nEXPECT(never)\n")
+    start = time.monotonic()
+
+    with pytest.raises(SystemExit):
+        fast_runner(backend=FakeShell).process_file(str(scene))
+
+    assert time.monotonic() - start < 5
+    assert "never" in capsys.readouterr().err
+
+
+def test_fake_shell_echo_and_exit():
+    """Test that the fake shell stops echoing on request and ends on exit."""
+    child = FakeShell(outputs=lambda line: line.upper())
+    child.setecho(False)
+    child.send("hello\r")
+    child.expect_exact("HELLO\r\n$ ")
+    assert child.before == "$ \r\n"
+    child.send("exit\r")
+    child.expect(pexpect.EOF)
+    assert not child.isalive()
@@ -0,0 +1,104 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+import os
+
+import pytest
+
+from asciinwriter.__main__ import main
+from asciinwriter.batch import cast_path
+from asciinwriter.batch import render_batch
+from asciinwriter.batch import render_scene
+from asciinwriter.batch import RenderResult
+
+
+def test_cast_path():
+    """Test that cast files go next to the scene unless an output dir is given."""
+    assert cast_path("scenes/intro.scene") == os.path.join("scenes", "intro.cast")
+    assert cast_path("scenes/intro.scene", "out") == os.path.join("out", "intro.cast")
+
+
+def test_same_named_scenes_are_rejected(mocker, tmp_path, capsys):
+    """Test that scenes that would overwrite each other's cast are an error."""
+    scenes = []
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        scene = tmp_path / directory / "intro.scene"
+        scene.write_text("SEND(echo intro)\n")
+        scenes.append(str(scene))
+    out_dir = str(tmp_path / "out")
+
+    with pytest.raises(ValueError, match="would both be rendered to"):
+        next(render_batch(scenes, output_dir=out_dir))
+    mocker.patch(
+        "sys.argv", ["asciinwriter", "render", "--output-dir", out_dir, *scenes]
+    )
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert "intro.cast" in capsys.readouterr().err
+    assert not os.path.exists(out_dir)
+    # next to each scene, they do not collide
+    runner_kwargs = {"shell": "sh", "shell_prompt": r"[#$] ", "timeout": 10}
+    assert len(list(render_batch(scenes, runner_kwargs=runner_kwargs))) == 2
+
+
+def test_render_scene_reports_failure(tmp_path):
+    """Test that a failing scene is reported instead of aborting the batch."""
+    result = render_scene(str(tmp_path / "missing.scene"), str(tmp_path / "x.cast"))
+    assert not result.ok
+    assert result.status == 1
+    assert result.elapsed >= 0
+
+
+def test_render_batch(tmp_path):
+    """Test that scenes are rendered to cast files by worker processes."""
+    scenes = []
+    for name in ("one", "two"):
+        scene = tmp_path / f"{name}.scene"
+        scene.write_text(f"SEND(echo {name})\nENTER()\nEXPECT({name})\n")
+        scenes.append(str(scene))
+    scenes.append(str(tmp_path / "missing.scene"))
+
+    out_dir = tmp_path / "casts"
+    results = list(
+        render_batch(
+            scenes,
+            output_dir=str(out_dir),
+            jobs=2,
+            runner_kwargs={"shell": "sh", "shell_prompt": r"[#$] ", "timeout": 10},
+        )
+    )
+
+    by_scene = {os.path.basename(r.scene): r for r in results}
+    assert by_scene["one.scene"].ok
+    assert by_scene["two.scene"].ok
+    assert not by_scene["missing.scene"].ok
+    header = json.loads((out_dir / "one.cast").read_text().splitlines()[0])
+    assert header["version"] == 2
+
+
+def test_render_subcommand(mocker, tmp_path, capsys):
+    """Test that 'asciinwriter render' reports each scene and fails if any failed."""
+    mock_batch = mocker.patch(
+        "asciinwriter.batch.render_batch",
+        return_value=[
+            RenderResult("a.scene", "a.cast", 0, 1.0),
+            RenderResult("b.scene", "b.cast", 1, 2.0),
+        ],
+    )
+    mocker.patch(
+        "sys.argv", ["asciinwriter", "render", "-j", "3", "a.scene", "b.scene"]
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 1
+    assert mock_batch.call_args.kwargs["jobs"] == 3
+    out = capsys.readouterr().out
+    assert "a.scene: ok in 1.00s -> a.cast" in out
+    assert "b.scene: FAILED (1)" in out
+    assert "Rendered 1/2 scenes" in out
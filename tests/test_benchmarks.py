@@ -0,0 +1,40 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARKS = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "run.py")
+
+
+def test_benchmark_suite_smoke(tmp_path):
+    """Test that the benchmark suite runs and saves comparable JSON results."""
+    output = tmp_path / "results.json"
+    result = subprocess.run(
+        [sys.executable, BENCHMARKS, "--quick", "--repeat", "1", "-k", "per_"]
+        + ["--output", str(output)],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == {
+        "human_type_per_char",
+        "process_line_per_command",
+    }
+    assert report["results"]["human_type_per_char"]["unit"] == "ns/char"
+
+    result = subprocess.run(
+        [sys.executable, BENCHMARKS, "--quick", "--repeat", "1", "-k", "parse"]
+        + ["--compare", str(output)],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "parse_throughput" in result.stdout
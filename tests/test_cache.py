@@ -0,0 +1,138 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+
+import pytest
+
+from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.__main__ import main
+from asciinwriter.cache import parse_size
+from asciinwriter.cache import RenderCache
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("100", 100),
+        ("4K", 4096),
+        ("1.5M", 1572864),
+        ("2g", 2 * 1024**3),
+        ("8MB", 8 * 1024**2),
+    ],
+)
+def test_parse_size(text, expected):
+    """Test that cache sizes accept K/M/G suffixes."""
+    assert parse_size(text) == expected
+
+
+def test_key_depends_on_scene_params_inputs_and_env(tmp_path, monkeypatch):
+    """Test that the cache key changes whenever any of its inputs change."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\n")
+    data = tmp_path / "data.txt"
+    data.write_text("v1")
+    monkeypatch.setenv("DEMO_VAR", "a")
+    cache = RenderCache(str(tmp_path), inputs=[str(data)], env_vars=["DEMO_VAR"])
+
+    key = cache.key(str(scene), {"shell": "bash"})
+    assert cache.key(str(scene), {"shell": "bash"}) == key
+    assert cache.key(str(scene), {"shell": "zsh"}) != key
+
+    data.write_text("v2")
+    assert cache.key(str(scene), {"shell": "bash"}) != key
+    data.write_text("v1")
+
+    monkeypatch.setenv("DEMO_VAR", "b")
+    assert cache.key(str(scene), {"shell": "bash"}) != key
+    monkeypatch.setenv("DEMO_VAR", "a")
+
+    scene.write_text("SEND(pwd)\n")
+    assert cache.key(str(scene), {"shell": "bash"}) != key
+
+
+def test_get_and_put(tmp_path):
+    """Test storing a cast and getting it back."""
+    cache = RenderCache(str(tmp_path / "cache"))
+    src = tmp_path / "src.cast"
+    src.write_text("cast data")
+    dest = tmp_path / "dest.cast"
+
+    assert not cache.get("k1", str(dest))
+    cache.put("k1", str(src))
+    assert cache.get("k1", str(dest))
+    assert dest.read_text() == "cast data"
+
+
+def test_unreadable_cache_is_a_miss(tmp_path):
+    """Test that a cache directory that cannot be used is a miss, not an error."""
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / "casts").write_text("not a directory")
+    cache = RenderCache(str(tmp_path / "cache"))
+    assert not cache.get("k1", str(tmp_path / "dest.cast"))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """Test that the oldest used entries are evicted once the size limit is exceeded."""
+    cache = RenderCache(str(tmp_path / "cache"), max_size=25)
+    src = tmp_path / "src.cast"
+    src.write_text("x" * 10)
+
+    cache.put("a", str(src))
+    cache.put("b", str(src))
+    os.utime(cache._path("a"), (1000, 1000))
+    os.utime(cache._path("b"), (2000, 2000))
+    cache.get("a", str(tmp_path / "out.cast"))  # "a" is now the most recently used
+    cache.put("c", str(src))
+
+    assert os.path.exists(cache._path("a"))
+    assert not os.path.exists(cache._path("b"))
+    assert os.path.exists(cache._path("c"))
+
+
+def test_runner_uses_render_cache(mocker, tmp_path):
+    """Test that an unchanged scene is served from the cache without spawning a shell."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("ENTER()\n")
+    cast = tmp_path / "demo.cast"
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    cache = RenderCache(str(tmp_path / "cache"))
+
+    runner = AsciinwriterRunner(render_cache=cache)
+    assert runner.process_file(str(scene), output_file=str(cast)) is False
+    assert mock_spawn.call_count == 1
+    first = cast.read_text()
+    cast.unlink()
+
+    assert runner.process_file(str(scene), output_file=str(cast)) is True
+    assert mock_spawn.call_count == 1
+    assert cast.read_text() == first
+
+    other = AsciinwriterRunner(render_cache=cache, typing_delay_range=(0.2, 0.3))
+    assert other.process_file(str(scene), output_file=str(cast)) is False
+    assert mock_spawn.call_count == 2
+
+
+def test_runner_renders_when_the_cache_cannot_be_written(mocker, tmp_path):
+    """Test that a render still writes its cast when storing it in the cache fails."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("ENTER()\n")
+    cast = tmp_path / "demo.cast"
+    mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    cache = RenderCache(str(tmp_path / "cache"))
+    mocker.patch.object(cache, "put", side_effect=PermissionError("read-only"))
+
+    runner = AsciinwriterRunner(render_cache=cache)
+    assert runner.process_file(str(scene), output_file=str(cast)) is False
+    assert cast.read_text().startswith('{"version": 2')
+
+
+def test_cache_dir_requires_output(mocker, tmp_path):
+    """Test that --cache-dir is rejected without --output."""
+    mocker.patch(
+        "sys.argv", ["asciinwriter", "--cache-dir", str(tmp_path), "demo.scene"]
+    )
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 2
@@ -0,0 +1,275 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import io
+import json
+import os
+
+import pytest
+
+from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.__main__ import main
+from asciinwriter.backends import FakeShell
+from asciinwriter.cast import CastWriter
+from asciinwriter.cast import Retimer
+from asciinwriter.cast import transform_casts
+from asciinwriter.cast import VirtualClock
+
+
+def test_virtual_clock_skips_sleeps(mocker):
+    """Test that sleeping on the virtual clock advances it without real time passing."""
+    mocker.patch("asciinwriter.cast.time.monotonic", return_value=100.0)
+    clock = VirtualClock()
+    clock.sleep(1.5)
+    clock.sleep(0.25)
+    assert clock.now() == 1.75
+
+
+def test_virtual_clock_counts_real_time_while_waiting(mocker):
+    """Test that only real time spent waiting is added on top of the skipped sleeps."""
+    monotonic = mocker.patch("asciinwriter.cast.time.monotonic", return_value=100.0)
+    clock = VirtualClock()
+    clock.sleep(1.0)
+    monotonic.return_value = 101.0
+    assert clock.now() == 1.0
+    with clock.waiting():
+        monotonic.return_value = 103.5
+        assert clock.now() == 3.5
+    monotonic.return_value = 110.0
+    assert clock.now() == 3.5
+
+
+def test_cast_writer_header_and_events(mocker):
+    """Test that CastWriter produces an asciicast v2 header and output events."""
+    clock = mocker.Mock()
+    clock.now.return_value = 0.1234567
+    out = io.StringIO()
+    writer = CastWriter(out, clock, width=100, height=30, title="Demo")
+
+    writer.write_header()
+    writer.write("hello")
+    writer.write("")
+
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2
+    header = json.loads(lines[0])
+    assert header["version"] == 2
+    assert header["width"] == 100
+    assert header["height"] == 30
+    assert header["title"] == "Demo"
+    assert json.loads(lines[1]) == [0.123457, "o", "hello"]
+
+
+def test_cast_writer_coalesces_output(mocker):
+    """Test that writes within the window become one event, and a sleep ends an event."""
+    monotonic = mocker.patch("asciinwriter.cast.time.monotonic", return_value=100.0)
+    clock = VirtualClock()
+    out = io.StringIO()
+    writer = CastWriter(out, clock, coalesce_window=0.01)
+
+    writer.write("a")
+    clock.sleep(0.001)
+    writer.write("b")
+    with clock.waiting():
+        writer.write("\r")
+        monotonic.return_value = 100.005
+        writer.write("out")
+        monotonic.return_value = 100.02
+        writer.write("put")
+    assert out.getvalue().count("\n") == 2
+    writer.write_pending()
+
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert events == [
+        [0.0, "o", "a"],
+        [0.001, "o", "b\rout"],
+        [0.021, "o", "put"],
+    ]
+
+
+def test_runner_coalesces_shell_output(fast_runner, tmp_path):
+    """Test that a coalesced cast shows the same output in fewer events."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\nEXPECT(b.txt)\nEXPECT_PROMPT()\n")
+
+    def backend(shell, **kwargs):
+        child = FakeShell(shell, outputs={"ls": "a.txt\nb.txt"}, **kwargs)
+        child.maxread = 1  # one event per character read
+        return child
+
+    casts = {}
+    for window in (None, 0.01):
+        cast = tmp_path / f"demo-{window}.cast"
+        fast_runner(backend=backend, coalesce_window=window).process_file(
+            str(scene), output_file=str(cast)
+        )
+        casts[window] = [
+            json.loads(line)[2] for line in cast.read_text().splitlines()[1:]
+        ]
+
+    assert "".join(casts[0.01]) == "".join(casts[None])
+    assert len(casts[0.01]) < len(casts[None])
+    assert casts[0.01][1:3] == ["l", "s"]
+
+
+def test_runner_writes_cast_without_sleeping(mocker, tmp_path):
+    """Test that the runner writes a cast file and never sleeps for real."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\nDELAY(5)\n")
+    cast = tmp_path / "demo.cast"
+
+    mock_sleep = mocker.patch("asciinwriter.__main__.time.sleep")
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    mock_print = mocker.patch("builtins.print")
+
+    runner = AsciinwriterRunner(typing_delay_range=(0.1, 0.1), jitter_factor=0)
+    runner.process_file(str(scene), output_file=str(cast))
+
+    mock_sleep.assert_not_called()
+    mock_print.assert_not_called()
+    assert mock_spawn.call_args.kwargs["dimensions"] == (24, 80)
+    assert mock_spawn.return_value.delaybeforesend is None
+
+    lines = cast.read_text().splitlines()
+    assert json.loads(lines[0])["version"] == 2
+    events = [json.loads(line) for line in lines[1:]]
+    assert "".join(e[2] for e in events) == "ls\r"
+    # typing "l", "s" and the post-typing delay were added to the virtual clock
+    assert events[0][0] >= 0.1
+    assert events[1][0] >= 0.2
+    assert events[2][0] >= 0.5
+
+
+def test_main_output_option(mocker, tmp_path):
+    """Test that --output makes main write a cast file."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("ENTER()\n")
+    cast = tmp_path / "demo.cast"
+
+    mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    mocker.patch(
+        "sys.argv",
+        ["asciinwriter", "--output", str(cast), "--cols", "120", str(scene)],
+    )
+    main()
+
+    header = json.loads(cast.read_text().splitlines()[0])
+    assert header["width"] == 120
+    assert header["height"] == 24
+
+
+def test_seeded_casts_have_identical_typing(mocker, tmp_path):
+    """Test that seeded renders of the same scene type with the same delays.
+
+    The time spent waiting for the shell is real, so it is frozen here to
+    compare the typing alone.
+    """
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(echo hello world)\nENTER()\nDELAY(1)\nSEND(ls)\n")
+    mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    mocker.patch("asciinwriter.cast.time.monotonic", return_value=0.0)
+
+    casts = []
+    for name in ("a.cast", "b.cast"):
+        AsciinwriterRunner(seed=3).process_file(
+            str(scene), output_file=str(tmp_path / name)
+        )
+        casts.append((tmp_path / name).read_bytes())
+
+    assert casts[0] == casts[1]
+    assert "timestamp" not in json.loads(casts[0].splitlines()[0])
+
+
+def write_cast(path, events, **header):
+    header = dict({"version": 2, "width": 80, "height": 24}, **header)
+    lines = [json.dumps(header)] + [json.dumps([t, "o", data]) for t, data in events]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def read_cast(text):
+    lines = text.splitlines()
+    return json.loads(lines[0]), [json.loads(line) for line in lines[1:]]
+
+
+def test_retimer_caps_idle_and_scales_speed():
+    """Test that gaps are capped in recording time before the speed is applied."""
+    lines = ['[0.5, "o", "a"]\n', '[10.5, "o", "b"]\n', '[11.0, "o", "c, d"]']
+    retimer = Retimer(idle_limit=2, speed=2)
+    events = [json.loads(line) for line in retimer.events(lines)]
+    assert events == [[0.25, "o", "a"], [1.25, "o", "b"], [1.5, "o", "c, d"]]
+
+
+def test_retimer_trims_to_time_range():
+    """Test that events outside start..end are dropped and the rest start at zero."""
+    lines = [f'[{t}, "o", "{t}"]\n' for t in (1, 2, 3, 4, 5)]
+    retimer = Retimer(start=2, end=4)
+    events = [json.loads(line) for line in retimer.events(lines)]
+    assert events == [[0.0, "o", "2"], [1.0, "o", "3"], [2.0, "o", "4"]]
+
+
+def test_transform_casts_concatenates(tmp_path):
+    """Test that concatenated casts are rebased to follow each other."""
+    first = write_cast(tmp_path / "a.cast", [(0.5, "a"), (1.0, "b")], title="A")
+    second = write_cast(tmp_path / "b.cast", [(0.25, "c")], width=120)
+    out = io.StringIO()
+    transform_casts([first, second], out)
+
+    header, events = read_cast(out.getvalue())
+    assert header == {"version": 2, "width": 120, "height": 24, "title": "A"}
+    assert events == [[0.5, "o", "a"], [1.0, "o", "b"], [1.25, "o", "c"]]
+
+
+def test_transform_casts_rejects_other_files(tmp_path):
+    """Test that a file that is not an asciicast v2 file is reported by name."""
+    path = tmp_path / "x.cast"
+    path.write_text('{"version": 1}\n')
+    with pytest.raises(ValueError, match="x.cast: not an asciicast v2 file"):
+        transform_casts([str(path)], io.StringIO())
+
+
+def test_main_cast_subcommand(mocker, tmp_path):
+    """Test the cast subcommand writing to a file and in place."""
+    path = write_cast(tmp_path / "a.cast", [(1, "a"), (30, "b")])
+    output = tmp_path / "out.cast"
+    mocker.patch(
+        "sys.argv",
+        ["asciinwriter", "cast", "--idle-limit", "2", "-o", str(output), path],
+    )
+    main()
+    assert read_cast(output.read_text())[1] == [[1.0, "o", "a"], [3.0, "o", "b"]]
+
+    mocker.patch("sys.argv", ["asciinwriter", "cast", "--speed", "2", "-i", path])
+    main()
+    assert read_cast((tmp_path / "a.cast").read_text())[1] == [
+        [0.5, "o", "a"],
+        [15.0, "o", "b"],
+    ]
+    assert sorted(os.listdir(tmp_path)) == ["a.cast", "out.cast"]
+
+
+def test_main_cast_subcommand_error(mocker, tmp_path, capsys):
+    """Test that an invalid cast exits with an error and leaves the file alone."""
+    path = tmp_path / "bad.cast"
+    path.write_text("not json\n")
+    mocker.patch("sys.argv", ["asciinwriter", "cast", "-i", str(path)])
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 1
+    assert "bad.cast: not an asciicast v2 file" in capsys.readouterr().err
+    assert path.read_text() == "not json\n"
+    assert os.listdir(tmp_path) == ["bad.cast"]
+
+
+def test_main_cast_subcommand_output_is_an_input(mocker, tmp_path):
+    """Test that an output that is also an input is read before it is replaced."""
+    first = write_cast(tmp_path / "a.cast", [(1, "a")])
+    second = write_cast(tmp_path / "b.cast", [(2, "b")])
+    mocker.patch("sys.argv", ["asciinwriter", "cast", "-o", first, first, second])
+    main()
+    assert read_cast((tmp_path / "a.cast").read_text())[1] == [
+        [1.0, "o", "a"],
+        [3.0, "o", "b"],
+    ]
+    assert sorted(os.listdir(tmp_path)) == ["a.cast", "b.cast"]
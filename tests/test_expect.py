@@ -0,0 +1,183 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import re
+
+import pexpect
+import pytest
+
+from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.scene import Command
+from asciinwriter.scene import compile_lines
+from asciinwriter.scene import compile_scene
+from asciinwriter.scene import format_command
+from asciinwriter.scene import parse_line
+from asciinwriter.scene import SceneError
+
+
+def test_parse_expect_variants():
+    """Test parsing of the EXPECT_RE, EXPECT_ANY and ON commands."""
+    assert parse_line(r"EXPECT_RE(\d+ passed)") == Command("EXPECT_RE", r"\d+ passed")
+    assert parse_line("EXPECT_ANY(Proceed? || Abort?)") == Command(
+        "EXPECT_ANY", ["Proceed?", "Abort?"]
+    )
+    assert parse_line("ON(2, SEND(n))") == Command("ON", (2, Command("SEND", "n")))
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "EXPECT_RE(([a-z)",
+        "EXPECT_ANY(yes || )",
+        "ON(0, SEND(y))",
+        "ON(x, SEND(y))",
+        "ON(1, TYPE(y))",
+    ],
+)
+def test_parse_expect_variants_invalid(line):
+    """Test that invalid EXPECT variants are rejected at compile time."""
+    with pytest.raises(SceneError):
+        parse_line(line)
+
+
+def test_on_must_match_an_alternative():
+    """Test that ON() refers to an alternative of the preceding EXPECT_ANY()."""
+    compile_lines(["EXPECT_ANY(a || b)", "ON(2, SEND(x))"])
+    with pytest.raises(SceneError) as exc_info:
+        compile_lines(["EXPECT_ANY(a || b)", "ON(3, SEND(x))"])
+    assert exc_info.value.lineno == 2
+    with pytest.raises(SceneError):
+        compile_lines(["ON(1, SEND(x))"])
+
+
+def test_nested_commands_survive_ir_cache(tmp_path):
+    """Test that ON() commands are stored and loaded from the IR cache intact."""
+    scene = tmp_path / "branch.scene"
+    scene.write_text("EXPECT_ANY(a || b)\nON(1, ENTER(2))\n")
+    first = compile_scene(str(scene), cache_dir=str(tmp_path))
+    assert compile_scene(str(scene), cache_dir=str(tmp_path)) == first
+    assert first[1].param == (1, Command("ENTER", 2, 2))
+
+
+def test_expect_uses_expect_exact(mocker):
+    """Test that literal EXPECT() avoids regular expressions."""
+    child = mocker.Mock()
+    AsciinwriterRunner().process_line(child, "EXPECT(1.0 [ok])")
+    child.expect_exact.assert_called_once_with("1.0 [ok]")
+    child.expect.assert_not_called()
+
+
+def test_expect_re_uses_cached_pattern_and_window(mocker):
+    """Test that EXPECT_RE() compiles its pattern once and bounds the search window."""
+    child = mocker.Mock()
+    runner = AsciinwriterRunner(search_window=1000)
+    runner.process_line(child, r"EXPECT_RE(\d+ passed)")
+    runner.process_line(child, r"EXPECT_RE(\d+ passed)")
+
+    first, second = child.expect_list.call_args_list
+    assert first.args[0][0] is second.args[0][0]
+    assert first.args[0][0].pattern == r"\d+ passed"
+    assert first.args[0][0].flags & re.DOTALL
+    assert first.kwargs["searchwindowsize"] == 1000
+
+
+def test_expect_any_branches(mocker):
+    """Test that ON() only runs the command for the alternative that matched."""
+    child = mocker.Mock()
+    child.expect_exact.return_value = 1  # second alternative
+    mocker.patch("asciinwriter.__main__.time.sleep")
+    runner = AsciinwriterRunner()
+
+    runner.process_line(child, "EXPECT_ANY(Proceed? || Abort?)")
+    runner.process_line(child, "ON(1, ENTER(3))")
+    runner.process_line(child, "ON(2, ENTER())")
+
+    child.expect_exact.assert_called_once_with(["Proceed?", "Abort?"])
+    assert child.send.call_count == 1
+
+
+def test_expect_any_with_real_child():
+    """Test EXPECT_ANY() against a real process."""
+    child = pexpect.spawn(
+        "sh", ["-c", "echo 'Overwrite? [y/n]'; sleep 5"], encoding="utf-8", timeout=5
+    )
+    try:
+        runner = AsciinwriterRunner()
+        runner.process_line(child, "EXPECT_ANY(Proceed? || Overwrite?)")
+        assert runner.last_match == 2
+        runner.process_line(child, r"EXPECT_RE(\[(y)/n\])")
+        assert child.match.group(1) == "y"
+    finally:
+        child.close(force=True)
+
+
+def test_parse_timeout():
+    """Test parsing of TIMEOUT() and the commands it applies to."""
+    command = parse_line("TIMEOUT(2.5, EXPECT_ANY(a || b))")
+    assert command == Command("TIMEOUT", (2.5, Command("EXPECT_ANY", ["a", "b"])))
+    assert format_command(command) == "TIMEOUT(2.5, EXPECT_ANY(a || b))"
+    with pytest.raises(SceneError, match="only applies to EXPECT"):
+        parse_line("TIMEOUT(5, SEND(ls))")
+    for seconds in ("0", "-1", "inf", "nan"):
+        with pytest.raises(SceneError, match="positive number of seconds"):
+            parse_line(f"TIMEOUT({seconds}, EXPECT(x))")
+    commands = compile_lines(["TIMEOUT(1, EXPECT_ANY(a || b))", "ON(2, ENTER())"])
+    assert commands[1].param[0] == 2
+
+
+def test_timeout_is_passed_only_when_set(mocker):
+    """Test that TIMEOUT() is given to the expect, and other expects use the default."""
+    child = mocker.Mock()
+    runner = AsciinwriterRunner()
+    runner.process_line(child, "TIMEOUT(3, EXPECT(done))")
+    child.expect_exact.assert_called_once_with("done", timeout=3.0)
+    runner.process_line(child, "EXPECT(done)")
+    child.expect_exact.assert_called_with("done")
+
+
+def test_time_budget_caps_timeouts(mocker):
+    """Test that expects never wait past the time budget."""
+    mocker.patch("asciinwriter.runner.time.monotonic", return_value=100.0)
+    runner = AsciinwriterRunner(time_budget=30)
+    runner.deadline = 110.0
+    assert runner.expect_timeout() == {"timeout": 10.0}
+    runner.command_timeout = 2
+    assert runner.expect_timeout() == {"timeout": 2}
+    runner.deadline = 90.0
+    assert runner.expect_timeout() == {"timeout": 0}
+    assert runner.over_budget()
+
+
+@pytest.mark.parametrize(
+    "error, message",
+    [
+        (
+            pexpect.TIMEOUT("t"),
+            "demo.scene:3: timed out after 2s waiting at TIMEOUT(2, EXPECT(done))",
+        ),
+        (
+            pexpect.EOF("e"),
+            "demo.scene:3: the shell exited while waiting at TIMEOUT(2, EXPECT(done))",
+        ),
+    ],
+)
+def test_failed_expect_reports_and_kills_shell(
+    mocker, tmp_path, capsys, error, message
+):
+    """Test that a failed EXPECT reports the scene line and output, and kills the shell."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(make)\nENTER()\nTIMEOUT(2, EXPECT(done))\n")
+    mocker.patch("asciinwriter.__main__.time.sleep")
+    child = mocker.patch("asciinwriter.__main__.pexpect.spawn").return_value
+    child.before = "make\r\nError 1\r\n"
+    child.expect_exact.side_effect = error
+
+    with pytest.raises(SystemExit) as exc:
+        AsciinwriterRunner().process_file(str(scene))
+    assert exc.value.code == 1
+    err = capsys.readouterr().err
+    assert f"Error: {scene.parent / message}" in err
+    assert "  | make\n  | Error 1\n" in err
+    child.close.assert_called_once_with(force=True)
+    child.sendeof.assert_not_called()
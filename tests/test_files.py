@@ -0,0 +1,58 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import gzip
+import os
+import stat
+import threading
+
+import pytest
+
+from asciinwriter.files import atomic_write
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    """Test that the file is replaced, with the permissions open() would give it."""
+    path = tmp_path / "demo.cast.gz"
+    path.write_text("old")
+    with atomic_write(str(path), "wt", gzip.open, encoding="utf-8") as f:
+        f.write("new")
+        assert path.read_text() == "old"
+    assert gzip.open(path, "rt").read() == "new"
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~umask
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_atomic_write_removes_temp_file_on_failure(tmp_path):
+    """Test that a failed write leaves the file as it was, and no temporary file."""
+    path = tmp_path / "demo.cast"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write("partial")
+            raise RuntimeError("failed")
+    assert path.read_text() == "old"
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_concurrent_writers_do_not_share_temp_files(tmp_path):
+    """Test that threads writing the same file each replace it with a whole file."""
+    path = str(tmp_path / "entry.cast")
+    barrier = threading.Barrier(8)
+
+    def write(n):
+        with atomic_write(path) as f:
+            f.write(str(n) * 1000)
+            barrier.wait()
+            f.write(str(n) * 1000)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    content = open(path).read()
+    assert content == content[0] * 2000
@@ -3,6 +3,7 @@
 # SPDX-FileCopyrightText: 2025 Alexei Znamensky
 # SPDX-License-Identifier: GPL-3.0-or-later
 from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.scene import parse_line
 
 
 def test_human_type_sends_characters(mocker):
@@ -27,17 +28,68 @@ def test_human_type_sends_characters(mocker):
     assert mock_sleep.call_count == 6  # 5 chars + 1 final delay
 
 
-def test_human_type_prints_output(mocker):
-    """Test that human_type prints characters to stdout."""
+def test_human_type_prints_output(mocker, capfd):
+    """Test that human_type echoes characters to stdout."""
     runner = AsciinwriterRunner(
         typing_delay_range=(0.05, 0.05), jitter_factor=0, post_typing_delay=0.1
     )
     mocker.patch("asciinwriter.__main__.time.sleep")
-    mock_print = mocker.patch("builtins.print")
     mock_child = mocker.Mock()
 
     runner.human_type(mock_child, "hi")
 
-    # Should print each character
-    mock_print.assert_any_call("h", end="", flush=True)
-    mock_print.assert_any_call("i", end="", flush=True)
+    # Should echo each character
+    assert capfd.readouterr().out == "hi"
+
+
+def test_human_type_writes_each_character_separately(mocker):
+    """Test that every keystroke is written, and flushed, on its own."""
+    runner = AsciinwriterRunner()
+    mocker.patch("asciinwriter.__main__.time.sleep")
+    mock_write = mocker.patch(
+        "asciinwriter.output.os.write", side_effect=lambda fd, data: len(data)
+    )
+    mocker.patch("sys.stdout.fileno", return_value=1, create=True)
+
+    runner.human_type(mocker.Mock(), "héllo")
+
+    assert [c.args[1] for c in mock_write.call_args_list] == [
+        b"h",
+        "é".encode("utf-8"),
+        b"l",
+        b"l",
+        b"o",
+    ]
+
+
+def test_human_type_translates_newlines_across_characters(mocker, capfd):
+    """Test that a bare newline is shown as CRLF, but an existing CRLF is kept."""
+    runner = AsciinwriterRunner()
+    mocker.patch("asciinwriter.__main__.time.sleep")
+    mock_child = mocker.Mock()
+
+    runner.human_type(mock_child, "a\nb\r\nc")
+
+    assert capfd.readouterr().out == "a\r\nb\r\nc"
+    # the child still gets exactly what was typed
+    assert "".join(c.args[0] for c in mock_child.send.call_args_list) == "a\nb\r\nc"
+
+
+def test_send_upfront_sends_text_and_enter_at_once(mocker):
+    """Test that with send_upfront a SEND and the ENTER after it reach the child in one write."""
+    runner = AsciinwriterRunner(send_upfront=True, seed=1)
+    mocker.patch("asciinwriter.__main__.time.sleep")
+    mock_child = mocker.Mock()
+    mock_echo = mocker.patch.object(runner, "echo")
+
+    runner.next_command = parse_line("ENTER(2)")
+    runner.process_line(mock_child, "SEND(ls -l)")
+    runner.next_command = None
+    runner.process_line(mock_child, "ENTER(2)")
+    runner.process_line(mock_child, "ENTER()")
+
+    assert mock_child.send.call_args_list == [
+        mocker.call("ls -l\r\r"),
+        mocker.call("\r"),
+    ]
+    assert mock_echo.call_count == 3
@@ -0,0 +1,96 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+import os
+
+import pytest
+
+from asciinwriter.__main__ import main
+from asciinwriter.keyframes import index_path
+from asciinwriter.keyframes import KeyframeIndex
+from asciinwriter.keyframes import load_index
+from asciinwriter.keyframes import seek
+from asciinwriter.keyframes import write_index
+from asciinwriter.screen import Screen
+
+EVENTS = [
+    [0.5, "o", "$ top\r\n"],
+    [1.5, "o", "\x1b[?1049h\x1b[H\x1b[2J"],
+    [2.5, "o", "load: 0.1\x1b["],
+    [3.5, "o", "2;1Htasks: 3"],
+    [4.5, "o", "\x1b[1;7H2"],
+    [30.0, "o", "\x1b[?1049l$ "],
+]
+
+
+@pytest.fixture
+def cast_file(tmp_path):
+    path = tmp_path / "demo.cast"
+    lines = [json.dumps({"version": 2, "width": 20, "height": 4})]
+    lines += [json.dumps(event) for event in EVENTS]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def played(t):
+    """Return the screen after playing EVENTS from the start up to t."""
+    screen = Screen(20, 4)
+    for time, _, data in EVENTS:
+        if time <= t:
+            screen.feed(data)
+    return screen
+
+
+@pytest.mark.parametrize("t", [0, 1.5, 2.7, 3.5, 4.9, 12, 30, 99])
+def test_seek_matches_playing_from_the_start(cast_file, t):
+    """Test that seeking from a keyframe gives the screen of a full playback."""
+    screen = write_index(cast_file, interval=1).seek(cast_file, t)
+    expected = played(t)
+    assert screen.display() == expected.display()
+    assert (screen.x, screen.y) == (expected.x, expected.y)
+
+
+def test_keyframes_point_after_their_time(cast_file):
+    """Test that each keyframe starts reading at the first event after its time."""
+    index = write_index(cast_file, interval=1)
+    # one keyframe only for the pause between 4.5 and 30
+    assert index.times == [0, 1, 2, 3, 4, 5]
+    with open(cast_file, "rb") as f:
+        f.seek(index.nearest(12)["offset"])
+        assert json.loads(f.readline())[0] == 30.0
+    assert index.nearest(3.2)["screen"]["lines"] == ["load: 0.1", "", "", ""]
+    assert index.nearest(-1) is None
+
+
+def test_stale_index_is_rebuilt(cast_file):
+    """Test that an index is only used for the cast it was made from."""
+    write_index(cast_file, interval=1)
+    assert isinstance(load_index(cast_file), KeyframeIndex)
+    with open(cast_file, "a") as f:
+        f.write(json.dumps([31.0, "o", "exit"]) + "\n")
+    assert load_index(cast_file) is None
+    assert seek(cast_file, 40).line(1) == "$ exit"
+    assert load_index(cast_file) is not None
+
+
+def test_render_writes_keyframes(tmp_path, fast_runner):
+    """Test that a runner with a keyframe_interval writes an index next to the cast."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(echo hello)\nENTER()\nEXPECT_PROMPT()\n")
+    cast = str(tmp_path / "demo.cast")
+
+    fast_runner(shell="bash", bootstrap=True, keyframe_interval=0.01).process_file(
+        str(scene), output_file=cast
+    )
+
+    assert os.path.exists(index_path(cast))
+    assert "hello" in seek(cast, 1000).display()[1:]
+
+
+def test_seek_subcommand(cast_file, mocker, capsys):
+    """Test that 'asciinwriter seek' prints the screen at the given time."""
+    mocker.patch("sys.argv", ["asciinwriter", "seek", cast_file, "4"])
+    main()
+    assert capsys.readouterr().out == "load: 0.1\ntasks: 3\n"
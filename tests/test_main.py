@@ -154,10 +154,9 @@ def test_main_processes_send_and_expect(mocker, tmp_path):
     mock_human_type.assert_any_call(mock_child, "echo hello")
     mock_human_type.assert_any_call(mock_child, "ls")
 
-    # Should have called expect twice: once for prompt setup, once for EXPECT command
-    assert mock_child.expect.call_count == 2
-    mock_child.expect.assert_any_call(r"\$ ")  # Initial prompt setup
-    mock_child.expect.assert_any_call("hello\\ world")  # EXPECT command (escaped)
+    # Should have called expect once for prompt setup, and expect_exact for EXPECT
+    mock_child.expect.assert_called_once_with(r"\$ ")  # Initial prompt setup
+    mock_child.expect_exact.assert_called_once_with("hello world")  # EXPECT command
 
     # Should have called sendeof at the end
     mock_child.sendeof.assert_called_once()
@@ -191,10 +190,9 @@ EXPECT(test)
     # Should only process the SEND and EXPECT commands, not comments
     mock_human_type.assert_called_once_with(mock_child, "echo test")
 
-    # Should have called expect twice: once for prompt setup, once for EXPECT command
-    assert mock_child.expect.call_count == 2
-    mock_child.expect.assert_any_call(r"\$ ")  # Initial prompt setup
-    mock_child.expect.assert_any_call("test")  # EXPECT command
+    # Should have called expect once for prompt setup, and expect_exact for EXPECT
+    mock_child.expect.assert_called_once_with(r"\$ ")  # Initial prompt setup
+    mock_child.expect_exact.assert_called_once_with("test")  # EXPECT command
 
 
 def test_main_enter_command(mocker, tmp_path):
@@ -0,0 +1,105 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import pytest
+
+from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.__main__ import main
+from asciinwriter.metrics import Histogram
+from asciinwriter.metrics import Metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that each bucket counts the values up to its bound, as Prometheus expects."""
+    hist = Histogram((0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        hist.observe(value)
+    assert list(hist.cumulative()) == [(0.1, 2), (1, 3), ("+Inf", 4)]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(3.65)
+
+
+def test_runner_collects_metrics(mocker, tmp_path):
+    """Test that the runner counts typing, DELAY(), output and the buffer of each EXPECT."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\nEXPECT(total)\nDELAY(2)\n")
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    child = mock_spawn.return_value
+    child.before, child.after, child.buffer = "ls\r\n", "total", " 4\r\n"
+
+    def expect_exact(pattern):
+        child.logfile_read.write("ls\r\ntotal")
+
+    child.expect_exact.side_effect = expect_exact
+
+    runner = AsciinwriterRunner(typing_delay_range=(0.1, 0.1), jitter_factor=0)
+    runner.metrics = metrics = Metrics()
+    runner.process_file(str(scene), output_file=str(tmp_path / "demo.cast"))
+
+    assert metrics.commands == 4
+    assert metrics.chars_typed == 2
+    assert metrics.typing == pytest.approx(0.5)
+    assert metrics.delay == 2.0
+    assert metrics.bytes_read == len("ls\r\ntotal")
+    assert metrics.peak_buffer == len("ls\r\ntotal 4\r\n")
+    assert metrics.spawn_latency.count == 1
+    # the first prompt and the EXPECT
+    assert metrics.waits.count == 2
+
+
+def test_metrics_file_is_written(tmp_path, mocker, capsys):
+    """Test that --metrics-file writes a Prometheus textfile and prints a summary."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(echo hi)\nENTER()\nEXPECT_PROMPT()\n")
+    metrics_file = tmp_path / "asciinwriter.prom"
+    mocker.patch(
+        "sys.argv",
+        [
+            "asciinwriter",
+            str(scene),
+            "-o",
+            str(tmp_path / "demo.cast"),
+            "--bootstrap",
+            "--metrics-file",
+            str(metrics_file),
+        ],
+    )
+
+    main()
+
+    text = metrics_file.read_text()
+    assert f'asciinwriter_characters_typed_total{{scene="{scene}"}} 7\n' in text
+    assert f'asciinwriter_run_status{{scene="{scene}"}} 0\n' in text
+    assert (
+        f'asciinwriter_spawn_latency_seconds_bucket{{scene="{scene}",le="+Inf"}} 1\n'
+        in text
+    )
+    assert "# TYPE asciinwriter_wait_seconds histogram\n" in text
+    assert "# HELP asciinwriter_output_bytes_total Bytes of output" in text
+    assert "3 commands, 7 characters typed" in capsys.readouterr().err
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_failed_run_still_writes_metrics(tmp_path, mocker):
+    """Test that a failed run writes its metrics with a non-zero status."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(echo hi)\nENTER()\nTIMEOUT(0.2, EXPECT(never))\n")
+    metrics_file = tmp_path / "asciinwriter.prom"
+    mocker.patch(
+        "sys.argv",
+        [
+            "asciinwriter",
+            str(scene),
+            "-o",
+            str(tmp_path / "demo.cast"),
+            "--bootstrap",
+            "--metrics-file",
+            str(metrics_file),
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert f'asciinwriter_run_status{{scene="{scene}"}} 1\n' in metrics_file.read_text()
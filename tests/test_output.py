@@ -0,0 +1,47 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import io
+
+import pexpect
+
+from asciinwriter.output import RingBuffer
+from asciinwriter.runner import AsciinwriterRunner
+
+
+def test_ring_buffer_keeps_positions_of_everything_written():
+    """Test that RingBuffer drops old text but keeps StringIO positions."""
+    buf = RingBuffer(10)
+    for i in range(10):
+        buf.write("0123456789")
+    assert buf.tell() == 100
+    assert buf.getvalue() == "0123456789"
+    assert len(buf.io.getvalue()) <= 20
+
+    assert buf.seek(95) == 95
+    assert buf.read() == "56789"
+    # positions that were dropped go to the oldest text kept
+    assert buf.seek(0) == buf.start
+    assert buf.read().endswith("0123456789")
+    assert buf.seek(0, io.SEEK_END) == 100
+
+
+def test_bounded_output_with_real_child():
+    """Test that expects still match while only a bounded amount of output is kept."""
+    child = pexpect.spawn(
+        "sh",
+        ["-c", "for i in $(seq 20000); do echo abcdefghijabcdefghij; done; echo END"],
+        encoding="utf-8",
+        timeout=10,
+    )
+    child.logfile_read = None
+    try:
+        runner = AsciinwriterRunner(max_buffer=1024, search_window=512)
+        runner.bound_output(child)
+        runner.process_line(child, "EXPECT(END)")
+        assert child.after == "END"
+        assert len(child.before) <= 512 + runner.BOUNDED_MAXREAD
+        assert child.before.endswith("abcdefghij\r\n")
+    finally:
+        child.close(force=True)
@@ -0,0 +1,92 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+
+import pexpect
+import pytest
+
+from asciinwriter.__main__ import main
+from asciinwriter.backends import ReplayChild
+from asciinwriter.replay import Recording
+from asciinwriter.replay import replay_path
+from asciinwriter.runner import AsciinwriterRunner
+
+CHUNKS = [(0.0, "$ "), (0.5, "building...\r\n"), (2.0, "done\r\n$ ")]
+
+
+def test_recording_roundtrip(tmp_path):
+    """Test that a recording is saved compressed and loaded back unchanged."""
+    path = str(tmp_path / "demo.replay.gz")
+    Recording(list(CHUNKS), scene="abc").save(path)
+    recording = Recording.load(path)
+    assert recording.chunks == CHUNKS
+    assert recording.scene == "abc"
+    assert replay_path("scenes/demo.scene") == "scenes/demo.replay.gz"
+
+
+def test_failed_save_keeps_recording(tmp_path):
+    """Test that a recording that cannot be saved leaves the previous one in place."""
+    path = tmp_path / "demo.replay.gz"
+    Recording(list(CHUNKS), scene="abc").save(str(path))
+    with pytest.raises(TypeError):
+        Recording([(0.1, object())], scene="abc").save(str(path))
+    assert Recording.load(str(path)).chunks == CHUNKS
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_replay_child_plays_back_through_expect(mocker):
+    """Test that pexpect's expect methods match the replayed output, sleeping as recorded."""
+    sleep = mocker.Mock()
+    child = ReplayChild(Recording(list(CHUNKS)), sleep)
+    child.expect_exact("$ ")
+    child.send("make\r")
+    assert child.expect_exact(["failed", "done"]) == 1
+    assert sleep.call_args_list == [
+        mocker.call(0.0),
+        mocker.call(0.5),
+        mocker.call(2.0),
+    ]
+    with pytest.raises(pexpect.EOF):
+        child.expect_exact("never")
+
+
+def test_record_then_replay(mocker, tmp_path):
+    """Test that a recorded scene replays to the same cast without spawning a shell."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(make)\nENTER()\nEXPECT(done)\n")
+    recorded = Recording(list(CHUNKS))
+    spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    spawn.return_value = ReplayChild(recorded, lambda seconds: None)
+
+    runner = AsciinwriterRunner(seed=1, replay_mode="record")
+    runner.process_file(str(scene), output_file=str(tmp_path / "a.cast"))
+    saved = Recording.load(replay_path(str(scene)))
+    assert [data for _, data in saved.chunks] == [data for _, data in CHUNKS]
+
+    spawn.reset_mock()
+    # the delays the shell took come back as virtual time, whatever they were recorded as
+    saved.chunks = list(CHUNKS)
+    saved.save(replay_path(str(scene)))
+    runner = AsciinwriterRunner(seed=1, replay_mode="replay")
+    runner.process_file(str(scene), output_file=str(tmp_path / "b.cast"))
+    spawn.assert_not_called()
+
+    events = [
+        json.loads(line) for line in (tmp_path / "b.cast").read_text().splitlines()[1:]
+    ]
+    assert "".join(e[2] for e in events) == "$ make\rbuilding...\r\ndone\r\n$ "
+    typed = [e for e in events if e[2] == "\r"][0][0]
+    assert events[-1][0] - typed >= 2.5
+
+
+def test_replay_without_recording(mocker, tmp_path, capsys):
+    """Test that replaying a scene that was never recorded is an error."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("ENTER()\n")
+    mocker.patch("sys.argv", ["asciinwriter", "--replay", str(scene)])
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 1
+    assert "make one with --record" in capsys.readouterr().err
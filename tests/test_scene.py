@@ -0,0 +1,103 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import pytest
+
+from asciinwriter.__main__ import main
+from asciinwriter.scene import Command
+from asciinwriter.scene import compile_lines
+from asciinwriter.scene import compile_scene
+from asciinwriter.scene import parse_line
+from asciinwriter.scene import SceneError
+
+
+def test_parse_line_validates_parameters():
+    """Test that parameters are converted to their final types at compile time."""
+    assert parse_line("SEND(echo hi)  # comment") == Command("SEND", "echo hi")
+    assert parse_line("ENTER()") == Command("ENTER", 1)
+    assert parse_line("ENTER(3)") == Command("ENTER", 3)
+    assert parse_line("DELAY(0.5)") == Command("DELAY", 0.5)
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ("TYPE(x)", "Invalid command format: 'TYPE(x)'"),
+        ("ENTER(x)", "ENTER() requires an integer parameter, got 'x'"),
+        (
+            "DELAY(soon)",
+            "DELAY() requires a non-negative number of seconds, got 'soon'",
+        ),
+        ("DELAY(-1)", "DELAY() requires a non-negative number of seconds, got '-1'"),
+        ("DELAY(inf)", "DELAY() requires a non-negative number of seconds, got 'inf'"),
+        ("DELAY(nan)", "DELAY() requires a non-negative number of seconds, got 'nan'"),
+    ],
+)
+def test_parse_line_rejects_invalid(line, message):
+    """Test that invalid commands raise SceneError."""
+    with pytest.raises(SceneError) as exc_info:
+        parse_line(line)
+    assert exc_info.value.message == message
+
+
+def test_compile_lines_keeps_line_numbers():
+    """Test that compiled commands keep their source line numbers."""
+    commands = compile_lines(["# intro", "", "SEND(ls)", "ENTER()"])
+    assert [(c.cmd, c.lineno) for c in commands] == [("SEND", 3), ("ENTER", 4)]
+
+
+def test_compile_lines_reports_error_location():
+    """Test that errors report the file and line of the bad command."""
+    with pytest.raises(SceneError) as exc_info:
+        compile_lines(["SEND(ls)", "ENTER(x)"], filename="demo.scene")
+    assert str(exc_info.value) == (
+        "demo.scene:2: ENTER() requires an integer parameter, got 'x'"
+    )
+
+
+def test_compile_scene_uses_disk_cache(mocker, tmp_path):
+    """Test that a compiled scene is cached by content hash and reused."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER(2)\nDELAY(1.5)\n")
+    cache_dir = tmp_path / "ir-cache"
+
+    first = compile_scene(str(scene), cache_dir=str(cache_dir))
+    assert len(list((cache_dir / "ir").iterdir())) == 1
+
+    mock_compile = mocker.patch("asciinwriter.scene.compile_lines")
+    assert compile_scene(str(scene), cache_dir=str(cache_dir)) == first
+    mock_compile.assert_not_called()
+    mocker.stopall()
+
+    scene.write_text("SEND(pwd)\n")
+    assert compile_scene(str(scene), cache_dir=str(cache_dir)) == [
+        Command("SEND", "pwd", 1)
+    ]
+
+
+def test_invalid_scene_fails_before_spawning(mocker, tmp_path, capsys):
+    """Test that a bad line anywhere in the scene is rejected before the shell starts."""
+    scene = tmp_path / "bad.scene"
+    scene.write_text("SEND(ls)\nENTER()\n" + "SEND(x)\n" * 50 + "ENTER(x)\n")
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    mocker.patch("sys.argv", ["asciinwriter", str(scene)])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+
+    assert exc_info.value.code == 1
+    mock_spawn.assert_not_called()
+    assert f"{scene}:53: ENTER() requires" in capsys.readouterr().err
+
+
+def test_check_option(mocker, tmp_path):
+    """Test that --check validates the scene without running it."""
+    scene = tmp_path / "good.scene"
+    scene.write_text("SEND(ls)\nENTER()\n")
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    mocker.patch("sys.argv", ["asciinwriter", "--check", str(scene)])
+
+    main()
+
+    mock_spawn.assert_not_called()
@@ -0,0 +1,135 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+
+import pytest
+
+from asciinwriter.scene import compile_lines
+from asciinwriter.scene import SceneError
+from asciinwriter.scene import uses_screen
+from asciinwriter.screen import Screen
+
+
+def test_text_wraps_and_scrolls():
+    """Test that text wraps at the last column and scrolls at the last row."""
+    screen = Screen(cols=5, rows=2)
+    screen.feed("abcdefg\r\nhi")
+    assert screen.display() == ["fg", "hi"]
+    assert (screen.x, screen.y) == (2, 1)
+
+
+def test_cursor_addressing_and_erasing():
+    """Test that cursor movement and erase sequences edit the right cells."""
+    screen = Screen(cols=10, rows=3)
+    screen.feed("0123456789\r\nabcdefghij\r\nklm")
+    screen.feed("\x1b[1;4H\x1b[K\x1b[2;3H\x1b[2P\x1b[3;1H\x1b[2K\x1b[A!")
+    assert screen.display() == ["012", "!befghij", ""]
+
+
+def test_scrolling_region():
+    """Test that a scrolling region keeps the rows outside of it in place."""
+    screen = Screen(cols=6, rows=4)
+    screen.feed("top\r\none\r\ntwo\r\nbottom\x1b[2;3r\x1b[3;1H\n")
+    assert screen.display() == ["top", "two", "", "bottom"]
+
+
+def test_alternate_screen_is_restored():
+    """Test that leaving the alternate screen shows the previous content again."""
+    screen = Screen(cols=10, rows=3)
+    screen.feed("$ less\r\n")
+    screen.feed("\x1b[?1049h\x1b[H\x1b[2Jpage 1")
+    assert screen.display() == ["page 1", "", ""]
+    screen.feed("\x1b[?1049l")
+    assert screen.display() == ["$ less", "", ""]
+    assert (screen.x, screen.y) == (0, 1)
+
+
+def test_sequences_split_across_feeds():
+    """Test that an escape sequence cut between two chunks is applied once complete."""
+    screen = Screen(cols=10, rows=3)
+    screen.feed("ab\x1b[3")
+    assert screen.display() == ["ab", "", ""]
+    screen.feed(";2Hc\x1b]0;title\x07d")
+    assert screen.display() == ["ab", "", " cd"]
+
+
+def test_dirty_rows():
+    """Test that only the rows that changed are reported, once."""
+    screen = Screen(cols=10, rows=4)
+    assert screen.take_dirty() == [0, 1, 2, 3]
+    screen.feed("\x1b[3;1Hready")
+    assert screen.take_dirty() == [2]
+    assert screen.take_dirty() == []
+    assert screen.find("ready", [2]) == 2
+    assert screen.find("ready", [0, 1]) is None
+
+
+def test_expect_screen_is_compiled():
+    """Test that EXPECT_SCREEN() is found inside wrappers and kept out of sessions."""
+    commands = compile_lines(["TIMEOUT(2, EXPECT_SCREEN(ready))"])
+    assert uses_screen(commands)
+    assert not uses_screen(compile_lines(["EXPECT(ready)"]))
+    with pytest.raises(SceneError) as exc_info:
+        compile_lines(["SESSION(a)", "EXPECT_SCREEN(ready)"])
+    assert exc_info.value.lineno == 2
+    with pytest.raises(SceneError):
+        compile_lines(["EXPECT_SCREEN()"])
+
+
+def test_expect_screen_waits_for_the_screen(tmp_path, fast_runner):
+    """Test that EXPECT_SCREEN() matches text drawn with cursor addressing."""
+    scene = tmp_path / "screen.scene"
+    # the word is only whole on the screen, never in the typed command
+    scene.write_text(
+        "SEND(printf '\\033[2J\\033[3;5H%s%s\\n' rea dy)\n"
+        "ENTER()\n"
+        "EXPECT_SCREEN(ready)\n"
+        "SEND(echo after)\n"
+        "ENTER()\n"
+        "EXPECT_PROMPT()\n"
+    )
+    cast = tmp_path / "screen.cast"
+
+    runner = fast_runner(shell="bash", bootstrap=True)
+    runner.process_file(str(scene), output_file=str(cast))
+
+    output = "".join(json.loads(line)[2] for line in cast.read_text().splitlines()[1:])
+    assert "\x1b[3;5Hready" in output
+    assert "echo after" in output
+
+
+def test_expect_screen_times_out(tmp_path, fast_runner, capsys):
+    """Test that EXPECT_SCREEN() fails like the other EXPECT commands."""
+    scene = tmp_path / "missing.scene"
+    scene.write_text("SEND(echo rea dy)\nENTER()\nTIMEOUT(0.5, EXPECT_SCREEN(ready))\n")
+
+    with pytest.raises(SystemExit) as exc_info:
+        fast_runner(shell="bash", bootstrap=True).process_file(
+            str(scene), output_file=str(tmp_path / "missing.cast")
+        )
+    assert exc_info.value.code == 1
+    assert "waiting at TIMEOUT(0.5, EXPECT_SCREEN(ready))" in capsys.readouterr().err
+
+
+def test_expect_screen_in_segment_preamble(tmp_path, fast_runner):
+    """Test that EXPECT_SCREEN() in a preamble sees the output the preamble hides."""
+    scene = tmp_path / "preamble.scene"
+    scene.write_text(
+        "SEND(echo $((6*7)))\n"
+        "ENTER()\n"
+        "TIMEOUT(3, EXPECT_SCREEN(42))\n"
+        "SEGMENT(first)\n"
+        "SEND(echo shown)\n"
+        "ENTER()\n"
+        "EXPECT_PROMPT()\n"
+    )
+    cast = tmp_path / "preamble.cast"
+
+    runner = fast_runner(shell="bash", bootstrap=True)
+    runner.record(runner.load_scene(str(scene)), str(cast))
+
+    output = "".join(json.loads(line)[2] for line in cast.read_text().splitlines()[1:])
+    assert "shown" in output
+    assert "42" not in output
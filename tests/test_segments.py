@@ -0,0 +1,83 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+
+import pytest
+
+from asciinwriter.scene import compile_lines
+from asciinwriter.scene import SceneError
+from asciinwriter.scene import split_segments
+from asciinwriter.scene import uses_segments
+
+TUTORIAL = [
+    "SEND(export GREETING=hello)",
+    "ENTER()",
+    "SEGMENT(first)",
+    "SEND(echo $GREETING first)",
+    "ENTER()",
+    "EXPECT(hello first)",
+    "EXPECT_PROMPT()",
+    "SEGMENT(second)",
+    "SEND(echo $GREETING second)",
+    "ENTER()",
+    "EXPECT(hello second)",
+    "EXPECT_PROMPT()",
+]
+
+
+def load_cast(path):
+    lines = path.read_text().splitlines()
+    return json.loads(lines[0]), [json.loads(line) for line in lines[1:]]
+
+
+def test_split_segments():
+    """Test that the commands before the first SEGMENT() are the preamble."""
+    commands = compile_lines(TUTORIAL)
+    assert uses_segments(commands)
+    preamble, segments = split_segments(commands)
+    assert [c.cmd for c in preamble] == ["SEND", "ENTER"]
+    assert [name for name, _ in segments] == ["first", "second"]
+    assert [c.lineno for c in segments[1][1]] == [9, 10, 11, 12]
+
+
+@pytest.mark.parametrize(
+    "lines, lineno",
+    [
+        (["SEGMENT(a)", "ENTER()", "SEGMENT(a)"], 3),
+        (["SEGMENT(a)", "SESSION(b)"], 1),
+        (["EXPECT_ANY(x || y)", "SEGMENT(a)", "ON(1, ENTER())"], 3),
+    ],
+)
+def test_invalid_segments(lines, lineno):
+    """Test that duplicate segments, segments with sessions and ON() across segments are rejected."""
+    with pytest.raises(SceneError) as exc_info:
+        compile_lines(lines)
+    assert exc_info.value.lineno == lineno
+
+
+def test_segments_render_in_parallel_like_in_series(tmp_path, fast_runner):
+    """Test that segments rendered in parallel join into the cast rendered in series."""
+    scene = tmp_path / "tutorial.scene"
+    scene.write_text("\n".join(TUTORIAL) + "\n")
+
+    fast_runner(shell="bash", bootstrap=True, seed=1, segment_jobs=2).process_file(
+        str(scene), output_file=str(tmp_path / "parallel.cast")
+    )
+    # rendered in a single process, one segment after the other
+    runner = fast_runner(shell="bash", bootstrap=True, seed=1)
+    runner.record(runner.load_scene(str(scene)), str(tmp_path / "series.cast"))
+
+    parallel = load_cast(tmp_path / "parallel.cast")
+    series = load_cast(tmp_path / "series.cast")
+    assert parallel[0] == series[0]
+    for _, events in (parallel, series):
+        text = "".join(e[2] for e in events)
+        # the preamble is not shown, but ran in every segment
+        assert "export" not in text
+        assert text.index("hello first") < text.index("\r\x1b[K")
+        assert text.index("\r\x1b[K") < text.index("hello second")
+        assert text.count("\r\x1b[K") == 1
+        stamps = [e[0] for e in events]
+        assert stamps == sorted(stamps)
@@ -0,0 +1,117 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from asciinwriter.__main__ import main
+from asciinwriter.serve import JobErrors
+from asciinwriter.serve import submit
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Start 'asciinwriter serve' on a socket in tmp_path, and stop it afterwards."""
+    socket_path = str(tmp_path / "serve.sock")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "asciinwriter",
+            "serve",
+            "--socket",
+            socket_path,
+            "--bootstrap",
+            "--seed",
+            "1",
+            "--timeout",
+            "10",
+        ],
+        cwd=str(tmp_path),
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "the server did not start"
+        time.sleep(0.05)
+    yield socket_path
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=10) == 0
+    assert not os.path.exists(socket_path)
+
+
+def test_submit_renders_in_the_client_directory(
+    server, tmp_path, monkeypatch, cast_text
+):
+    """Test that a job renders with a pooled shell, in the directory of the client."""
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "notes.txt").write_text("hello from notes\n")
+    (work / "demo.scene").write_text(
+        "SEND(cat notes.txt)\nENTER()\nEXPECT(from notes)\n"
+    )
+    monkeypatch.chdir(work)
+
+    for output in ("first.cast", "second.cast"):
+        reply = submit(server, "demo.scene", output, title="Demo")
+        assert reply["status"] == 0, reply["messages"]
+        text = cast_text(work / output)
+        assert "cat notes.txt" in text
+        assert "hello from notes" in text
+        # the shell changed directory without showing it
+        assert "cd --" not in text
+        assert (
+            json.loads((work / output).read_text().splitlines()[0])["title"] == "Demo"
+        )
+
+
+def test_client_reports_errors(server, tmp_path, mocker, capsys):
+    """Test that the client shows the errors of a failed job and exits with its status."""
+    mocker.patch(
+        "sys.argv",
+        ["asciinwriter", "client", "--socket", server, str(tmp_path / "missing.scene")],
+    )
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 1
+    assert "missing.scene' not found" in capsys.readouterr().err
+
+
+def test_client_without_server(tmp_path, mocker, capsys):
+    """Test that the client fails cleanly when no server is listening."""
+    mocker.patch(
+        "sys.argv",
+        ["asciinwriter", "client", "--socket", str(tmp_path / "none.sock"), "x.scene"],
+    )
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 1
+    assert "Cannot reach the server" in capsys.readouterr().err
+
+
+def test_job_errors_are_kept_per_thread():
+    """Test that JobErrors keeps what a capturing thread writes away from the others."""
+    stream = io.StringIO()
+    errors = JobErrors(stream)
+    captured = {}
+
+    def job():
+        errors.capture()
+        errors.write("job error\n")
+        captured["text"] = errors.release()
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    thread.join()
+    errors.write("server message\n")
+    assert captured["text"] == "job error\n"
+    assert stream.getvalue() == "server message\n"
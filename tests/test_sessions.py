@@ -0,0 +1,85 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+
+import pytest
+
+from asciinwriter.scene import compile_lines
+from asciinwriter.scene import SceneError
+from asciinwriter.scene import split_sessions
+from asciinwriter.scene import uses_sessions
+
+SERVER_CLIENT = [
+    "SEND(echo before)",
+    "SESSION(server)",
+    "SEND(sleep 1; echo server-ready)",
+    "ENTER()",
+    "EXPECT(server-ready)",
+    "SIGNAL(ready)",
+    "SESSION(client)",
+    "WAIT(ready)",
+    "SEND(echo client-done)",
+    "ENTER()",
+    "EXPECT(client-done)",
+]
+
+
+def test_split_sessions():
+    """Test that commands are assigned to the session declared before them."""
+    commands = compile_lines(SERVER_CLIENT)
+    assert uses_sessions(commands)
+    tracks = split_sessions(commands)
+    assert list(tracks) == ["main", "server", "client"]
+    assert [c.cmd for c in tracks["client"]] == ["WAIT", "SEND", "ENTER", "EXPECT"]
+
+
+def test_wait_requires_signal():
+    """Test that a WAIT() nobody signals is rejected at compile time."""
+    with pytest.raises(SceneError) as exc_info:
+        compile_lines(["SESSION(a)", "WAIT(never)"])
+    assert exc_info.value.lineno == 2
+
+
+def test_invalid_session_name():
+    """Test that session names are validated."""
+    with pytest.raises(SceneError):
+        compile_lines(["SESSION(two words)"])
+
+
+def test_sessions_run_concurrently(tmp_path, fast_runner):
+    """Test that a wait in one session does not block typing in another."""
+    scene = tmp_path / "concurrent.scene"
+    scene.write_text(
+        "SESSION(slow)\n"
+        "SEND(sleep 2; echo slow-done)\n"
+        "ENTER()\n"
+        "EXPECT(slow-done)\n"
+        "SESSION(fast)\n"
+        "SEND(echo fast-done)\n"
+        "ENTER()\n"
+        "EXPECT(fast-done)\n"
+    )
+    cast = tmp_path / "concurrent.cast"
+
+    fast_runner(session_casts=True).process_file(str(scene), output_file=str(cast))
+
+    output = "".join(json.loads(line)[2] for line in cast.read_text().splitlines()[1:])
+    assert output.index("fast-done\r\n") < output.index("slow-done\r\n")
+    slow = (tmp_path / "concurrent.slow.cast").read_text()
+    assert "slow-done" in slow
+    assert "fast-done" not in slow
+    assert json.loads(slow.splitlines()[0])["title"] == "slow"
+
+
+def test_signal_orders_sessions(tmp_path, fast_runner):
+    """Test that WAIT() holds a session until another one signals."""
+    scene = tmp_path / "server_client.scene"
+    scene.write_text("\n".join(SERVER_CLIENT) + "\n")
+    cast = tmp_path / "server_client.cast"
+
+    fast_runner().process_file(str(scene), output_file=str(cast))
+
+    output = "".join(json.loads(line)[2] for line in cast.read_text().splitlines()[1:])
+    assert output.index("server-ready\r\n") < output.index("echo client-done")
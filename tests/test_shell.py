@@ -0,0 +1,72 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+
+from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.shell import BASH_PS1
+from asciinwriter.shell import SENTINEL_PROMPT
+from asciinwriter.shell import ShellBootstrap
+
+
+def test_bash_bootstrap_skips_rc_files(monkeypatch):
+    """Test that bash is started without startup files and with the sentinel prompt."""
+    monkeypatch.setenv("BASH_ENV", "/etc/something")
+    bootstrap = ShellBootstrap("/bin/bash")
+    assert bootstrap.args() == ["--noprofile", "--norc"]
+    env = bootstrap.env()
+    assert env["PS1"] == BASH_PS1
+    assert "BASH_ENV" not in env
+
+
+def test_bash_bootstrap_with_rcfile(tmp_path):
+    """Test that a custom rc file is sourced before the sentinel prompt is set."""
+    rcfile = tmp_path / "demo.rc"
+    rcfile.write_text("PS1='custom> '\n")
+    args = ShellBootstrap("bash", str(rcfile)).args()
+    assert args[:2] == ["--noprofile", "--rcfile"]
+    wrapper = open(args[2]).read().splitlines()
+    assert wrapper[0] == f". {rcfile}"
+    assert wrapper[1].startswith("PS1=")
+
+
+def test_posix_shell_bootstrap(tmp_path):
+    """Test that other shells get the sentinel prompt through the environment."""
+    bootstrap = ShellBootstrap("sh", str(tmp_path / "demo.rc"))
+    assert bootstrap.args() == []
+    assert bootstrap.env()["PS1"] == SENTINEL_PROMPT
+    assert bootstrap.env()["ENV"] == str(tmp_path / "demo.rc")
+
+
+def test_runner_spawns_bootstrapped_shell(mocker):
+    """Test that the runner spawns the shell with the bootstrap arguments."""
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    runner = AsciinwriterRunner(bootstrap=True)
+
+    runner.run([])
+
+    assert mock_spawn.call_args.kwargs["args"] == ["--noprofile", "--norc"]
+    mock_spawn.return_value.expect_exact.assert_called_once_with(SENTINEL_PROMPT)
+    assert runner.spawn_latency >= 0
+
+
+def test_bootstrapped_render(tmp_path):
+    """Test a real render with a bootstrapped bash, including EXPECT_PROMPT()."""
+    rcfile = tmp_path / "demo.rc"
+    rcfile.write_text("export GREETING=hello-from-rc\n")
+    scene = tmp_path / "demo.scene"
+    scene.write_text(
+        "SEND(echo '$ ' $GREETING)\nENTER()\nEXPECT(hello-from-rc)\nEXPECT_PROMPT()\n"
+    )
+    cast = tmp_path / "demo.cast"
+
+    runner = AsciinwriterRunner(
+        typing_delay_range=(0, 0), jitter_factor=0, rcfile=str(rcfile), timeout=10
+    )
+    runner.process_file(str(scene), output_file=str(cast))
+
+    output = "".join(json.loads(line)[2] for line in cast.read_text().splitlines()[1:])
+    assert "$  hello-from-rc" in output
+    assert output.count(SENTINEL_PROMPT) == 2
+    assert runner.spawn_latency < 5
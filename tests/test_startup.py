@@ -0,0 +1,95 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import subprocess
+import sys
+
+from asciinwriter.cache import RenderCache
+from asciinwriter.replay import file_digest
+from asciinwriter.replay import Recording
+from asciinwriter.replay import replay_path
+from asciinwriter.runner import AsciinwriterRunner
+
+# Runs main() in a fresh interpreter and prints the modules it imported
+SCRIPT = """
+import sys
+from asciinwriter.__main__ import main
+sys.argv = ["asciinwriter"] + sys.argv[1:]
+try:
+    main()
+except SystemExit:
+    pass
+print("MODULES", " ".join(sorted(sys.modules)))
+"""
+
+
+def imported_modules(*args):
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    line = result.stdout.splitlines()[-1]
+    assert line.startswith("MODULES ")
+    return set(line.split()[1:])
+
+
+def test_version_imports_nothing_else():
+    """Test that --version is answered without importing argparse or the runner."""
+    modules = imported_modules("--version")
+    assert "argparse" not in modules
+    assert "pexpect" not in modules
+    assert {m for m in modules if m.startswith("asciinwriter.")} == {
+        "asciinwriter.__main__"
+    }
+
+
+def test_check_does_not_import_pexpect(tmp_path):
+    """Test that validating a scene never imports pexpect."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\n")
+    modules = imported_modules("--check", str(scene))
+    assert "asciinwriter.scene" in modules
+    assert "pexpect" not in modules
+
+
+def test_cache_hit_does_not_import_pexpect(tmp_path):
+    """Test that a render served from the render cache never imports pexpect."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\n")
+    cached = tmp_path / "cached.cast"
+    cached.write_text('{"version": 2, "width": 80, "height": 24}\n')
+    cache = RenderCache(str(tmp_path / "cache"))
+    key = cache.key(str(scene), dict(AsciinwriterRunner().cache_params(), title=None))
+    cache.put(key, str(cached))
+
+    output = tmp_path / "demo.cast"
+    modules = imported_modules(
+        "--cache-dir", cache.cache_dir, "-o", str(output), str(scene)
+    )
+    assert output.read_text() == cached.read_text()
+    assert "pexpect" not in modules
+
+
+def test_replay_cache_hit_does_not_import_pexpect(tmp_path):
+    """Test that a --replay render served from the render cache never imports pexpect."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\n")
+    Recording([(0.1, "$ ")], scene=file_digest(str(scene))).save(
+        replay_path(str(scene))
+    )
+    cached = tmp_path / "cached.cast"
+    cached.write_text('{"version": 2, "width": 80, "height": 24}\n')
+    cache = RenderCache(str(tmp_path / "cache"))
+    params = AsciinwriterRunner(replay_mode="replay").cache_params()
+    key = cache.key(str(scene), dict(params, title=None), [replay_path(str(scene))])
+    cache.put(key, str(cached))
+
+    output = tmp_path / "demo.cast"
+    modules = imported_modules(
+        "--replay", "--cache-dir", cache.cache_dir, "-o", str(output), str(scene)
+    )
+    assert output.read_text() == cached.read_text()
+    assert "pexpect" not in modules
@@ -0,0 +1,159 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import io
+import json
+
+from asciinwriter.__main__ import AsciinwriterRunner
+from asciinwriter.__main__ import main
+from asciinwriter.trace import CountingWriter
+from asciinwriter.trace import load_spans
+from asciinwriter.trace import summary
+from asciinwriter.trace import Tracer
+
+
+def test_tracer_span_counts_differences(mocker):
+    """Test that a span gets only the sleeping, blocked and read counts of its own command."""
+    monotonic = mocker.patch("asciinwriter.trace.time.monotonic", return_value=10.0)
+    out = io.StringIO()
+    tracer = Tracer(out)
+    tracer.sleeping = 5.0
+    tracer.bytes_read = 100
+    child = mocker.Mock(before="abc", after="$ ", buffer="")
+
+    with tracer.span("EXPECT", "$ ", line=3, child=child):
+        monotonic.return_value = 12.5
+        tracer.sleeping += 0.5
+        tracer.blocked += 2.0
+        tracer.bytes_read += 42
+
+    span = json.loads(out.getvalue())
+    assert span == {
+        "line": 3,
+        "cmd": "EXPECT",
+        "param": "$ ",
+        "start": 0.0,
+        "end": 2.5,
+        "duration": 2.5,
+        "sleeping": 0.5,
+        "blocked": 2.0,
+        "bytes_read": 42,
+        "buffer_size": 5,
+    }
+    assert tracer.spans == [span]
+
+
+def test_counting_writer_counts_bytes():
+    """Test that output is counted in bytes, not in decoded characters."""
+    tracer = Tracer(io.StringIO())
+    out = io.StringIO()
+    writer = CountingWriter(out, tracer)
+    writer.write("caf\u00e9 \u2713")
+    assert tracer.bytes_read == 9
+    assert out.getvalue() == "caf\u00e9 \u2713"
+
+
+def test_runner_traces_each_command(mocker, tmp_path):
+    """Test that a traced run writes a shell startup span and one span per command."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("SEND(ls)\nENTER()\nEXPECT(total)\nDELAY(2)\n")
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    child = mock_spawn.return_value
+    child.before, child.after, child.buffer = "ls\r\n", "total", " 4\r\n"
+
+    def expect_exact(pattern):
+        child.logfile_read.write("ls\r\ntotal")
+
+    child.expect_exact.side_effect = expect_exact
+
+    trace = io.StringIO()
+    runner = AsciinwriterRunner(typing_delay_range=(0.1, 0.1), jitter_factor=0)
+    runner.tracer = Tracer(trace)
+    runner.process_file(str(scene), output_file=str(tmp_path / "demo.cast"))
+
+    spans = [json.loads(line) for line in trace.getvalue().splitlines()]
+    assert [(s["line"], s["cmd"]) for s in spans] == [
+        (0, "SPAWN"),
+        (1, "SEND"),
+        (2, "ENTER"),
+        (3, "EXPECT"),
+        (4, "DELAY"),
+    ]
+    send, expect, delay = spans[1], spans[3], spans[4]
+    assert send["param"] == "ls"
+    assert round(send["sleeping"], 6) == 0.5
+    assert expect["bytes_read"] == len("ls\r\ntotal")
+    assert expect["buffer_size"] == len("ls\r\ntotal 4\r\n")
+    assert expect["blocked"] >= 0
+    assert "buffer_size" not in delay
+    assert delay["sleeping"] == 2.0
+
+
+def test_wrapped_expect_spans_get_buffer_size(mocker, tmp_path):
+    """Test that an EXPECT inside TIMEOUT() is traced with the output pexpect held."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("TIMEOUT(5, EXPECT(total))\nENTER()\n")
+    mock_spawn = mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    child = mock_spawn.return_value
+    child.before, child.after, child.buffer = "ls\r\n", "total", ""
+
+    trace = io.StringIO()
+    runner = AsciinwriterRunner()
+    runner.tracer = Tracer(trace)
+    runner.process_file(str(scene), output_file=str(tmp_path / "demo.cast"))
+
+    spans = [json.loads(line) for line in trace.getvalue().splitlines()]
+    timeout, enter = spans[1], spans[2]
+    assert timeout["cmd"] == "TIMEOUT"
+    assert timeout["param"] == "5.0, EXPECT(total)"
+    assert timeout["buffer_size"] == len("ls\r\ntotal")
+    assert "buffer_size" not in enter
+
+
+def test_main_trace_option(mocker, tmp_path):
+    """Test that --trace writes the trace file and prints the slowest commands."""
+    scene = tmp_path / "demo.scene"
+    scene.write_text("ENTER()\nDELAY(1)\n")
+    trace = tmp_path / "trace.jsonl"
+    mocker.patch("asciinwriter.__main__.pexpect.spawn")
+    mock_print = mocker.patch("builtins.print")
+    mocker.patch(
+        "sys.argv",
+        [
+            "asciinwriter",
+            "--output",
+            str(tmp_path / "demo.cast"),
+            "--trace",
+            str(trace),
+            str(scene),
+        ],
+    )
+    main()
+
+    spans = load_spans(str(trace))
+    assert [s["cmd"] for s in spans] == ["SPAWN", "ENTER", "DELAY"]
+    report = mock_print.call_args.args[0]
+    assert report.startswith("3 spans")
+    assert "DELAY(1.0)" in report
+
+
+def test_summary_lists_slowest_first():
+    """Test that the summary orders commands by duration and honours top."""
+    spans = [
+        {
+            "line": n,
+            "cmd": "EXPECT",
+            "param": f"p{n}",
+            "duration": d,
+            "sleeping": 0,
+            "blocked": d,
+            "bytes_read": 1,
+        }
+        for n, d in ((1, 0.5), (2, 3.0), (3, 1.0))
+    ]
+    lines = summary(spans, top=2).splitlines()
+    assert lines[0].startswith("3 spans, 4.500s total")
+    assert "EXPECT(p2)" in lines[3]
+    assert "EXPECT(p3)" in lines[4]
+    assert len(lines) == 5
@@ -19,3 +19,35 @@ def test_typing_delay_within_reasonable_range():
     delay = runner.typing_delay()
     # Should be at least the minimum delay (0.03) and not too large
     assert 0.03 <= delay <= 1.0
+
+
+def test_typing_delay_is_reproducible_with_seed():
+    """Test that runners with the same seed produce the same delays."""
+    first = AsciinwriterRunner(seed=42)
+    second = AsciinwriterRunner(seed=42)
+    assert [first.typing_delay() for _ in range(5)] == [
+        second.typing_delay() for _ in range(5)
+    ]
+    assert first.typing_delays(50) == second.typing_delays(50)
+
+
+def test_typing_delays_schedule_within_range():
+    """Test that a batch schedule respects the delay range and jitter."""
+    runner = AsciinwriterRunner(
+        typing_delay_range=(0.03, 0.12), jitter_factor=0.01, jitter_range=6, seed=1
+    )
+    delays = runner.typing_delays(1000)
+    assert len(delays) == 1000
+    assert all(0.03 <= d <= 0.12 + 0.06 for d in delays)
+
+
+def test_human_type_uses_precomputed_schedule(mocker):
+    """Test that human_type sleeps according to the seeded schedule."""
+    mock_sleep = mocker.patch("asciinwriter.__main__.time.sleep")
+    runner = AsciinwriterRunner(seed=7, post_typing_delay=0.2)
+
+    runner.human_type(mocker.Mock(), "abc")
+
+    expected = AsciinwriterRunner(seed=7).typing_delays(4)
+    expected[-1] += 0.2
+    assert [c.args[0] for c in mock_sleep.call_args_list] == expected
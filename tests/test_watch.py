@@ -0,0 +1,93 @@
+# (C) 2025 Alexei Znamensky
+# Licensed under the GPL-3.0-or-later license. See LICENSES/GPL-3.0-or-later.txt for details.
+# SPDX-FileCopyrightText: 2025 Alexei Znamensky
+# SPDX-License-Identifier: GPL-3.0-or-later
+import os
+
+import pytest
+
+from asciinwriter.watch import find_scenes
+from asciinwriter.watch import InotifyWatcher
+from asciinwriter.watch import PollingWatcher
+from asciinwriter.watch import scene_filter
+from asciinwriter.watch import wait_for_changes
+from asciinwriter.watch import watch
+
+
+@pytest.fixture
+def scenes(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.scene").write_text("SEND(echo one)\nENTER()\n")
+    (tmp_path / "docs" / "notes.txt").write_text("not a scene\n")
+    (tmp_path / "b.scene").write_text("SEND(echo two)\nENTER()\n")
+    return tmp_path
+
+
+def test_find_scenes(scenes):
+    """Test that directories are searched for .scene files and files are kept as given."""
+    docs, b = str(scenes / "docs"), str(scenes / "b.scene")
+    assert find_scenes([docs, b]) == [os.path.join(docs, "a.scene"), b]
+    wanted = scene_filter([docs, b])
+    assert wanted(os.path.join(docs, "sub", "new.scene"))
+    assert not wanted(os.path.join(docs, "notes.txt"))
+    assert not wanted(str(scenes / "c.scene"))
+
+
+def test_inotify_watcher(scenes):
+    """Test that inotify reports saved scenes, including in new directories."""
+    try:
+        watcher = InotifyWatcher([str(scenes / "docs")])
+    except OSError:
+        pytest.skip("inotify is not available")
+    try:
+        assert watcher.changes(0) == set()
+        (scenes / "docs" / "a.scene").write_text("SEND(echo changed)\n")
+        (scenes / "docs" / "notes.txt").write_text("changed\n")
+        assert watcher.changes(1) == {str(scenes / "docs" / "a.scene")}
+        (scenes / "docs" / "sub").mkdir()
+        (scenes / "docs" / "sub" / "c.scene").write_text("SEND(echo three)\n")
+        changed = watcher.changes(1) | watcher.changes(0.2)
+        assert changed == {str(scenes / "docs" / "sub" / "c.scene")}
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher(scenes):
+    """Test that polling reports the scenes whose mtime changed."""
+    watcher = PollingWatcher([str(scenes)], interval=0.01)
+    assert watcher.changes(0) == set()
+    scene = scenes / "b.scene"
+    stat = scene.stat()
+    os.utime(scene, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    assert watcher.changes(1) == {str(scene)}
+
+
+def test_wait_for_changes_debounces(mocker):
+    """Test that changes coming in a burst are rendered together."""
+    watcher = mocker.Mock()
+    watcher.changes.side_effect = [set(), {"a.scene"}, {"b.scene"}, {"a.scene"}, set()]
+    assert wait_for_changes(watcher, debounce=0.1) == {"a.scene", "b.scene"}
+    assert watcher.changes.call_args_list[-1] == mocker.call(0.1)
+
+
+def test_watch_renders_changed_scenes(scenes, cast_text):
+    """Test that stale scenes are rendered first, then only the scenes that changed."""
+    for path in (scenes / "docs" / "a.scene", scenes / "b.scene"):
+        path.write_text(path.read_text() + "EXPECT_PROMPT()\n")
+    (scenes / "b.cast").write_text("newer than its scene\n")
+    runner_kwargs = dict(shell="bash", bootstrap=True, seed=1, timeout=10)
+
+    renders = watch([str(scenes)], runner_kwargs, debounce=0.05, poll=True)
+    try:
+        first = next(renders)
+        assert first.scene == str(scenes / "docs" / "a.scene")
+        assert first.ok
+        assert "echo one" in cast_text(scenes / "docs" / "a.cast")
+
+        (scenes / "b.scene").write_text("SEND(echo again)\nENTER()\nEXPECT_PROMPT()\n")
+        second = next(renders)
+        assert second.scene == str(scenes / "b.scene")
+        assert second.ok
+        assert "echo again" in cast_text(scenes / "b.cast")
+    finally:
+        renders.close()